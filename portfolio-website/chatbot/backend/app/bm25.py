@@ -0,0 +1,116 @@
+from collections import Counter, defaultdict
+from typing import Collection, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import math
+import re
+
+TERM_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+# Common English words and chat filler that carry no retrieval signal
+STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers
+him his how i if in into is it its just know let like me more most my no nor not now of off on once only
+or other our out over own please same she should so some such tell than that the their them then there
+these they this those through to too under until up very was we were what when where which while who
+whom why will with would you your yours yourself
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms, keeping tech names like "c++", "node.js" or "ci-cd" whole.
+    """
+    return [term for term in TERM_RE.findall(text.lower()) if term not in STOPWORDS]
+
+class LexicalMatch(NamedTuple):
+    hits: List[Tuple[str, float]]
+    # Share of the query's distinct terms found in the top document
+    coverage: float
+    # Top score divided by the runner-up's (infinite when only one document matched)
+    margin: float
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of chunks.
+    
+    The inverted index stores, per term, the postings list of (document,
+    weight) pairs with the full BM25 term weight already computed, so a
+    query only sums precomputed weights over the postings of its terms.
+    """
+    def __init__(self, doc_ids: Sequence[str], texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.doc_ids = list(doc_ids)
+        self.k1 = k1
+        self.b = b
+        
+        doc_terms = [Counter(tokenize(text)) for text in texts]
+        lengths = [sum(terms.values()) for terms in doc_terms]
+        average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        
+        document_frequency: Dict[str, int] = defaultdict(int)
+        for terms in doc_terms:
+            for term in terms:
+                document_frequency[term] += 1
+        
+        n = len(self.doc_ids)
+        self.postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for position, (terms, length) in enumerate(zip(doc_terms, lengths)):
+            norm = k1 * (1 - b + b * length / average_length) if average_length else k1
+            for term, tf in terms.items():
+                idf = math.log(1 + (n - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                self.postings[term].append((position, idf * tf * (k1 + 1) / (tf + norm)))
+        self.postings = dict(self.postings)
+    
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+    
+    def search(self, query: str, k: int = 3, allowed: Optional[Collection[int]] = None) -> LexicalMatch:
+        """
+        Score the chunks against a query.
+        
+        Args:
+            query: The query text
+            k: The number of documents to return
+            allowed: If given, only score documents at these positions
+        
+        Returns:
+            The top (doc_id, score) hits with coverage and margin of the best one
+        """
+        terms = set(tokenize(query))
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        for term in terms:
+            for position, weight in self.postings.get(term, ()):
+                if allowed is not None and position not in allowed:
+                    continue
+                scores[position] += weight
+                matched[position] += 1
+        
+        if not scores:
+            return LexicalMatch([], 0.0, 0.0)
+        
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        top_position, top_score = ranked[0]
+        margin = top_score / ranked[1][1] if len(ranked) > 1 and ranked[1][1] > 0 else math.inf
+        return LexicalMatch(
+            [(self.doc_ids[position], score) for position, score in ranked[:k]],
+            matched[top_position] / len(terms),
+            margin
+        )
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked lists of ids with reciprocal-rank fusion.
+    
+    Args:
+        rankings: Lists of ids, best first
+        k: Damping constant; larger values flatten the contribution of top ranks
+    
+    Returns:
+        (id, score) pairs, best first, with scores scaled so that an id ranked
+        first in every list scores 1.0
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    best = len(rankings) / (k + 1)
+    return [(doc_id, score / best) for doc_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)]
\ No newline at end of file
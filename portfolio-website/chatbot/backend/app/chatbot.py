@@ -1,16 +1,81 @@
 from langgraph.graph import StateGraph, END
-from typing import Dict, Any, List, Literal, TypedDict, Annotated
+from langchain_core.runnables import RunnableLambda
+from contextvars import ContextVar
+from typing import Dict, Any, AsyncIterator, List, Literal, Optional, Sequence, Tuple, TypedDict, Annotated
+import asyncio
+import hashlib
 import logging
 import json
+import os
+import random
 import re
+import numpy as np
+from . import ingestion, telemetry
+from .coalescing import SingleFlight
+from .intents import DETERMINISTIC_RESPONSES, get_intent_matcher
+from .prompt_builder import BuiltPrompt, PromptBuilder, get_tokenizer
+from .utils import get_data_registry
 
 # Define state types for type checking
 class ChatState(TypedDict):
     query: str
     context: str
+    context_ids: List[str]
+    # Retrieved (doc_id, text, relevance) tuples for the prompt builder
+    context_chunks: List[Tuple[str, str, float]]
+    # Query embedding dense retrieval searched with, reused by the semantic
+    # response cache; None when the lexical fast path answered the query
+    query_vector: Optional[np.ndarray]
     response: str
     conversation_history: List[Dict[str, str]]
+    # Rolling summary of turns folded out of conversation_history
+    conversation_summary: str
     intent: str
+    intent_confidence: float
+    prompt_tokens: int
+    prompt_tokens_saved: int
+
+# Map shared intent matcher results onto the LLM handlers of this graph,
+# for questions the fast paths do not answer
+INTENT_ALIASES = {"greeting": "general", "about_me": "resume", "contact": "general"}
+
+# Route of each intent answered from the pre-rendered responses
+FAST_PATH_ROUTES = {
+    "greeting": "greeting",
+    "about_me": "about_me",
+    "resume": "about_me",
+    "contact": "contact",
+    "projects": "project_list",
+}
+DEFAULT_FAST_PATHS = "greeting,about_me,resume,contact,projects"
+
+# Document types searched for each intent; intents not listed search everything
+INTENT_DOC_TYPES = {
+    "projects": (ingestion.PROJECT,),
+    "resume": (ingestion.RESUME, ingestion.SKILL, ingestion.BIO, ingestion.EXPERIENCE, ingestion.EDUCATION),
+}
+
+# Set while astream_chat runs so LLM handlers forward tokens as they arrive.
+# Graph nodes run in tasks that inherit the caller's context.
+_token_sink: ContextVar[Optional[asyncio.Queue]] = ContextVar("token_sink", default=None)
+
+def _node(name, func, afunc=None):
+    """
+    Wrap a graph node so it runs natively under both invoke and ainvoke.
+    
+    Nodes without an async implementation are cheap and CPU-only, so their
+    async variant simply calls the sync function on the event loop instead of
+    hopping to the default thread pool. Both variants are timed as the
+    request stage ``name``.
+    """
+    def timed_func(state):
+        with telemetry.timed(name):
+            return func(state)
+    
+    async def timed_afunc(state):
+        with telemetry.timed(name):
+            return await afunc(state) if afunc is not None else func(state)
+    return RunnableLambda(timed_func, afunc=timed_afunc)
 
 class PortfolioChatbot:
     """
@@ -20,6 +85,17 @@ class PortfolioChatbot:
     def __init__(self, llm, rag):
         self.llm = llm
         self.rag = rag
+        self.data = get_data_registry()
+        self.intent_matcher = get_intent_matcher()
+        # Intents answered without retrieval or the LLM when the question is
+        # about the topic as a whole
+        self.fast_paths = frozenset(
+            name.strip() for name in os.getenv('CHAT_FAST_PATHS', DEFAULT_FAST_PATHS).split(',')
+            if name.strip() in FAST_PATH_ROUTES
+        )
+        # Identical questions that arrive together share one LLM call
+        self.coalescing_enabled = os.getenv('REQUEST_COALESCING', 'true').lower() in ('true', '1', 't')
+        self.flights = SingleFlight()
         self.graph = self.create_graph()
         self.system_prompt = """
         You are a professional portfolio assistant for a software engineer.
@@ -32,21 +108,27 @@ class PortfolioChatbot:
         
         Response:
         """
-        
-        # Load project data if available
-        try:
-            with open("../data/projects.json", "r") as f:
-                self.projects_data = json.load(f)
-        except Exception as e:
-            logging.warning(f"Could not load projects data: {e}")
-            self.projects_data = []
-            
-        try:
-            with open("../data/personal_info.json", "r") as f:
-                self.personal_info = json.load(f)
-        except Exception as e:
-            logging.warning(f"Could not load personal info: {e}")
-            self.personal_info = {}
+        # Packs retrieved chunks and history under a token budget
+        self.prompt_builder = PromptBuilder(
+            self.system_prompt,
+            token_budget=int(os.getenv('PROMPT_TOKEN_BUDGET', 2048)),
+            history_share=float(os.getenv('PROMPT_HISTORY_SHARE', 0.35)),
+            tokenizer=get_tokenizer(os.getenv('PROMPT_TOKENIZER', 'cl100k_base'))
+        )
+    
+    @property
+    def projects_data(self):
+        """
+        Projects from the shared data registry (frozen, never re-read per request).
+        """
+        return self.data.get().projects
+    
+    @property
+    def personal_info(self):
+        """
+        Personal info from the shared data registry.
+        """
+        return self.data.get().personal_info
     
     def create_graph(self):
         """
@@ -55,30 +137,49 @@ class PortfolioChatbot:
         workflow = StateGraph(ChatState)
         
         # Define nodes
-        workflow.add_node("classify_intent", self.classify_intent)
-        workflow.add_node("get_context", self.get_context)
-        workflow.add_node("handle_greeting", self.handle_greeting)
-        workflow.add_node("handle_projects", self.handle_projects)
-        workflow.add_node("handle_resume", self.handle_resume)
-        workflow.add_node("handle_general", self.handle_general)
-        
-        # Define conditional edges based on intent classification
+        workflow.add_node("classify_intent", _node("classify_intent", self.classify_intent))
+        workflow.add_node("get_context", _node("get_context", self.get_context, self.aget_context))
+        workflow.add_node("handle_greeting", _node("handle_greeting", self.handle_greeting))
+        workflow.add_node("handle_about_me", _node("handle_about_me", self.handle_about_me))
+        workflow.add_node("handle_contact", _node("handle_contact", self.handle_contact))
+        workflow.add_node("handle_project_list", _node("handle_project_list", self.handle_project_list))
+        workflow.add_node("handle_projects", _node("handle_projects", self.handle_projects, self.ahandle_projects))
+        workflow.add_node("handle_resume", _node("handle_resume", self.handle_resume, self.ahandle_resume))
+        workflow.add_node("handle_general", _node("handle_general", self.handle_general, self.ahandle_general))
+        
+        # Fast paths answer from the pre-rendered responses and end the
+        # request before any retrieval or LLM work; every other question goes
+        # through a single retrieval stage whose result is carried in the state
         workflow.add_conditional_edges(
             "classify_intent",
             self.route_by_intent,
             {
                 "greeting": "handle_greeting",
-                "projects": "handle_projects",
-                "resume": "handle_resume",
+                "about_me": "handle_about_me",
+                "contact": "handle_contact",
+                "project_list": "handle_project_list",
+                "projects": "get_context",
+                "resume": "get_context",
                 "general": "get_context",
             }
         )
         
-        # Connect get_context to handle_general
-        workflow.add_edge("get_context", "handle_general")
+        # Route retrieved context to the handler for the intent
+        workflow.add_conditional_edges(
+            "get_context",
+            self.route_by_intent,
+            {
+                "projects": "handle_projects",
+                "resume": "handle_resume",
+                "general": "handle_general",
+            }
+        )
         
         # All handlers lead to the end
         workflow.add_edge("handle_greeting", END)
+        workflow.add_edge("handle_about_me", END)
+        workflow.add_edge("handle_contact", END)
+        workflow.add_edge("handle_project_list", END)
         workflow.add_edge("handle_projects", END)
         workflow.add_edge("handle_resume", END)
         workflow.add_edge("handle_general", END)
@@ -93,32 +194,40 @@ class PortfolioChatbot:
         Classify the user's intent to route the conversation flow.
         """
         query = state.get("query", "")
-        conversation_history = state.get("conversation_history", [])
-        
-        # Simple rule-based intent classification
-        query_lower = query.lower()
         
-        # Greeting patterns
-        greeting_patterns = ["hello", "hi", "hey", "greetings", "good morning", "good afternoon", "good evening"]
-        if any(pattern in query_lower for pattern in greeting_patterns) and len(query_lower.split()) < 5:
-            intent = "greeting"
+        match = self.intent_matcher.match(query)
+        intent = self.route(query, match)
         
-        # Project related patterns
-        elif any(word in query_lower for word in ["project", "portfolio", "work", "built", "created", "developed"]):
-            intent = "projects"
+        logging.info(f"Classified intent: {intent} ({match.confidence:.2f}) for query: {query}")
+        return {**state, "intent": intent, "intent_confidence": match.confidence}
+    
+    def route(self, query: str, match=None) -> str:
+        """
+        Pick the route for a query.
         
-        # Resume/experience related patterns
-        elif any(word in query_lower for word in ["resume", "experience", "skill", "education", "qualification", "background"]):
-            intent = "resume"
+        Fast-path intents are answered from the pre-rendered responses when
+        the query names no subject beyond the intent ("What projects have you
+        built?"); specific questions ("Which projects use FastAPI?") and other
+        intents go to retrieval and an LLM handler.
         
-        # Default to general intent
-        else:
-            intent = "general"
+        Args:
+            query: The user's message
+            match: The query's intent match, if already computed
         
-        logging.info(f"Classified intent: {intent} for query: {query}")
-        return {**state, "intent": intent}
+        Returns:
+            A fast-path route, or the intent of the LLM handler
+        """
+        match = match or self.intent_matcher.match(query)
+        if match.intent in self.fast_paths:
+            # Greetings are already limited to a few words by their rule
+            if match.intent == "greeting" or not self.intent_matcher.subject_words(query):
+                return FAST_PATH_ROUTES[match.intent]
+        # The LLM handlers answer "about me" questions from the resume and
+        # have no dedicated contact handler
+        return INTENT_ALIASES.get(match.intent, match.intent)
     
-    def route_by_intent(self, state: ChatState) -> Literal["greeting", "projects", "resume", "general"]:
+    def route_by_intent(self, state: ChatState) -> Literal["greeting", "about_me", "contact", "project_list",
+                                                           "projects", "resume", "general"]:
         """
         Route the conversation based on the classified intent.
         """
@@ -127,94 +236,239 @@ class PortfolioChatbot:
     def get_context(self, state: ChatState) -> ChatState:
         """
         Retrieve relevant context from the RAG system.
+        
+        Only documents of the types relevant to the intent are searched, so
+        a projects question is answered from the matching project records.
+        For history-independent questions the query embedding is kept as
+        well, for the semantic response cache.
+        """
+        query = state.get("query", "")
+        doc_types = INTENT_DOC_TYPES.get(state.get("intent", ""))
+        try:
+            if self._history_independent(state):
+                results, vector = self.rag.retrieve_with_vector(query, doc_types=doc_types)
+            else:
+                results, vector = self.rag.retrieve(query, doc_types=doc_types), None
+            return {**state, **self._context_from_results(results, vector)}
+        except Exception as e:
+            logging.error(f"Error retrieving context: {e}")
+            return {**state, "context": "", "context_ids": [], "context_chunks": [], "query_vector": None}
+    
+    async def aget_context(self, state: ChatState) -> ChatState:
+        """
+        Async variant of get_context that searches off the event loop.
         """
         query = state.get("query", "")
+        doc_types = INTENT_DOC_TYPES.get(state.get("intent", ""))
         try:
-            context = self.rag.get_context(query)
-            return {**state, "context": context}
+            if self._history_independent(state):
+                results, vector = await self.rag.aretrieve_with_vector(query, doc_types=doc_types)
+            else:
+                results, vector = await self.rag.aretrieve(query, doc_types=doc_types), None
+            return {**state, **self._context_from_results(results, vector)}
         except Exception as e:
             logging.error(f"Error retrieving context: {e}")
-            return {**state, "context": ""}
+            return {**state, "context": "", "context_ids": [], "context_chunks": [], "query_vector": None}
+    
+    def _context_from_results(self, results, vector: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Turn retrieval results and the query embedding into the context fields of the state.
+        """
+        return {
+            "context": "\n\n".join(doc.page_content for _, doc, _ in results),
+            "context_ids": [doc_id for doc_id, _, _ in results],
+            "context_chunks": [(doc_id, doc.page_content, score) for doc_id, doc, score in results],
+            "query_vector": vector,
+        }
     
     def handle_greeting(self, state: ChatState) -> ChatState:
         """
         Handle greeting intents with a friendly response.
         """
-        name = self.personal_info.get("name", "the portfolio owner")
-        greeting_responses = [
-            f"Hello! I'm {name}'s portfolio assistant. How can I help you today?",
-            f"Hi there! Welcome to {name}'s portfolio. What would you like to know?",
-            f"Greetings! I'm here to tell you about {name}'s work and experience. What are you interested in?"
-        ]
-        import random
-        response = random.choice(greeting_responses)
+        # Rendered once per data load by the registry
+        response = random.choice(self.data.get().responses["greetings"])
         return {**state, "response": response}
     
+    def handle_about_me(self, state: ChatState) -> ChatState:
+        """
+        Answer broad about-me and resume questions with the pre-rendered summary.
+        """
+        return {**state, "response": self.data.get().responses[DETERMINISTIC_RESPONSES["about_me"]]}
+    
+    def handle_contact(self, state: ChatState) -> ChatState:
+        """
+        Answer contact questions with the contact details.
+        """
+        return {**state, "response": self.data.get().responses[DETERMINISTIC_RESPONSES["contact"]]}
+    
+    def handle_project_list(self, state: ChatState) -> ChatState:
+        """
+        Answer requests for the projects as a whole with the project listing.
+        """
+        return {**state, "response": self.data.get().responses[DETERMINISTIC_RESPONSES["projects"]]}
+    
     def handle_projects(self, state: ChatState) -> ChatState:
         """
-        Handle project-related queries using project data.
+        Handle project-related queries using the retrieved project records.
         """
-        query = state.get("query", "")
+        prompt = self._build_prompt(state)
         
-        if self.projects_data:
-            # Get project context from RAG system
-            context = self.rag.get_context(query)
-            
-            # Format project information
-            project_info = "Here are some relevant projects:\n\n"
-            for project in self.projects_data[:3]:  # Limit to 3 projects for brevity
-                project_info += f"- {project.get('name', 'Unnamed Project')}: {project.get('description', 'No description')}\n"
-            
-            # Generate response with LLM
-            prompt = self.system_prompt.format(
-                context=context + "\n" + project_info,
-                conversation_history=self._format_conversation_history(state.get("conversation_history", [])),
-                query=query
-            )
-            response = self.llm.generate_response(prompt)
-        else:
-            # Fallback if no project data is available
-            context = self.rag.get_context(query)
-            prompt = self.system_prompt.format(
-                context=context,
-                conversation_history=self._format_conversation_history(state.get("conversation_history", [])),
-                query=query
-            )
-            response = self.llm.generate_response(prompt)
+        response = self._generate(state, prompt.text)
         
-        return {**state, "response": response}
+        return {**state, "response": response, **self._prompt_usage(prompt)}
+    
+    async def ahandle_projects(self, state: ChatState) -> ChatState:
+        """
+        Async variant of handle_projects.
+        """
+        prompt = self._build_prompt(state)
+        
+        response = await self._agenerate(state, prompt.text)
+        
+        return {**state, "response": response, **self._prompt_usage(prompt)}
     
     def handle_resume(self, state: ChatState) -> ChatState:
         """
-        Handle resume-related queries with focused context retrieval.
+        Handle resume-related queries using the retrieved resume context.
         """
-        query = state.get("query", "")
-        context = self.rag.get_context(query)
+        prompt = self._build_prompt(state)
         
-        prompt = self.system_prompt.format(
-            context=context,
-            conversation_history=self._format_conversation_history(state.get("conversation_history", [])),
-            query=query
-        )
-        response = self.llm.generate_response(prompt)
+        response = self._generate(state, prompt.text)
         
-        return {**state, "response": response}
+        return {**state, "response": response, **self._prompt_usage(prompt)}
+    
+    async def ahandle_resume(self, state: ChatState) -> ChatState:
+        """
+        Async variant of handle_resume.
+        """
+        prompt = self._build_prompt(state)
+        
+        response = await self._agenerate(state, prompt.text)
+        
+        return {**state, "response": response, **self._prompt_usage(prompt)}
     
     def handle_general(self, state: ChatState) -> ChatState:
         """
         Handle general queries using the LLM and retrieved context.
         """
-        query = state.get("query", "")
-        context = state.get("context", "")
+        prompt = self._build_prompt(state)
         
-        prompt = self.system_prompt.format(
-            context=context,
-            conversation_history=self._format_conversation_history(state.get("conversation_history", [])),
-            query=query
-        )
-        response = self.llm.generate_response(prompt)
+        response = self._generate(state, prompt.text)
         
-        return {**state, "response": response}
+        return {**state, "response": response, **self._prompt_usage(prompt)}
+    
+    async def ahandle_general(self, state: ChatState) -> ChatState:
+        """
+        Async variant of handle_general.
+        """
+        prompt = self._build_prompt(state)
+        
+        response = await self._agenerate(state, prompt.text)
+        
+        return {**state, "response": response, **self._prompt_usage(prompt)}
+    
+    def _history_independent(self, state: ChatState) -> bool:
+        """
+        Whether the answer depends on the current message alone.
+        
+        The history already contains the current message, so anything longer
+        means earlier turns may change what the right answer is.
+        """
+        return len(state.get("conversation_history", [])) <= 1 and not state.get("conversation_summary")
+    
+    def _cache_vector(self, state: ChatState) -> Optional[np.ndarray]:
+        """
+        The query embedding for semantic response caching, if the answer is history-independent.
+        
+        This is the vector retrieval already searched with, so the cache never
+        embeds a query itself; a query the lexical fast path answered has none
+        and only uses the exact cache.
+        """
+        return state.get("query_vector") if self._history_independent(state) else None
+    
+    def _flight_key(self, state: ChatState) -> Optional[tuple]:
+        """
+        Key under which concurrent requests share one LLM call.
+        
+        Requests are equivalent when they have the same intent, retrieved
+        chunks and normalized query. Follow-up turns also include a digest of
+        the history, since it is part of the prompt.
+        """
+        if not self.coalescing_enabled:
+            return None
+        query = re.sub(r"\s+", " ", state.get("query", "")).strip().lower()
+        history_digest = ""
+        if not self._history_independent(state):
+            history = state.get("conversation_summary", "") + self._format_conversation_history(state.get("conversation_history", []))
+            history_digest = hashlib.sha256(history.encode("utf-8")).hexdigest()
+        return (state.get("intent", ""), tuple(state.get("context_ids", [])), query, history_digest)
+    
+    def _generate(self, state: ChatState, prompt: str) -> str:
+        """
+        Generate a response, sharing the LLM call with identical concurrent requests.
+        """
+        cache_vector = self._cache_vector(state)
+        key = self._flight_key(state)
+        if key is None:
+            response = self.llm.generate_response(prompt, cache_vector)
+        else:
+            response = self.flights.do(key, lambda: self.llm.generate_response(prompt, cache_vector))
+        telemetry.COMPLETION_TOKENS.observe(self.prompt_builder.tokenizer.count(response))
+        return response
+    
+    async def _agenerate(self, state: ChatState, prompt: str) -> str:
+        """
+        Generate a response, streaming tokens to the active sink if there is one.
+        
+        Identical concurrent requests share one LLM call. Only the request
+        that makes the call streams token by token; the others receive the
+        finished response in one piece.
+        """
+        cache_vector = self._cache_vector(state)
+        sink = _token_sink.get()
+        ran = False
+        
+        async def generate() -> str:
+            nonlocal ran
+            ran = True
+            if sink is None:
+                return await self.llm.agenerate_response(prompt, cache_vector)
+            
+            parts = []
+            async for token in self.llm.astream_response(prompt, cache_vector):
+                parts.append(token)
+                sink.put_nowait(token)
+            return "".join(parts)
+        
+        key = self._flight_key(state)
+        if key is None:
+            response = await generate()
+        else:
+            response = await self.flights.ado(key, generate)
+            if sink is not None and not ran:
+                sink.put_nowait(response)
+        telemetry.COMPLETION_TOKENS.observe(self.prompt_builder.tokenizer.count(response))
+        return response
+    
+    def _build_prompt(self, state: ChatState, pinned: Sequence[str] = ()) -> BuiltPrompt:
+        """
+        Fill the system prompt with budgeted context, history and the user's query.
+        """
+        return self.prompt_builder.build(
+            state.get("query", ""),
+            chunks=state.get("context_chunks", []),
+            history=state.get("conversation_history", []),
+            pinned=pinned,
+            summary=state.get("conversation_summary", "")
+        )
+    
+    def _prompt_usage(self, prompt: BuiltPrompt) -> Dict[str, int]:
+        """
+        Per-request prompt size, logged and carried in the graph state.
+        """
+        logging.info(f"Prompt tokens: {prompt.tokens} ({prompt.tokens_saved} saved by budgeting)")
+        telemetry.PROMPT_TOKENS.observe(prompt.tokens)
+        return {"prompt_tokens": prompt.tokens, "prompt_tokens_saved": prompt.tokens_saved}
     
     def _format_conversation_history(self, history):
         """
@@ -230,29 +484,114 @@ class PortfolioChatbot:
         
         return formatted
     
-    def chat(self, message: str, conversation_history=None) -> str:
+    def _initial_state(self, message: str, conversation_history, summary: str = "") -> ChatState:
+        """
+        Build the graph input state for a message.
+        """
+        return {
+            "query": message,
+            "conversation_history": conversation_history if conversation_history is not None else [],
+            "conversation_summary": summary or "",
+            "context": "",
+            "context_ids": [],
+            "context_chunks": [],
+            "query_vector": None,
+            "response": "",
+            "intent": "",
+            "intent_confidence": 0.0,
+            "prompt_tokens": 0,
+            "prompt_tokens_saved": 0
+        }
+    
+    def chat(self, message: str, conversation_history=None, summary: str = "") -> str:
         """
         Process a user message and return a response.
         
         Args:
             message: The user's message
             conversation_history: Optional conversation history
-            
+            summary: Optional rolling summary of earlier, folded turns
+        
         Returns:
             The chatbot's response
         """
-        if conversation_history is None:
-            conversation_history = []
-            
         try:
-            result = self.graph.invoke({
-                "query": message,
-                "conversation_history": conversation_history,
-                "context": "",
-                "response": "",
-                "intent": ""
-            })
+            result = self.graph.invoke(self._initial_state(message, conversation_history, summary))
             return result["response"]
         except Exception as e:
             logging.error(f"Error in chat flow: {e}")
-            return "I'm sorry, I encountered an error while processing your request."
\ No newline at end of file
+            return "I'm sorry, I encountered an error while processing your request."
+    
+    async def achat(self, message: str, conversation_history=None, summary: str = "") -> str:
+        """
+        Process a user message without blocking the event loop.
+        
+        Args:
+            message: The user's message
+            conversation_history: Optional conversation history
+            summary: Optional rolling summary of earlier, folded turns
+        
+        Returns:
+            The chatbot's response
+        """
+        try:
+            result = await self.graph.ainvoke(self._initial_state(message, conversation_history, summary))
+            return result["response"]
+        except Exception as e:
+            logging.error(f"Error in chat flow: {e}")
+            return "I'm sorry, I encountered an error while processing your request."
+    
+    async def astream_chat(self, message: str, conversation_history=None, summary: str = "") -> AsyncIterator[str]:
+        """
+        Process a user message and stream the response as it is generated.
+        
+        LLM-backed handlers yield tokens as the model produces them; handlers
+        that answer without the LLM yield their whole response at once.
+        
+        Args:
+            message: The user's message
+            conversation_history: Optional conversation history
+            summary: Optional rolling summary of earlier, folded turns
+        
+        Yields:
+            Chunks of the chatbot's response
+        
+        Raises:
+            The error that interrupted the response, if part of it was
+            already yielded; earlier errors yield an apology like achat
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        
+        async def run() -> str:
+            _token_sink.set(queue)
+            try:
+                result = await self.graph.ainvoke(self._initial_state(message, conversation_history, summary))
+                return result["response"]
+            finally:
+                queue.put_nowait(done)
+        
+        task = asyncio.create_task(run())
+        streamed = False
+        try:
+            while True:
+                token = await queue.get()
+                if token is done:
+                    break
+                streamed = True
+                yield token
+            
+            try:
+                response = await task
+            except Exception as e:
+                if streamed:
+                    # A truncated answer must not look complete to the caller
+                    raise
+                logging.error(f"Error in chat flow: {e}")
+                response = "I'm sorry, I encountered an error while processing your request."
+            if not streamed:
+                yield response
+        finally:
+            # The client went away before the response finished
+            if not task.done():
+                task.cancel()
\ No newline at end of file
@@ -0,0 +1,117 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import threading
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key onto one execution.
+    
+    The first caller for a key (the leader) runs the work; callers that
+    arrive while it is in flight wait for it and receive the same result or
+    exception. Nothing is kept once the call finishes, so this never serves
+    stale results; it only deduplicates work that overlaps in time.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.collapsed = 0
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run ``fn`` once for all threads calling with the same key concurrently.
+        
+        Args:
+            key: Identifies equivalent calls
+            fn: The work to run if no call for the key is in flight
+        
+        Returns:
+            The result of the shared call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.collapsed += 1
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+    
+    async def ado(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await ``factory()`` once for all tasks calling with the same key concurrently.
+        
+        The shared work runs in its own task, so one waiter being cancelled
+        (for example a streaming client disconnecting) does not cancel it for
+        the others. It is only cancelled when every waiter has gone away.
+        
+        Args:
+            key: Identifies equivalent calls
+            factory: Creates the coroutine to run if no call for the key is in flight
+        
+        Returns:
+            The result of the shared call
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(factory()))
+            flight.task.add_done_callback(lambda _: self._flights.pop(key, None))
+            with self._lock:
+                self.leaders += 1
+        else:
+            with self._lock:
+                self.collapsed += 1
+        
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report how many calls ran and how many were collapsed onto another call.
+        """
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._flights),
+                "executed": self.leaders,
+                "collapsed": self.collapsed,
+            }
\ No newline at end of file
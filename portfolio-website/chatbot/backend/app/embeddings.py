@@ -0,0 +1,363 @@
+from langchain_core.embeddings import Embeddings
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+# EMBEDDING_MODEL value that selects HashEmbeddings instead of a real model
+FAKE_EMBEDDING_MODEL = "fake"
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def default_num_threads() -> int:
+    """
+    Split the machine's cores evenly between the server's worker processes.
+    """
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+class EmbeddingStore:
+    """
+    On-disk store of chunk vectors keyed by (model, chunk hash).
+    
+    Backed by a SQLite file in WAL mode, so every worker on a host and every
+    later deployment reuses the vectors computed once for a chunk.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._connection = self._connect()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, hash)
+            )
+        """)
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # A SQLite connection must not be used across fork(); a worker forked
+        # from a preloading master opens its own and leaves the inherited one
+        # referenced, so it is never closed from the child
+        if self._pid != os.getpid():
+            self._inherited = self._connection
+            self._connection = self._connect()
+            self._pid = os.getpid()
+        return self._connection
+    
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay under SQLite's limit on bound parameters
+            for start in range(0, len(hashes), 500):
+                chunk = list(hashes[start:start + 500])
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk]
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32)
+        return found
+    
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(model, digest, np.asarray(vector, dtype=np.float32).tobytes()) for digest, vector in vectors.items()]
+            )
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+class HashEmbeddings(Embeddings):
+    """
+    Offline stand-in for the sentence-transformers model, for tests and benchmarks.
+    
+    Every text maps to a fixed pseudo-random unit vector seeded by its hash,
+    so runs are reproducible without downloading a model; similarity between
+    vectors carries no meaning. ``latency`` seconds per call imitates the
+    cost of a forward pass.
+    """
+    def __init__(self, size: int = 384, latency: float = 0.0):
+        self.size = size
+        self.latency = latency
+    
+    def _vector(self, text: str) -> List[float]:
+        rng = np.random.default_rng(int(text_hash(text)[:16], 16))
+        vector = rng.standard_normal(self.size).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+class EmbeddingService(Embeddings):
+    """
+    Embeds chunks in explicit batches with a bounded thread count.
+    
+    Chunk vectors are looked up in the optional ``EmbeddingStore`` first, so
+    only texts the model has never seen are encoded; queries always go to the
+    model. The model is loaded on first use, after capping the intra-op
+    thread pools so several workers on one host do not oversubscribe the CPU.
+    """
+    def __init__(self, model_name: str, batch_size: int = 32, num_threads: Optional[int] = None,
+                 device: str = "cpu", store: Optional[EmbeddingStore] = None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads or default_num_threads()
+        self.device = device
+        self.store = store
+        self._model = None
+        self._model_lock = threading.Lock()
+        
+        self._stats_lock = threading.Lock()
+        self.store_hits = 0
+        self.embedded = 0
+        self.queries = 0
+        self.batches = 0
+        self.embed_seconds = 0.0
+    
+    def _load_model(self):
+        with self._model_lock:
+            if self._model is None and self.model_name == FAKE_EMBEDDING_MODEL:
+                self._model = HashEmbeddings(
+                    size=int(os.getenv("FAKE_EMBEDDING_SIZE", 384)),
+                    latency=float(os.getenv("FAKE_EMBEDDING_LATENCY", 0))
+                )
+                logging.info("Using offline hash embeddings instead of a model")
+            elif self._model is None:
+                # Read by the OpenMP/MKL runtimes when torch is first imported
+                for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+                    os.environ.setdefault(variable, str(self.num_threads))
+                from langchain_community.embeddings import HuggingFaceEmbeddings
+                try:
+                    import torch
+                    torch.set_num_threads(self.num_threads)
+                except ImportError:
+                    pass
+                self._model = HuggingFaceEmbeddings(
+                    model_name=self.model_name,
+                    model_kwargs={"device": self.device},
+                    encode_kwargs={"batch_size": self.batch_size}
+                )
+                logging.info(f"Loaded embedding model {self.model_name} on {self.device} with {self.num_threads} threads")
+        return self._model
+    
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        model = self._model or self._load_model()
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            began = time.perf_counter()
+            vectors.extend(model.embed_documents(batch))
+            with self._stats_lock:
+                self.embed_seconds += time.perf_counter() - began
+                self.embedded += len(batch)
+                self.batches += 1
+        return vectors
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed chunks, reusing stored vectors for chunks seen before.
+        
+        Args:
+            texts: The chunk texts
+        
+        Returns:
+            One vector per text, in order
+        """
+        if self.store is None:
+            return self._encode(list(texts))
+        
+        hashes = [text_hash(text) for text in texts]
+        found = self.store.get_many(self.model_name, sorted(set(hashes)))
+        # Identical texts within the call are only encoded once
+        missing = {digest: text for digest, text in zip(hashes, texts) if digest not in found}
+        if missing:
+            encoded = self._encode(list(missing.values()))
+            new = {digest: np.asarray(vector, dtype=np.float32) for digest, vector in zip(missing, encoded)}
+            self.store.put_many(self.model_name, new)
+            found.update(new)
+        with self._stats_lock:
+            self.store_hits += len(texts) - len(missing)
+        return [found[digest].tolist() for digest in hashes]
+    
+    def load_model(self):
+        """
+        Load the model now rather than on the first embedding.
+        """
+        return self._model or self._load_model()
+    
+    def embed_query(self, text: str) -> List[float]:
+        model = self._model or self._load_model()
+        with self._stats_lock:
+            self.queries += 1
+        return model.embed_query(text)
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries in one forward pass.
+        
+        Sentence-transformers models encode queries and documents the same
+        way, so this is the batched equivalent of ``embed_query``.
+        """
+        model = self._model or self._load_model()
+        with self._stats_lock:
+            self.queries += len(texts)
+        return model.embed_documents([text.replace("\n", " ") for text in texts])
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report store reuse and model throughput.
+        """
+        with self._stats_lock:
+            return {
+                "model": self.model_name,
+                "device": self.device,
+                "threads": self.num_threads,
+                "batch_size": self.batch_size,
+                "store": self.store.db_path if self.store is not None else None,
+                "store_hits": self.store_hits,
+                "embedded_chunks": self.embedded,
+                "embedded_queries": self.queries,
+                "batches": self.batches,
+                "chunks_per_second": self.embedded / self.embed_seconds if self.embed_seconds else 0.0,
+            }
+
+def create_embedding_service(model_name: str, default_store_path: Optional[str] = None) -> EmbeddingService:
+    """
+    Create the embedding service configured by environment variables.
+    
+    Args:
+        model_name: The sentence-transformers model to load
+        default_store_path: Store file used when EMBEDDING_STORE_PATH is unset
+    
+    Returns:
+        An EmbeddingService, backed by the on-disk store unless it is disabled
+        with an empty EMBEDDING_STORE_PATH or cannot be opened
+    """
+    store_path = os.getenv("EMBEDDING_STORE_PATH", default_store_path or "")
+    store = None
+    if store_path:
+        try:
+            store = EmbeddingStore(store_path)
+        except Exception as e:
+            logging.warning(f"Could not open embedding store {store_path}, embedding without it: {e}")
+    
+    threads = os.getenv("EMBEDDING_THREADS")
+    return EmbeddingService(
+        model_name,
+        batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", 32)),
+        num_threads=int(threads) if threads else None,
+        device=os.getenv("EMBEDDING_DEVICE", "cpu"),
+        store=store
+    )
+
+class QueryBatcher:
+    """
+    Async micro-batcher for query embeddings.
+    
+    Concurrent requests each embed a single short query, which leaves most
+    of the model's throughput unused. Queries submitted within ``max_wait``
+    seconds of the first pending one, up to ``max_batch`` of them, are
+    embedded together in one forward pass on ``executor`` and the vectors
+    are handed back to each waiting caller. Identical queries in a batch
+    are embedded once.
+    """
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]], max_batch: int = 16,
+                 max_wait: float = 0.005, executor: Optional[Executor] = None):
+        self.embed_batch = embed_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = executor
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Keeps running batches referenced until they finish
+        self._tasks = set()
+        
+        self.queries = 0
+        self.batches = 0
+        self.largest_batch = 0
+    
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a query as part of the next batch.
+        
+        Args:
+            text: The query to embed
+        
+        Returns:
+            The query embedding as a float32 vector
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.queries += 1
+        if len(self._pending) >= self.max_batch or self.max_wait <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            loop = asyncio.get_running_loop()
+            vectors = await loop.run_in_executor(self.executor, self.embed_batch, texts)
+            by_text = {text: np.asarray(vector, dtype=np.float32) for text, vector in zip(texts, vectors)}
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, future in batch:
+            # A caller may have been cancelled while the batch ran
+            if not future.done():
+                future.set_result(by_text[text])
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report how many queries were embedded per forward pass.
+        """
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queries": self.queries,
+            "batches": self.batches,
+            "avg_batch_size": self.queries / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
\ No newline at end of file
@@ -0,0 +1,159 @@
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, Tuple
+import hashlib
+import json
+import os
+from langchain_core.documents import Document
+from .utils import format_project_data, load_json_data, load_projects, project_title
+
+# Document types produced by the pipeline, used for metadata-filtered search
+RESUME = "resume"
+PROJECT = "project"
+SKILL = "skill"
+BIO = "bio"
+EXPERIENCE = "experience"
+EDUCATION = "education"
+CONTACT = "contact"
+
+# Each item is a (stable document id, document) pair; ids stay the same for
+# unchanged records so an index can be updated record by record
+IngestedDocument = Tuple[str, Document]
+
+def _document(doc_id: str, text: str, doc_type: str, source: str, **metadata: Any) -> IngestedDocument:
+    return doc_id, Document(
+        page_content=text,
+        metadata={"type": doc_type, "source": os.path.basename(source), **metadata}
+    )
+
+def content_hash(doc: Document) -> str:
+    """
+    Hash a document's text and metadata, so unchanged records can keep their embeddings.
+    """
+    digest = hashlib.sha256(doc.page_content.encode("utf-8"))
+    digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+def iter_resume_documents(pdf_path: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[IngestedDocument]:
+    """
+    Parse the resume page by page and yield its chunks.
+    
+    Args:
+        pdf_path: Path to the resume PDF
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Characters shared between consecutive chunks
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for page_number, page in enumerate(PyPDFLoader(pdf_path).lazy_load()):
+        for chunk_number, chunk in enumerate(splitter.split_documents([page])):
+            yield _document(
+                f"resume:{page_number}:{chunk_number}", chunk.page_content, RESUME, pdf_path,
+                page=chunk.metadata.get("page", page_number)
+            )
+
+def iter_project_documents(projects_path: str) -> Iterator[IngestedDocument]:
+    """
+    Yield one document per project in projects.json.
+    
+    Documents are keyed on the project's id, or else its title, so reordering
+    the file keeps every project's embedding.
+    """
+    seen = set()
+    for position, project in enumerate(load_projects(projects_path)):
+        title = project_title(project)
+        project_id = str(project.get("id", title or position))
+        if project_id in seen:
+            project_id = f"{project_id}:{position}"
+        seen.add(project_id)
+        yield _document(
+            f"project:{project_id}", format_project_data(project).strip(), PROJECT, projects_path,
+            title=title,
+            technologies=list(project.get("technologies", [])),
+            github=project.get("github", "")
+        )
+
+def iter_personal_documents(personal_info_path: str) -> Iterator[IngestedDocument]:
+    """
+    Yield the bio, one document per skill category, experience and education
+    entry, and the contact details from personal_info.json.
+    """
+    info = load_json_data(personal_info_path)
+    name = info.get("name", "the portfolio owner")
+    
+    bio = " ".join(part for part in (
+        f"{name} is a {info['title']}." if info.get("title") else "",
+        info.get("summary", ""),
+    ) if part)
+    if bio:
+        yield _document("bio", bio, BIO, personal_info_path)
+    
+    skills = info.get("skills") or {}
+    categories = skills.items() if isinstance(skills, Mapping) else (
+        (entry.get("category", ""), entry.get("items", ())) for entry in skills
+    )
+    for category, items in categories:
+        label = category.replace("_", " ").title()
+        yield _document(
+            f"skill:{category}", f"{label} skills: {', '.join(items)}", SKILL, personal_info_path,
+            category=category
+        )
+    
+    for position, job in enumerate(info.get("experience", [])):
+        text = f"{job.get('title', '')} at {job.get('company', '')} ({job.get('period', '')}): {job.get('description', '')}"
+        yield _document(f"experience:{position}", text, EXPERIENCE, personal_info_path, company=job.get("company", ""))
+    
+    for position, entry in enumerate(info.get("education", [])):
+        parts = [entry.get("degree", ""), entry.get("institution", ""), str(entry.get("year", ""))]
+        if entry.get("specialization"):
+            parts.append(f"specialization in {entry['specialization']}")
+        yield _document(f"education:{position}", ", ".join(p for p in parts if p), EDUCATION, personal_info_path)
+    
+    contact = info.get("contact") or {}
+    if contact:
+        text = "Contact: " + ", ".join(f"{key}: {value}" for key, value in contact.items() if value)
+        yield _document("contact", text, CONTACT, personal_info_path)
+
+def iter_source_documents(path: str, pdf_path: Optional[str], projects_path: Optional[str],
+                          chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[IngestedDocument]:
+    """
+    Stream the documents of a single source file.
+    
+    Args:
+        path: The source to parse; one of the resume, projects or personal info paths
+        pdf_path: The configured resume path
+        projects_path: The configured projects.json path
+        chunk_size: Maximum characters per resume chunk
+        chunk_overlap: Characters shared between consecutive resume chunks
+    """
+    if not os.path.exists(path):
+        return iter(())
+    if path == pdf_path:
+        return iter_resume_documents(path, chunk_size, chunk_overlap)
+    if path == projects_path:
+        return iter_project_documents(path)
+    return iter_personal_documents(path)
+
+def iter_documents(pdf_path: Optional[str], projects_path: Optional[str], personal_info_path: Optional[str],
+                   chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[IngestedDocument]:
+    """
+    Stream documents from every configured source, one record at a time.
+    """
+    if pdf_path:
+        yield from iter_resume_documents(pdf_path, chunk_size, chunk_overlap)
+    if projects_path and os.path.exists(projects_path):
+        yield from iter_project_documents(projects_path)
+    if personal_info_path and os.path.exists(personal_info_path):
+        yield from iter_personal_documents(personal_info_path)
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Group an iterable into lists of at most ``size`` items.
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
\ No newline at end of file
@@ -0,0 +1,154 @@
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import re
+
+# Words are runs of letters/digits, keeping apostrophes so "what's" stays one token
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Single-word keywords at least this long also match their common inflections
+# ("project" -> "projects", "work" -> "worked"). Shorter ones such as "hi" would
+# collide with unrelated words ("his"), so they only match exactly.
+INFLECT_MIN_LENGTH = 4
+INFLECTIONS = ("s", "es", "d", "ed", "ing")
+
+class IntentRule(NamedTuple):
+    """
+    Keywords for one intent.
+    
+    Keywords may be multi-word phrases. If ``max_words`` is set, the rule only
+    applies to queries with at most that many words.
+    """
+    intent: str
+    keywords: Sequence[str]
+    max_words: Optional[int] = None
+
+class IntentMatch(NamedTuple):
+    intent: str
+    # Share of all keyword hits in the query that belong to the chosen intent
+    confidence: float
+
+# Rules in priority order: when a query matches several intents, the first wins
+DEFAULT_INTENT_RULES = (
+    IntentRule("greeting", ["hello", "hi", "hey", "greetings", "good morning", "good afternoon", "good evening"], max_words=4),
+    IntentRule("about_me", ["who are you", "about you", "your background", "your skills", "tell me about yourself"]),
+    IntentRule("projects", ["project", "portfolio", "work", "built", "created", "developed", "showcase"]),
+    IntentRule("contact", ["contact", "email", "reach", "connect"]),
+    IntentRule("resume", ["resume", "experience", "skill", "education", "qualification", "background"]),
+)
+
+# Pre-rendered response that answers each intent without the LLM or
+# retrieval; resume questions get the about-me summary
+DETERMINISTIC_RESPONSES = {
+    "about_me": "about_me",
+    "resume": "about_me",
+    "projects": "projects",
+    "contact": "contact",
+}
+
+# Words that name no subject of their own in questions such as "What
+# projects have you built?" or "How can I contact you?"
+FILLER_WORDS = frozenset("""
+    a about address all an any are can could detail details did do does done for from give have how i i'd i'm
+    info information is it list me more my number of on please see share show some tell the there to what
+    what's which who would you you've your yours
+""".split())
+
+class IntentMatcher:
+    """
+    Word-boundary-aware keyword intent classifier.
+    
+    All keyword phrases are compiled into one hash table of word n-grams at
+    construction time. Matching tokenizes the query once and looks up each
+    n-gram up to the longest phrase length, so the cost per query depends on
+    the query length but not on how many keywords are configured.
+    """
+    def __init__(self, rules: Sequence[IntentRule] = DEFAULT_INTENT_RULES, fallback: str = "general"):
+        self.rules = tuple(rules)
+        self.fallback = fallback
+        self._phrases: Dict[Tuple[str, ...], Tuple[int, ...]] = {}
+        self.max_phrase_words = 1
+        
+        phrases: Dict[Tuple[str, ...], List[int]] = {}
+        for rule_index, rule in enumerate(self.rules):
+            for keyword in rule.keywords:
+                for phrase in self._expand(keyword):
+                    indices = phrases.setdefault(phrase, [])
+                    if rule_index not in indices:
+                        indices.append(rule_index)
+                    self.max_phrase_words = max(self.max_phrase_words, len(phrase))
+        
+        self._phrases = {phrase: tuple(indices) for phrase, indices in phrases.items()}
+        # Most query words start no phrase; they are skipped with one set lookup
+        self._first_words = frozenset(phrase[0] for phrase in self._phrases)
+    
+    @staticmethod
+    def _expand(keyword: str) -> List[Tuple[str, ...]]:
+        words = tuple(WORD_RE.findall(keyword.lower()))
+        if not words:
+            return []
+        if len(words) > 1 or len(words[0]) < INFLECT_MIN_LENGTH:
+            return [words]
+        return [words] + [(words[0] + suffix,) for suffix in INFLECTIONS]
+    
+    def match(self, query: str) -> IntentMatch:
+        """
+        Classify a query in a single pass over its words.
+        
+        Args:
+            query: The user's message
+        
+        Returns:
+            The highest-priority matching intent and its confidence, or the
+            fallback intent with confidence 0.0 if nothing matched
+        """
+        tokens = WORD_RE.findall(query.lower())
+        hits = [0] * len(self.rules)
+        total = 0
+        
+        for start, token in enumerate(tokens):
+            if token not in self._first_words:
+                continue
+            for length in range(1, min(self.max_phrase_words, len(tokens) - start) + 1):
+                rule_indices = self._phrases.get(tuple(tokens[start:start + length]))
+                if rule_indices:
+                    for rule_index in rule_indices:
+                        max_words = self.rules[rule_index].max_words
+                        if max_words is None or len(tokens) <= max_words:
+                            hits[rule_index] += 1
+                            total += 1
+        
+        for rule_index, count in enumerate(hits):
+            if count:
+                return IntentMatch(self.rules[rule_index].intent, count / total)
+        return IntentMatch(self.fallback, 0.0)
+    
+    def subject_words(self, query: str) -> List[str]:
+        """
+        Words of a query that are neither intent keywords nor filler words.
+        
+        Args:
+            query: The user's message
+        
+        Returns:
+            The remaining words; none means the query asks about a topic as a
+            whole ("Show me your projects") rather than something specific
+            within it ("Which projects use FastAPI?")
+        """
+        tokens = WORD_RE.findall(query.lower())
+        covered = [False] * len(tokens)
+        
+        for start, token in enumerate(tokens):
+            if token not in self._first_words:
+                continue
+            for length in range(1, min(self.max_phrase_words, len(tokens) - start) + 1):
+                if tuple(tokens[start:start + length]) in self._phrases:
+                    covered[start:start + length] = [True] * length
+        
+        return [token for token, is_keyword in zip(tokens, covered) if not is_keyword and token not in FILLER_WORDS]
+
+@lru_cache(maxsize=None)
+def get_intent_matcher() -> IntentMatcher:
+    """
+    Get the process-wide intent matcher built from DEFAULT_INTENT_RULES.
+    """
+    return IntentMatcher()
\ No newline at end of file
@@ -1,52 +1,548 @@
-from langchain_groq import ChatGroq
+import asyncio
+import hashlib
+import json
+import logging
 import os
-from typing import List, Dict, Any
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Iterator, List, Dict, Any, NamedTuple, Optional, Sequence, Tuple
 from langchain_core.messages import HumanMessage, AIMessage
+import faiss
+import numpy as np
+from . import telemetry
+from .llm_providers import LLMProvider, get_provider
+from .utils import get_data_path
 
-class LLMManager:
+ERROR_RESPONSE = "I'm sorry, I encountered an error while processing your request."
+
+class CacheLookup(NamedTuple):
+    """
+    Result of a response cache lookup.
+    
+    The key and normalized query vector are kept so a miss can be stored
+    without hashing the prompt or normalizing the vector a second time.
     """
-    Manages interactions with the LLM provider.
-    Currently supports Groq, but can be extended to support other providers.
+    response: Optional[str]
+    key: str
+    scope: str
+    query_vector: Optional[np.ndarray]
+
+class ResponseCache:
+    """
+    Two-layer cache for LLM responses.
+    
+    The exact layer is keyed on the normalized prompt and model parameters.
+    The semantic layer takes the query embedding retrieval already computed
+    and returns a cached answer when a previous query is at least
+    ``similarity_threshold`` cosine-similar; it never embeds queries itself.
+    Both layers share LRU and TTL eviction and are cleared whenever one of
+    the watched source files changes.
     """
-    def __init__(self):
-        self.provider = os.getenv('LLM_PROVIDER', 'groq')
-        self.model_name = os.getenv('MODEL_NAME', 'llama2-70b-4096')
-        self.api_key = os.getenv('GROQ_API_KEY')
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600,
+                 similarity_threshold: float = 0.92, check_interval: float = 2.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.check_interval = check_interval
+        
+        self._lock = threading.Lock()
+        # key -> (response, created_at, semantic id or None)
+        self._entries: "OrderedDict[str, Tuple[str, float, Optional[int]]]" = OrderedDict()
+        # semantic id -> (exact key, params scope), to map FAISS hits back to entries
+        self._semantic_keys: Dict[int, Tuple[str, str]] = {}
+        self._semantic_index = None
+        self._next_id = 0
+        
+        self._watch_paths: List[str] = []
+        self._fingerprint = ()
+        self._last_check = 0.0
+        
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def watch(self, *paths: str):
+        """
+        Invalidate the cache whenever any of ``paths`` changes on disk.
+        """
+        with self._lock:
+            self._watch_paths.extend(p for p in paths if p and p not in self._watch_paths)
+            self._fingerprint = self._compute_fingerprint()
+    
+    def _compute_fingerprint(self):
+        fingerprint = []
+        for path in self._watch_paths:
+            try:
+                stat = os.stat(path)
+                fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                fingerprint.append((path, None, None))
+        return tuple(fingerprint)
+    
+    def _check_sources(self, now: float):
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        fingerprint = self._compute_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._clear()
+            self.invalidations += 1
+    
+    def _clear(self):
+        self._entries.clear()
+        self._semantic_keys.clear()
+        if self._semantic_index is not None:
+            self._semantic_index.reset()
+    
+    def _drop(self, key: str):
+        _, _, semantic_id = self._entries.pop(key)
+        if semantic_id is not None:
+            self._semantic_keys.pop(semantic_id, None)
+            self._semantic_index.remove_ids(np.array([semantic_id], dtype=np.int64))
+    
+    def _get_entry(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl_seconds:
+            self._drop(key)
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+    
+    @staticmethod
+    def make_key(prompt: str, scope: str) -> str:
+        """
+        Build the exact-match key from a whitespace- and case-normalized prompt.
+        """
+        normalized = re.sub(r"\s+", " ", prompt).strip().lower()
+        return hashlib.sha256((scope + "\n" + normalized).encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def lookup(self, prompt: str, params: Dict[str, Any], query_vector: Optional[np.ndarray] = None) -> CacheLookup:
+        """
+        Look up a cached response.
+        
+        Args:
+            prompt: The full prompt that would be sent to the LLM
+            params: Model parameters that affect the response
+            query_vector: The user's query embedding, for the semantic layer.
+                Only pass it when the answer does not depend on earlier
+                conversation turns.
+        
+        Returns:
+            A CacheLookup whose response is None on a miss
+        """
+        scope = json.dumps(params, sort_keys=True)
+        key = self.make_key(prompt, scope)
+        now = time.monotonic()
+        with self._lock:
+            self._check_sources(now)
+            response = self._get_entry(key, now)
+            if response is not None:
+                self.exact_hits += 1
+                return CacheLookup(response, key, scope, None)
         
-        if not self.api_key:
-            raise ValueError("LLM API key not found in environment variables")
+        if query_vector is not None:
+            query_vector = self._normalize(query_vector)
+            with self._lock:
+                index = self._semantic_index
+                if index is not None and index.ntotal:
+                    scores, ids = index.search(query_vector.reshape(1, -1), 1)
+                    semantic_key, semantic_scope = self._semantic_keys.get(int(ids[0][0]), (None, None))
+                    if semantic_scope == scope and scores[0][0] >= self.similarity_threshold:
+                        response = self._get_entry(semantic_key, now)
+                        if response is not None:
+                            self.semantic_hits += 1
+                            return CacheLookup(response, key, scope, query_vector)
+        
+        with self._lock:
+            self.misses += 1
+        return CacheLookup(None, key, scope, query_vector)
+    
+    def store(self, lookup: CacheLookup, response: str):
+        """
+        Store the response for a previous cache miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if lookup.key in self._entries:
+                self._drop(lookup.key)
             
-        self.llm = self._initialize_llm()
+            semantic_id = None
+            if lookup.query_vector is not None:
+                if self._semantic_index is None:
+                    self._semantic_index = faiss.IndexIDMap2(faiss.IndexFlatIP(lookup.query_vector.shape[0]))
+                semantic_id = self._next_id
+                self._next_id += 1
+                self._semantic_index.add_with_ids(
+                    lookup.query_vector.reshape(1, -1), np.array([semantic_id], dtype=np.int64)
+                )
+                self._semantic_keys[semantic_id] = (lookup.key, lookup.scope)
+            
+            self._entries[lookup.key] = (response, now, semantic_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report hit/miss counters and cache size.
+        """
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "semantic_entries": len(self._semantic_keys),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+class LLMManager:
+    """
+    Manages interactions with the LLM providers.
+    
+    Requests go to the providers in LLM_PROVIDER, LLM_FALLBACK_PROVIDERS order,
+    skipping any whose circuit breaker is open and failing over to the next
+    one on errors. With LLM_HEDGE enabled, a streamed request that has not
+    produced its first token within the primary's p95 time-to-first-token is
+    raced against the next provider, and the slower stream is cancelled.
+    """
+    def __init__(self, providers: Optional[Sequence[LLMProvider]] = None):
+        """
+        Args:
+            providers: Providers in failover order; defaults to the shared
+                instances named by LLM_PROVIDER and LLM_FALLBACK_PROVIDERS
+        """
+        if providers is None:
+            names = [os.getenv('LLM_PROVIDER', 'groq')]
+            names += [n for n in os.getenv('LLM_FALLBACK_PROVIDERS', '').split(',') if n.strip()]
+            providers = []
+            for name in names:
+                provider = get_provider(name.strip())
+                if provider not in providers:
+                    providers.append(provider)
+        self.providers = list(providers)
+        
+        # The primary provider's settings define the response cache scope
+        self.llm = self.providers[0]
+        self.provider = self.llm.name
+        self.model_name = self.llm.model_name
+        self.temperature = self.llm.temperature
+        
+        self.hedge_enabled = os.getenv('LLM_HEDGE', 'false').lower() in ('true', '1', 't')
+        # Hedge deadline used until a provider has enough first-token samples for a p95
+        self.hedge_delay = float(os.getenv('LLM_HEDGE_DELAY', 1.0))
+        self.hedge_min_samples = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20))
+        self.failovers = 0
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        
+        self.cache_enabled = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() in ('true', '1', 't')
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', 512)),
+            ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+            similarity_threshold=float(os.getenv('RESPONSE_CACHE_SIMILARITY', 0.92))
+        )
+        # Cached answers are stale as soon as the portfolio data changes
+        self.response_cache.watch(get_data_path("projects.json"), get_data_path("personal_info.json"))
+    
+    def _candidates(self) -> Iterator[LLMProvider]:
+        """
+        Yield providers in failover order, skipping those with an open breaker.
+        
+        Breakers are checked lazily, so a half-open provider only gets its trial
+        request when the chain actually reaches it.
+        """
+        for provider in self.providers:
+            if provider.breaker.allow():
+                yield provider
     
-    def _initialize_llm(self):
+    def _hedge_deadline(self, provider: LLMProvider) -> float:
         """
-        Initialize the LLM based on the provider specified in environment variables.
+        Time to wait for the provider's first token before hedging.
         """
-        if self.provider.lower() == 'groq':
-            return ChatGroq(
-                groq_api_key=self.api_key,
-                model_name=self.model_name,
-                temperature=0.7
-            )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        if len(provider.first_token_latency) >= self.hedge_min_samples:
+            return provider.first_token_latency.percentile(0.95)
+        return self.hedge_delay
     
-    def generate_response(self, prompt: str) -> str:
+    def _invoke_with_failover(self, input: Any) -> str:
+        """
+        Generate a completion, trying each available provider in turn.
+        
+        Raises:
+            The last provider error if every provider failed or none was available
+        """
+        last_error = None
+        start = time.perf_counter()
+        for attempt, provider in enumerate(self._candidates()):
+            if attempt:
+                self.failovers += 1
+            try:
+                response = provider.invoke(input)
+            except Exception as e:
+                logging.warning(f"LLM provider {provider.name} failed: {e}")
+                provider.breaker.record_failure()
+                last_error = e
+                continue
+            provider.breaker.record_success()
+            telemetry.record("llm", time.perf_counter() - start, telemetry.LLM_SECONDS, provider=provider.name)
+            return response
+        raise last_error or RuntimeError("No LLM provider available")
+    
+    async def _open_stream(self, provider: LLMProvider, input: Any):
+        """
+        Start a stream and wait for its first chunk.
+        
+        The first chunk proves the provider healthy, so its breaker is closed
+        right away; whatever later happens to the stream (hedge loss, client
+        disconnect) cannot leave a half-open breaker without an outcome.
+        
+        Returns:
+            A (provider, stream, first chunk) tuple
+        """
+        stream = provider.astream(input).__aiter__()
+        start = time.perf_counter()
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = ""
+        except asyncio.CancelledError:
+            await stream.aclose()
+            raise
+        except Exception:
+            provider.breaker.record_failure()
+            raise
+        provider.breaker.record_success()
+        provider.first_token_latency.record(time.perf_counter() - start)
+        return provider, stream, first
+    
+    async def _start_stream(self, input: Any):
+        """
+        Open a stream on the first provider that produces a token.
+        
+        Providers are tried in failover order. When hedging is enabled and the
+        current provider misses its first-token deadline, the next provider is
+        started as well; whichever answers first wins and the other is cancelled.
+        
+        Returns:
+            A (provider, stream, first chunk) tuple
+        """
+        candidates = self._candidates()
+        pending = set()
+        primary = None
+        hedged = False
+        last_error = None
+        
+        def launch() -> bool:
+            provider = next(candidates, None)
+            if provider is None:
+                return False
+            task = asyncio.ensure_future(self._open_stream(provider, input))
+            task.provider = provider
+            pending.add(task)
+            return True
+        
+        try:
+            if launch():
+                primary = next(iter(pending)).provider
+            while pending:
+                timeout = None
+                if self.hedge_enabled and not hedged and len(pending) == 1:
+                    timeout = self._hedge_deadline(next(iter(pending)).provider)
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    # The primary is slower than usual: race the next provider
+                    hedged = True
+                    if launch():
+                        self.hedged_requests += 1
+                    continue
+                
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        if hedged and task.provider is not primary:
+                            self.hedge_wins += 1
+                        pending.update(t for t in done if t is not task)
+                        return task.result()
+                    last_error = task.exception()
+                    logging.warning(f"LLM provider {task.provider.name} failed: {last_error}")
+                
+                if not pending and launch():
+                    self.failovers += 1
+            raise last_error or RuntimeError("No LLM provider available")
+        finally:
+            # Cancel the losers so they release their connections and concurrency slots
+            losers = list(pending)
+            for task in losers:
+                task.cancel()
+            for task, result in zip(losers, await asyncio.gather(*losers, return_exceptions=True)):
+                if isinstance(result, tuple):
+                    await result[1].aclose()
+                elif isinstance(result, asyncio.CancelledError):
+                    # A cancelled half-open trial says nothing about the provider
+                    task.provider.breaker.release()
+    
+    async def _astream_llm(self, input: Any) -> AsyncIterator[str]:
+        """
+        Stream a completion with failover and optional hedging.
+        """
+        start = time.perf_counter()
+        provider, stream, first = await self._start_stream(input)
+        # Measured across failover and hedging: the wait the user sees
+        telemetry.record("llm_ttft", time.perf_counter() - start, telemetry.LLM_FIRST_TOKEN_SECONDS, provider=provider.name)
+        try:
+            if first:
+                yield first
+            async for chunk in stream:
+                yield chunk
+        except Exception:
+            provider.breaker.record_failure()
+            raise
+        finally:
+            await stream.aclose()
+        telemetry.record("llm", time.perf_counter() - start, telemetry.LLM_SECONDS, provider=provider.name)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report failover and hedging counters.
+        """
+        return {
+            "providers": [provider.name for provider in self.providers],
+            "failovers": self.failovers,
+            "hedge_enabled": self.hedge_enabled,
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins,
+        }
+    
+    def _cache_params(self) -> Dict[str, Any]:
+        """
+        Model parameters that are part of the response cache key.
+        """
+        return {"provider": self.provider, "model": self.model_name, "temperature": self.temperature}
+    
+    def generate_response(self, prompt: str, cache_vector: Optional[np.ndarray] = None,
+                          use_cache: bool = True) -> str:
         """
         Generate a response from the LLM based on the provided prompt.
         
         Args:
             prompt: The prompt to send to the LLM
-            
+            cache_vector: The user's query embedding, enabling semantic cache
+                lookups. Only pass it when the answer does not depend on history.
+            use_cache: Look the prompt up in and store the answer to the
+                response cache. Internal prompts that are never asked twice,
+                like conversation summaries, pass False.
+        
+        Returns:
+            The generated response as a string
+        """
+        lookup = None
+        if self.cache_enabled and use_cache:
+            with telemetry.timed("response_cache"):
+                lookup = self.response_cache.lookup(prompt, self._cache_params(), cache_vector)
+            if lookup.response is not None:
+                return lookup.response
+        
+        try:
+            response = self._invoke_with_failover(prompt)
+        except Exception as e:
+            logging.error(f"Error generating response from LLM: {e}")
+            return ERROR_RESPONSE
+        
+        if lookup is not None:
+            self.response_cache.store(lookup, response)
+        return response
+    
+    async def agenerate_response(self, prompt: str, cache_vector: Optional[np.ndarray] = None,
+                                 use_cache: bool = True) -> str:
+        """
+        Generate a response from the LLM without blocking the event loop.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            cache_vector: The user's query embedding, enabling semantic cache
+                lookups. Only pass it when the answer does not depend on history.
+            use_cache: Look the prompt up in and store the answer to the
+                response cache. Internal prompts that are never asked twice,
+                like conversation summaries, pass False.
+        
         Returns:
             The generated response as a string
         """
+        lookup = None
+        if self.cache_enabled and use_cache:
+            with telemetry.timed("response_cache"):
+                lookup = self.response_cache.lookup(prompt, self._cache_params(), cache_vector)
+            if lookup.response is not None:
+                return lookup.response
+        
+        try:
+            response = "".join([chunk async for chunk in self._astream_llm(prompt)])
+        except Exception as e:
+            logging.error(f"Error generating response from LLM: {e}")
+            return ERROR_RESPONSE
+        
+        if lookup is not None:
+            self.response_cache.store(lookup, response)
+        return response
+    
+    async def astream_response(self, prompt: str, cache_vector: Optional[np.ndarray] = None) -> AsyncIterator[str]:
+        """
+        Stream a response from the LLM token by token.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            cache_vector: The user's query embedding, enabling semantic cache
+                lookups. Only pass it when the answer does not depend on history.
+        
+        Yields:
+            Chunks of the generated response as they arrive
+        
+        Raises:
+            The provider's exception if it fails after chunks were yielded;
+            a failure before the first chunk yields ERROR_RESPONSE instead
+        """
+        lookup = None
+        if self.cache_enabled:
+            with telemetry.timed("response_cache"):
+                lookup = self.response_cache.lookup(prompt, self._cache_params(), cache_vector)
+            if lookup.response is not None:
+                yield lookup.response
+                return
+        
+        parts = []
         try:
-            response = self.llm.invoke(prompt)
-            return response.content
+            async for chunk in self._astream_llm(prompt):
+                parts.append(chunk)
+                yield chunk
         except Exception as e:
-            print(f"Error generating response from LLM: {e}")
-            return "I'm sorry, I encountered an error while processing your request."
+            logging.error(f"Error streaming response from LLM: {e}")
+            if parts:
+                # The caller has already sent part of the answer on; an
+                # apology appended to it would read as the model's own words
+                raise
+            yield ERROR_RESPONSE
+            return
+        
+        if lookup is not None and parts:
+            self.response_cache.store(lookup, "".join(parts))
     
     def generate_from_messages(self, messages: List[Dict[str, str]]) -> str:
         """
@@ -54,7 +550,7 @@ class LLMManager:
         
         Args:
             messages: A list of message dictionaries with 'role' and 'content' keys
-            
+        
         Returns:
             The generated response as a string
         """
@@ -67,8 +563,7 @@ class LLMManager:
                 elif msg['role'] == 'assistant':
                     lc_messages.append(AIMessage(content=msg['content']))
             
-            response = self.llm.invoke(lc_messages)
-            return response.content
+            return self._invoke_with_failover(lc_messages)
         except Exception as e:
-            print(f"Error generating response from LLM: {e}")
-            return "I'm sorry, I encountered an error while processing your request."
\ No newline at end of file
+            logging.error(f"Error generating response from LLM: {e}")
+            return ERROR_RESPONSE
\ No newline at end of file
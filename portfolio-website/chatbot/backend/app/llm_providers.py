@@ -0,0 +1,423 @@
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Type
+import asyncio
+import os
+import random
+import threading
+import time
+
+# Registered provider classes by name
+PROVIDERS: Dict[str, Type["LLMProvider"]] = {}
+
+# One provider instance per name per process, shared by every graph
+_instances: Dict[str, "LLMProvider"] = {}
+_instances_lock = threading.Lock()
+
+def register_provider(name: str) -> Callable[[Type["LLMProvider"]], Type["LLMProvider"]]:
+    """
+    Class decorator that makes a provider available to get_provider.
+    
+    Args:
+        name: The name used in LLM_PROVIDER to select the provider
+    """
+    def decorator(cls):
+        cls.name = name
+        PROVIDERS[name] = cls
+        return cls
+    return decorator
+
+def _input_text(input: Any) -> str:
+    """
+    Extract the text of the last message from a prompt string or message list.
+    """
+    if isinstance(input, str):
+        return input
+    if isinstance(input, (list, tuple)) and input:
+        last = input[-1]
+        return getattr(last, "content", None) or (last.get("content", "") if isinstance(last, dict) else str(last))
+    return str(input)
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of one provider.
+    
+    After ``failure_threshold`` failures in a row the breaker opens and the
+    provider is skipped for ``reset_timeout`` seconds. After that a single
+    trial request is let through (half-open); its outcome closes the breaker
+    again or reopens it for another ``reset_timeout``. A trial abandoned
+    before it has an outcome must be given back with ``release``, or the
+    provider would stay half-open and skipped for good.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """
+        Check whether a request may be sent to the provider now.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let exactly one trial request through
+                self.state = self.HALF_OPEN
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+    
+    def release(self):
+        """
+        Give back a request that ended without an outcome, such as a cancelled one.
+        
+        A half-open breaker reopens for another ``reset_timeout`` without
+        counting a failure, so a later request makes the next trial.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+class LatencyTracker:
+    """
+    Rolling window of recent latencies, in seconds.
+    """
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Get a percentile of the window, or None if no samples were recorded.
+        """
+        if not self._samples:
+            return None
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+class LLMProvider:
+    """
+    A chat model client with bounded concurrency.
+    
+    Each provider builds its client once, with its own HTTP connection pool,
+    timeouts and retries. Separate semaphores cap the requests in flight from
+    threads and from the event loop, so a burst of chats queues locally
+    instead of opening unbounded upstream connections. Each provider also
+    carries a circuit breaker and its recent time-to-first-token, which
+    LLMManager uses for failover and hedging.
+    """
+    name = "base"
+    default_model = ""
+    
+    def __init__(self, model_name: Optional[str] = None, temperature: float = 0.7, timeout: float = 30.0,
+                 max_concurrency: int = 8, max_connections: int = 16, max_retries: int = 2,
+                 breaker_failures: int = 3, breaker_reset: float = 30.0):
+        self.model_name = model_name or self.default_model
+        self.temperature = temperature
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        
+        self._sync_slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self.first_token_latency = LatencyTracker()
+        
+        self.client = self._create_client()
+    
+    def _create_client(self) -> Any:
+        """
+        Build the underlying chat model client.
+        """
+        raise NotImplementedError
+    
+    def _http_clients(self):
+        """
+        Create sync and async httpx clients with this provider's pool limits.
+        """
+        import httpx
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        return (
+            httpx.Client(limits=limits, timeout=self.timeout),
+            httpx.AsyncClient(limits=limits, timeout=self.timeout),
+        )
+    
+    def _start(self):
+        self.in_flight += 1
+        self.requests += 1
+    
+    def invoke(self, input: Any) -> str:
+        """
+        Generate a completion, blocking the calling thread.
+        
+        Args:
+            input: A prompt string or a list of LangChain messages
+        
+        Returns:
+            The completion text
+        """
+        with self._sync_slots:
+            self._start()
+            try:
+                return self.client.invoke(input).content
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+    
+    async def ainvoke(self, input: Any) -> str:
+        """
+        Generate a completion without blocking the event loop.
+        
+        Args:
+            input: A prompt string or a list of LangChain messages
+        
+        Returns:
+            The completion text
+        """
+        async with self._async_slots:
+            self._start()
+            try:
+                response = await self.client.ainvoke(input)
+                return response.content
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+    
+    async def astream(self, input: Any) -> AsyncIterator[str]:
+        """
+        Stream a completion; the concurrency slot is held until the stream ends.
+        
+        Args:
+            input: A prompt string or a list of LangChain messages
+        
+        Yields:
+            Chunks of the completion text
+        """
+        async with self._async_slots:
+            self._start()
+            try:
+                async for chunk in self.client.astream(input):
+                    if chunk.content:
+                        yield chunk.content
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report usage counters for this provider.
+        """
+        return {
+            "model": self.model_name,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "errors": self.errors,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "first_token_p95": self.first_token_latency.percentile(0.95),
+        }
+
+@register_provider("groq")
+class GroqProvider(LLMProvider):
+    default_model = "llama2-70b-4096"
+    
+    def _create_client(self):
+        import groq
+        from langchain_groq import ChatGroq
+        
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("LLM API key not found in environment variables")
+        
+        # ChatGroq would share one http_client between its sync and async SDK
+        # clients, so build both SDK clients with their own pools here
+        http_client, http_async_client = self._http_clients()
+        client_params = {"api_key": api_key, "timeout": self.timeout, "max_retries": self.max_retries}
+        return ChatGroq(
+            groq_api_key=api_key,
+            model_name=self.model_name,
+            temperature=self.temperature,
+            client=groq.Groq(http_client=http_client, **client_params).chat.completions,
+            async_client=groq.AsyncGroq(http_client=http_async_client, **client_params).chat.completions
+        )
+
+@register_provider("openai")
+class OpenAIProvider(LLMProvider):
+    default_model = "gpt-3.5-turbo"
+    
+    def _create_client(self):
+        import openai
+        from langchain_openai import ChatOpenAI
+        
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("LLM API key not found in environment variables")
+        
+        http_client, http_async_client = self._http_clients()
+        client_params = {"api_key": api_key, "timeout": self.timeout, "max_retries": self.max_retries}
+        return ChatOpenAI(
+            openai_api_key=api_key,
+            model_name=self.model_name,
+            temperature=self.temperature,
+            client=openai.OpenAI(http_client=http_client, **client_params).chat.completions,
+            async_client=openai.AsyncOpenAI(http_client=http_async_client, **client_params).chat.completions
+        )
+
+@register_provider("fake")
+class FakeProvider(LLMProvider):
+    """
+    Local provider that echoes the last message back, for tests and benchmarks.
+    
+    ``latency`` is the delay before the first token and ``token_delay`` the
+    delay between streamed tokens; neither needs network access or a key.
+    ``error_rate`` is the probability that a request fails before its first
+    token, to exercise failover, and ``fail_after`` makes every stream fail
+    once it has produced that many tokens, to exercise interrupted answers.
+    """
+    default_model = "echo"
+    
+    def __init__(self, latency: Optional[float] = None, token_delay: Optional[float] = None,
+                 response: Optional[str] = None, error_rate: Optional[float] = None,
+                 name: Optional[str] = None, fail_after: Optional[int] = None, **kwargs):
+        self.latency = float(os.getenv("FAKE_LLM_LATENCY", 0)) if latency is None else latency
+        self.token_delay = float(os.getenv("FAKE_LLM_TOKEN_DELAY", 0)) if token_delay is None else token_delay
+        self.error_rate = float(os.getenv("FAKE_LLM_ERROR_RATE", 0)) if error_rate is None else error_rate
+        self.response = response
+        self.fail_after = fail_after
+        if name:
+            self.name = name
+        super().__init__(**kwargs)
+    
+    def _create_client(self):
+        return None
+    
+    def _complete(self, input: Any) -> str:
+        if self.response is not None:
+            return self.response
+        return f"Echo: {_input_text(input)[-200:].strip()}"
+    
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            raise ConnectionError(f"Injected failure from fake provider {self.name}")
+    
+    def invoke(self, input: Any) -> str:
+        with self._sync_slots:
+            self._start()
+            try:
+                time.sleep(self.latency)
+                self._maybe_fail()
+                time.sleep(self.token_delay * len(self._complete(input).split()))
+                return self._complete(input)
+            finally:
+                self.in_flight -= 1
+    
+    async def ainvoke(self, input: Any) -> str:
+        async with self._async_slots:
+            self._start()
+            try:
+                await asyncio.sleep(self.latency)
+                self._maybe_fail()
+                await asyncio.sleep(self.token_delay * len(self._complete(input).split()))
+                return self._complete(input)
+            finally:
+                self.in_flight -= 1
+    
+    async def astream(self, input: Any) -> AsyncIterator[str]:
+        async with self._async_slots:
+            self._start()
+            try:
+                await asyncio.sleep(self.latency)
+                self._maybe_fail()
+                for index, word in enumerate(self._complete(input).split(" ")):
+                    if index == self.fail_after:
+                        self.errors += 1
+                        raise ConnectionError(f"Injected mid-stream failure from fake provider {self.name}")
+                    if index:
+                        await asyncio.sleep(self.token_delay)
+                    yield word if index == 0 else " " + word
+            finally:
+                self.in_flight -= 1
+
+def provider_settings() -> Dict[str, Any]:
+    """
+    Read the shared provider settings from the environment.
+    """
+    return {
+        "temperature": float(os.getenv("LLM_TEMPERATURE", 0.7)),
+        "timeout": float(os.getenv("LLM_TIMEOUT", 30)),
+        "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+        "max_connections": int(os.getenv("LLM_MAX_CONNECTIONS", 16)),
+        "max_retries": int(os.getenv("LLM_MAX_RETRIES", 2)),
+        "breaker_failures": int(os.getenv("LLM_BREAKER_FAILURES", 3)),
+        "breaker_reset": float(os.getenv("LLM_BREAKER_RESET", 30)),
+    }
+
+def get_provider(name: Optional[str] = None) -> LLMProvider:
+    """
+    Get the process-wide instance of a provider, creating it on first use.
+    
+    Args:
+        name: Registered provider name; defaults to LLM_PROVIDER (or "groq")
+    
+    Returns:
+        The shared provider instance
+    """
+    name = (name or os.getenv("LLM_PROVIDER", "groq")).lower()
+    provider = _instances.get(name)
+    if provider is not None:
+        return provider
+    
+    with _instances_lock:
+        if name not in _instances:
+            if name not in PROVIDERS:
+                raise ValueError(f"Unsupported LLM provider: {name}")
+            settings = provider_settings()
+            if name == os.getenv("LLM_PROVIDER", "groq").lower() and os.getenv("MODEL_NAME"):
+                settings["model_name"] = os.getenv("MODEL_NAME")
+            _instances[name] = PROVIDERS[name](**settings)
+        return _instances[name]
+
+def provider_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Report usage counters for every provider created in this process.
+    """
+    return {name: provider.stats() for name, provider in list(_instances.items())}
\ No newline at end of file
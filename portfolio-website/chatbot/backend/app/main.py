@@ -1,22 +1,23 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+import asyncio
+import gc
 import json
 import os
 import logging
 from typing import List, Dict, Any, Optional
 import uuid
 
-# Import LangGraph components
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import StrOutputParser
-
-# Import custom components
-from app.llm_manager import LLMManager
-from app.rag_system import RAGSystem
-from app.chatbot import PortfolioChatbot
+# Import lightweight components; the LLM, RAG and LangGraph modules pull in
+# langchain, torch and FAISS and are imported by the warm-up stages instead
+from app.llm_providers import provider_stats
+from app.session_store import create_session_store
+from app.startup import StartupTracker, deterministic_response
+from app.telemetry import PROMETHEUS_CONTENT_TYPE, REGISTRY, STAGE_SECONDS, ServerTimingMiddleware
+from app.utils import get_data_registry
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -28,8 +29,24 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start accepting requests immediately and warm the heavy components in
+    the background; stop the warm-up and the index watcher on shutdown.
+    """
+    warmup = asyncio.create_task(warm_up())
+    yield
+    warmup.cancel()
+    if rag_system is not None:
+        rag_system.stop_watcher()
+
 # Initialize FastAPI app
-app = FastAPI(title="Portfolio Chatbot API", description="API for portfolio website chatbot using LangGraph")
+app = FastAPI(
+    title="Portfolio Chatbot API",
+    description="API for portfolio website chatbot using LangGraph",
+    lifespan=lifespan
+)
 
 # Configure CORS
 app.add_middleware(
@@ -40,18 +57,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load project data
-def load_data(file_path):
-    try:
-        with open(file_path, 'r') as file:
-            return json.load(file)
-    except Exception as e:
-        print(f"Error loading data from {file_path}: {e}")
-        return {}
+# Time every request and report its stages in a Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
 
-# Load project and personal information
-projects_data = load_data("../data/projects.json")
-personal_info = load_data("../data/personal_info.json")
+# Load project and personal information once; the registry reloads them
+# when the files change
+data_registry = get_data_registry()
 
 # Define data models
 class Message(BaseModel):
@@ -66,47 +77,167 @@ class ChatResponse(BaseModel):
     response: str
     session_id: str
 
-# In-memory session storage
-active_sessions = {}
+# Session storage with LRU, idle TTL and per-session message caps
+session_store = create_session_store()
+
+# Components are loaded in stages after start-up; until the chatbot is
+# ready, deterministic intents are answered from the pre-rendered responses
+llm_manager = None
+rag_system = None
+chatbot = None
+summarizer = None
+startup = StartupTracker(("llm", "index", "embedding_model", "chatbot"))
+
+# Seconds clients are asked to wait before retrying while components load
+RETRY_AFTER_SECONDS = int(os.getenv("STARTUP_RETRY_AFTER", 5))
+
+def load_llm_manager():
+    from app.llm_manager import LLMManager
+    return LLMManager()
+
+def load_rag_system(forking: bool = False):
+    # With a retrieval sidecar the model and index live in that process
+    socket_path = os.getenv("RAG_SIDECAR_SOCKET")
+    if socket_path:
+        from app.retrieval_sidecar import RetrievalClient
+        return RetrievalClient(socket_path, connect_timeout=float(os.getenv("RAG_SIDECAR_TIMEOUT", 120)))
+    from app.rag_system import IndexNotBuiltError, RAGSystem, build_index_in_subprocess
+    if not forking:
+        return RAGSystem()
+    try:
+        return RAGSystem(build=False)
+    except IndexNotBuiltError:
+        # Building runs the embedding model, which must stay out of the master
+        logging.info("No persisted index; building it in a subprocess before forking")
+        build_index_in_subprocess()
+        return RAGSystem(build=False)
+
+def load_chatbot():
+    from app.chatbot import PortfolioChatbot
+    from app.summarizer import ConversationSummarizer
+    
+    # Drop cached answers when any indexed source changes
+    llm_manager.response_cache.watch(rag_system.pdf_path, rag_system.projects_path, rag_system.personal_info_path)
+    
+    # Fold older turns of long conversations into a rolling summary
+    conversation_summarizer = None
+    if os.getenv('SUMMARY_ENABLED', 'true').lower() in ('true', '1', 't'):
+        conversation_summarizer = ConversationSummarizer(
+            llm_manager,
+            session_store,
+            threshold=int(os.getenv('SUMMARY_THRESHOLD', 12)),
+            keep_recent=int(os.getenv('SUMMARY_KEEP_RECENT', 6))
+        )
+    return PortfolioChatbot(llm_manager, rag_system), conversation_summarizer
+
+async def warm_up(forking: bool = False):
+    """
+    Load the LLM manager, the RAG index and the embedding model, then the
+    chatbot that depends on them, recording each stage in ``startup``.
+    
+    Components a preloading master already loaded are kept.
+    
+    Args:
+        forking: Loading in a master that is about to fork its workers; no
+            threads are started and the embedding model is not run, so a
+            missing index is built in a subprocess
+    """
+    global llm_manager, rag_system, chatbot, summarizer
+    
+    if llm_manager is None:
+        llm_manager = await startup.stage("llm", load_llm_manager)
+    if rag_system is None:
+        rag_system = await startup.stage("index", lambda: load_rag_system(forking))
+    if rag_system is None:
+        startup.fail("embedding_model", "index failed to load")
+        startup.fail("chatbot", "index failed to load")
+        return
+    
+    # Re-index edited resume and data files without restarting the worker
+    if not forking:
+        rag_system.start_watcher()
+    
+    # A persisted index is memory-mapped without loading the model, which
+    # would otherwise happen on the first question
+    if not startup.is_ready("embedding_model"):
+        await startup.stage("embedding_model", lambda: rag_system.warm_up(run_model=not forking))
+    if llm_manager is None:
+        startup.fail("chatbot", "LLM manager failed to load")
+        return
+    
+    if chatbot is None:
+        loaded = await startup.stage("chatbot", load_chatbot)
+        if loaded is not None:
+            summarizer = loaded[1]
+            chatbot = loaded[0]
 
-# Initialize components
-try:
-    llm_manager = LLMManager()
-    logging.info("LLM Manager initialized successfully")
+def preload():
+    """
+    Load every component before the server forks its workers.
     
-    rag_system = RAGSystem()
-    logging.info("RAG System initialized successfully")
+    Called in the gunicorn master when ``preload_app`` is on (see
+    gunicorn.conf.py). Workers then inherit the embedding model weights, the
+    index and the compiled graph as copy-on-write pages instead of each
+    loading a copy, and their own warm-up skips the loaded stages.
+    """
+    asyncio.run(warm_up(forking=True))
+    # Move everything loaded so far out of the collector's generations, so
+    # collections in the workers do not write to, and so copy, these pages
+    gc.freeze()
+
+def warm_response(message: str) -> str:
+    """
+    Answer a message without the chatbot while it is not ready.
     
-    chatbot = PortfolioChatbot(llm_manager, rag_system)
-    logging.info("Portfolio Chatbot initialized successfully")
-except Exception as e:
-    logging.error(f"Error initializing components: {e}")
-    # We'll continue running the API, but chatbot functionality will be limited
+    Raises:
+        HTTPException: 503 when the message needs the LLM or retrieval; while
+            components are still loading it carries a Retry-After header
+    """
+    response = deterministic_response(message, data_registry.get().responses)
+    if response is not None:
+        startup.accepted(warm=True)
+        return response
     
-    # API endpoints
+    startup.rejected()
+    if startup.is_failed("chatbot"):
+        raise HTTPException(status_code=503, detail="The chatbot is unavailable")
+    raise HTTPException(
+        status_code=503,
+        detail="The chatbot is still starting up",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
+# API endpoints
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """
     Process a chat message and return a response.
     """
+    if chatbot is None:
+        response = warm_response(request.message)
+        session_id = request.session_id or str(uuid.uuid4())
+        session_store.append_message(session_id, {"role": "user", "content": request.message})
+        session_store.append_message(session_id, {"role": "assistant", "content": response})
+        return ChatResponse(response=response, session_id=session_id)
+    
     try:
         # Generate a session ID if not provided
         session_id = request.session_id or str(uuid.uuid4())
         
-        # Get or create conversation history for this session
-        if session_id not in active_sessions:
-            active_sessions[session_id] = []
-        
-        # Add user message to history
-        active_sessions[session_id].append({"role": "user", "content": request.message})
+        # Add user message to history, creating the session if needed
+        history = session_store.append_message(session_id, {"role": "user", "content": request.message})
         
         # Process the message using the chatbot with conversation history
-        response = chatbot.chat(request.message, active_sessions[session_id])
+        summary = session_store.get_summary(session_id)
+        response = await chatbot.achat(request.message, history, summary)
         
         # Add assistant response to history
-        active_sessions[session_id].append({"role": "assistant", "content": response})
+        history = session_store.append_message(session_id, {"role": "assistant", "content": response})
+        if summarizer is not None:
+            summarizer.schedule(session_id, history)
         
         # Return the response
+        startup.accepted()
         return ChatResponse(
             response=response,
             session_id=session_id
@@ -118,13 +249,168 @@ async def chat_endpoint(request: ChatRequest):
             detail="An error occurred while processing your request"
         )
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """
+    Format a Server-Sent Events message.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Process a chat message and stream the response as Server-Sent Events.
+    
+    Emits a ``session`` event, one ``token`` event per chunk as the LLM
+    produces it, and a final ``done`` event carrying the full response. If
+    the response fails, even after tokens were sent, an ``error`` event
+    replaces ``done``.
+    """
+    # Answered before the session is touched, so a rejected message is not recorded
+    warm = warm_response(request.message) if chatbot is None else None
+    
+    # Generate a session ID if not provided
+    session_id = request.session_id or str(uuid.uuid4())
+    
+    # Add user message to history, creating the session if needed
+    history = session_store.append_message(session_id, {"role": "user", "content": request.message})
+    summary = session_store.get_summary(session_id)
+    if warm is None:
+        startup.accepted()
+    
+    async def event_stream():
+        yield format_sse("session", {"session_id": session_id})
+        
+        parts = []
+        try:
+            if warm is not None:
+                parts.append(warm)
+                yield format_sse("token", {"token": warm})
+            else:
+                async for token in chatbot.astream_chat(request.message, history, summary):
+                    parts.append(token)
+                    yield format_sse("token", {"token": token})
+        except Exception as e:
+            logging.error(f"Error streaming chat response: {e}")
+            detail = "An error occurred while processing your request"
+            # Pair the recorded user message with an error turn, as the widget shows one
+            session_store.append_message(session_id, {"role": "assistant", "content": detail})
+            yield format_sse("error", {"detail": detail})
+            return
+        
+        # Add the assembled assistant response to history
+        response = "".join(parts)
+        updated = session_store.append_message(session_id, {"role": "assistant", "content": response})
+        if summarizer is not None:
+            summarizer.schedule(session_id, updated)
+        
+        yield format_sse("done", {"response": response, "session_id": session_id})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/health")
 async def health_check():
     """
-    Check if the API is healthy.
+    Check if the API process is alive; see /ready for whether it is warm.
     """
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Report the warm state of each component; 200 once all of them are ready, 503 until then.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if startup.is_ready() else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=startup.snapshot()
+    )
+
+async def retrieval_stats() -> Dict[str, Any]:
+    """
+    Read the RAG system's metrics without blocking the event loop.
+    
+    With a retrieval sidecar this is a socket round trip, so a sidecar that
+    is down or slow is reported as an error entry instead of failing the
+    whole scrape.
+    """
+    try:
+        return await rag_system.astats()
+    except Exception as e:
+        logging.warning(f"Retrieval metrics unavailable: {e}")
+        return {"retrieval_error": str(e) or type(e).__name__}
+
+# Retrieval metrics read by the /metrics handler just before rendering, as
+# collectors run synchronously inside REGISTRY.render() and cannot await them
+scraped_retrieval_stats: Dict[str, Any] = {}
+
+def collect_component_metrics():
+    """
+    Export the cache and search counters the components keep, for Prometheus.
+    """
+    if llm_manager is not None:
+        cache = llm_manager.response_cache.stats()
+        yield "response_cache_lookups_total", "counter", "Response cache lookups by result", [
+            ({"result": "exact_hit"}, cache["exact_hits"]),
+            ({"result": "semantic_hit"}, cache["semantic_hits"]),
+            ({"result": "miss"}, cache["misses"]),
+        ]
+    if rag_system is not None:
+        yield "retrieval_metrics_up", "gauge", "Whether the retrieval metrics could be read", [
+            ({}, 0 if "retrieval_error" in scraped_retrieval_stats else 1)
+        ]
+    # Missing when the retrieval sidecar could not be reached
+    retrieval = scraped_retrieval_stats.get("retrieval_cache")
+    if retrieval is not None:
+        yield "retrieval_cache_lookups_total", "counter", "Query embedding and result cache lookups", [
+            ({"cache": "embedding", "result": "hit"}, retrieval["embedding_hits"]),
+            ({"cache": "embedding", "result": "miss"}, retrieval["embedding_misses"]),
+            ({"cache": "results", "result": "hit"}, retrieval["results_hits"]),
+            ({"cache": "results", "result": "miss"}, retrieval["results_misses"]),
+        ]
+        yield "retrieval_searches_total", "counter", "Searches by retrieval path", [
+            ({"path": path}, retrieval[f"{path}_searches"]) for path in ("lexical", "hybrid", "dense")
+        ]
+    if startup.first_request_seconds is not None:
+        yield "startup_time_to_first_request_seconds", "gauge", "Seconds from start-up to the first answered request", [
+            ({}, startup.first_request_seconds)
+        ]
+
+REGISTRY.add_collector(collect_component_metrics)
+
+@app.get("/metrics")
+async def metrics(request: Request, format: Optional[str] = None):
+    """
+    Report runtime metrics, including session store memory use and response cache hit rates.
+    
+    Prometheus scrapers, which accept text/plain or OpenMetrics, and
+    ``?format=prometheus`` get latency and token histograms and the cache
+    counters in the Prometheus text format; other clients get JSON.
+    """
+    global scraped_retrieval_stats
+    retrieval = await retrieval_stats() if rag_system is not None else {}
+    
+    accept = request.headers.get("accept", "")
+    if format == "prometheus" or (format is None and ("text/plain" in accept or "openmetrics" in accept)):
+        # Nothing awaits between here and the render, so concurrent scrapes cannot mix
+        scraped_retrieval_stats = retrieval
+        return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+    
+    metrics = {"startup": startup.stats(), "sessions": session_store.stats(), "stage_seconds": STAGE_SECONDS.summary()}
+    if summarizer is not None:
+        metrics["summaries"] = summarizer.stats()
+    if llm_manager is not None:
+        metrics["response_cache"] = llm_manager.response_cache.stats()
+        metrics["llm"] = llm_manager.stats()
+    metrics["llm_providers"] = provider_stats()
+    metrics.update(retrieval)
+    if chatbot is not None:
+        metrics["coalescing"] = chatbot.flights.stats()
+        metrics["prompts"] = chatbot.prompt_builder.stats()
+    return metrics
+
 @app.get("/")
 async def root():
     """
@@ -0,0 +1,220 @@
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import logging
+import re
+import threading
+
+# Fallback estimate: one token per word or punctuation mark, which tracks BPE
+# tokenizers closely enough for budgeting English prose
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+class Tokenizer:
+    """
+    Counts and truncates text in model tokens.
+    
+    Uses tiktoken when it is installed and its encoding can be loaded, and a
+    regex estimate otherwise, so prompt budgeting never needs the network.
+    """
+    def __init__(self, encoding_name: Optional[str] = "cl100k_base"):
+        self.encoding = None
+        self.name = "regex"
+        if encoding_name and encoding_name != "regex":
+            try:
+                import tiktoken
+                self.encoding = tiktoken.get_encoding(encoding_name)
+                self.name = encoding_name
+            except Exception as e:
+                logging.info(f"Using regex token estimate; tiktoken unavailable: {e}")
+    
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return len(TOKEN_RE.findall(text))
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut text down to at most ``max_tokens`` tokens.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+        for index, match in enumerate(TOKEN_RE.finditer(text)):
+            if index == max_tokens:
+                return text[:match.start()].rstrip()
+        return text
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name: str = "cl100k_base") -> Tokenizer:
+    """
+    Get a shared tokenizer for an encoding ("regex" for the estimate).
+    """
+    return Tokenizer(encoding_name)
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+class BuiltPrompt(NamedTuple):
+    text: str
+    # Tokens in the final prompt
+    tokens: int
+    # Tokens the unbudgeted prompt would have had, minus ``tokens``
+    tokens_saved: int
+    chunk_ids: Tuple[str, ...]
+    history_messages: int
+
+class PromptBuilder:
+    """
+    Assembles prompts under a token budget.
+    
+    The template's fixed text, the query and any pinned sections are always
+    included. Of the remaining budget, recent history gets up to
+    ``history_share`` (the rolling summary of older turns, if any, then
+    messages newest first), and retrieved chunks fill the
+    rest in order of relevance, with the last one truncated to fit if at
+    least ``min_chunk_tokens`` remain. Chunk sentences that already appear
+    in the included history are dropped rather than sent twice.
+    """
+    def __init__(self, template: str, token_budget: int = 2048, history_share: float = 0.35,
+                 max_history_messages: int = 5, min_chunk_tokens: int = 64,
+                 tokenizer: Optional[Tokenizer] = None):
+        self.template = template
+        self.token_budget = token_budget
+        self.history_share = history_share
+        self.max_history_messages = max_history_messages
+        self.min_chunk_tokens = min_chunk_tokens
+        self.tokenizer = tokenizer or get_tokenizer()
+        
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.total_tokens = 0
+        self.total_saved = 0
+        self.truncated_chunks = 0
+        self.dropped_chunks = 0
+    
+    @staticmethod
+    def _format_history(messages: Sequence[Dict[str, str]]) -> str:
+        if not messages:
+            return "No previous conversation."
+        return "".join(
+            f"{'User' if m.get('role') == 'user' else 'Assistant'}: {m.get('content', '')}\n"
+            for m in messages
+        )
+    
+    def _render(self, context: str, history: str, query: str) -> str:
+        return self.template.format(context=context, conversation_history=history, query=query)
+    
+    def _pack_history(self, history: Sequence[Dict[str, str]], query: str, budget: int) -> List[Dict[str, str]]:
+        # The current message is already in the prompt as the query
+        if history and history[-1].get("role") == "user" and _normalize(history[-1].get("content", "")) == _normalize(query):
+            history = history[:-1]
+        
+        packed = []
+        used = 0
+        for message in reversed(history[-self.max_history_messages:]):
+            cost = self.tokenizer.count(self._format_history([message]))
+            if used + cost > budget:
+                break
+            packed.append(message)
+            used += cost
+        packed.reverse()
+        return packed
+    
+    def _dedupe(self, text: str, seen: str) -> str:
+        """
+        Drop sentences of a chunk that already appear in the included history.
+        """
+        if not seen:
+            return text
+        kept = [s for s in SENTENCE_RE.split(text) if s.strip() and _normalize(s) not in seen]
+        return " ".join(kept)
+    
+    def build(self, query: str, chunks: Sequence[Tuple[str, str, float]] = (),
+              history: Sequence[Dict[str, str]] = (), pinned: Sequence[str] = (),
+              summary: str = "") -> BuiltPrompt:
+        """
+        Build a prompt that fits the token budget.
+        
+        Args:
+            query: The user's message
+            chunks: Retrieved (doc_id, text, score) tuples; higher scores are more relevant
+            history: Conversation messages, oldest first
+            pinned: Context sections that are always included after the chunks
+            summary: Rolling summary of turns no longer in ``history``
+        
+        Returns:
+            The prompt text with its token usage
+        """
+        tokens = self.tokenizer
+        pinned_text = "\n".join(pinned)
+        fixed = tokens.count(self._render(pinned_text, "", query))
+        available = max(0, self.token_budget - fixed)
+        
+        history_budget = int(available * self.history_share)
+        summary_text = ""
+        if summary:
+            summary_text = f"Summary of earlier conversation: {tokens.truncate(summary, history_budget)}\n"
+            history_budget -= tokens.count(summary_text)
+        
+        packed_history = self._pack_history(list(history), query, history_budget)
+        history_text = summary_text + self._format_history(packed_history) if packed_history or not summary_text else summary_text
+        remaining = available - tokens.count(history_text)
+        seen = " ".join(_normalize(m.get("content", "")) for m in packed_history)
+        
+        sections = []
+        chunk_ids = []
+        for doc_id, text, _ in sorted(chunks, key=lambda chunk: chunk[2], reverse=True):
+            text = self._dedupe(text, seen)
+            # Separator between sections costs a couple of tokens
+            cost = tokens.count(text) + 2
+            if not text:
+                continue
+            if cost > remaining:
+                if remaining - 2 < self.min_chunk_tokens:
+                    continue
+                text = tokens.truncate(text, remaining - 2)
+                cost = remaining
+                with self._lock:
+                    self.truncated_chunks += 1
+            sections.append(text)
+            chunk_ids.append(doc_id)
+            remaining -= cost
+        
+        context = "\n\n".join(sections + ([pinned_text] if pinned_text else []))
+        prompt = self._render(context, history_text, query)
+        prompt_tokens = tokens.count(prompt)
+        
+        # What the prompt would have cost without budgeting: every chunk in
+        # full plus the summary and the last five history messages
+        unbudgeted = tokens.count(self._render(
+            "\n\n".join([text for _, text, _ in chunks] + ([pinned_text] if pinned_text else [])),
+            (f"Summary of earlier conversation: {summary}\n" if summary else "") + self._format_history(list(history)[-5:]),
+            query
+        ))
+        saved = max(0, unbudgeted - prompt_tokens)
+        
+        with self._lock:
+            self.prompts += 1
+            self.total_tokens += prompt_tokens
+            self.total_saved += saved
+            self.dropped_chunks += len(chunks) - len(chunk_ids)
+        return BuiltPrompt(prompt, prompt_tokens, saved, tuple(chunk_ids), len(packed_history))
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report prompt sizes and tokens saved by budgeting.
+        """
+        with self._lock:
+            return {
+                "tokenizer": self.tokenizer.name,
+                "token_budget": self.token_budget,
+                "prompts": self.prompts,
+                "avg_prompt_tokens": self.total_tokens / self.prompts if self.prompts else 0.0,
+                "tokens_saved": self.total_saved,
+                "truncated_chunks": self.truncated_chunks,
+                "dropped_chunks": self.dropped_chunks,
+            }
\ No newline at end of file
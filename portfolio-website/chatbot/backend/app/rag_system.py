@@ -1,16 +1,244 @@
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+import faiss
+import hashlib
+import json
+import math
+import numpy as np
 import os
+import pickle
+import re
+import shutil
+import subprocess
+import sys
+import threading
 import logging
+from .bm25 import BM25Index, LexicalMatch, reciprocal_rank_fusion
+from .embeddings import QueryBatcher, create_embedding_service
+from .ingestion import batched, content_hash, iter_documents, iter_source_documents
+from .telemetry import timed
+from .utils import get_data_path, get_project_root
+
+# Bump when the on-disk layout of a persisted index changes
+INDEX_FORMAT_VERSION = 2
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+# Exact search, inverted file, graph, IVF with product-quantized codes and int8 scalar quantization
+INDEX_TYPES = ("flat", "ivf", "hnsw", "pq", "sq8")
+
+class IndexNotBuiltError(RuntimeError):
+    """
+    Raised by ``RAGSystem(build=False)`` when no persisted index matches the sources.
+    """
+
+def faiss_index_factory(index_type: str, dim: int, count: int, nlist: Optional[int] = None,
+                        hnsw_m: int = 32, pq_m: Optional[int] = None) -> str:
+    """
+    Get the FAISS factory string for an index type, sized for ``count`` vectors.
+    
+    Args:
+        index_type: One of INDEX_TYPES
+        dim: Vector dimension
+        count: Number of vectors the index is trained on
+        nlist: Inverted lists for "ivf" and "pq"; defaults to about 4 * sqrt(count),
+            limited so each list gets the ~39 training points k-means wants
+        hnsw_m: Graph neighbours per node for "hnsw"
+        pq_m: Sub-quantizers for "pq"; must divide ``dim``, defaults to one per 8 dimensions
+    """
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    if index_type == "sq8":
+        return "SQ8"
+    
+    nlist = nlist or max(1, min(int(4 * math.sqrt(count)), count // 39))
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "pq":
+        if not pq_m:
+            pq_m = max(m for m in range(1, max(1, dim // 8) + 1) if dim % m == 0)
+        # k-means needs at least as many training points as centroids per sub-quantizer
+        nbits = max(1, min(8, int(math.log2(max(count, 2)))))
+        return f"IVF{nlist},PQ{pq_m}x{nbits}"
+    raise ValueError(f"Unknown index type: {index_type}")
+
+def build_faiss_index(vectors: np.ndarray, index_type: str = "flat", **options) -> faiss.Index:
+    """
+    Create, train and fill a FAISS index of the given type with L2 distance.
+    
+    Args:
+        vectors: Float32 matrix with one row per document
+        index_type: One of INDEX_TYPES
+        options: Sizing options passed to faiss_index_factory
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], faiss_index_factory(index_type, vectors.shape[1], len(vectors), **options))
+    if isinstance(index, faiss.IndexIVFPQ):
+        # Polysemous codes only help Hamming-filtered search and dominate training time
+        index.do_polysemous_training = False
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+def mmap_read_flag() -> Optional[int]:
+    """
+    Get the faiss.read_index flags that memory-map a persisted index, or None if unsupported.
+    """
+    # IO_FLAG_MMAP_IFC (newer FAISS) also maps flat and scalar-quantized
+    # codes; plain IO_FLAG_MMAP only maps IVF inverted lists
+    flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None) or getattr(faiss, "IO_FLAG_MMAP", None)
+    if flag is not None:
+        flag |= getattr(faiss, "IO_FLAG_SKIP_PRECOMPUTE_TABLE", 0)
+    return flag
+
+def index_is_mapped(index_type: str) -> bool:
+    """
+    Whether the installed FAISS memory-maps a persisted index of this type.
+    
+    A mapped index lives in the page cache and is shared by every worker on
+    the host. Without IO_FLAG_MMAP_IFC, which faiss-cpu 1.7.4 lacks, only
+    the inverted lists of "ivf" and "pq" are mapped; "flat", "hnsw" and
+    "sq8" are read into each worker's private memory.
+    """
+    if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        return True
+    return hasattr(faiss, "IO_FLAG_MMAP") and index_type in ("ivf", "pq")
+
+def configure_search(index: faiss.Index, nprobe: int = 8, ef_search: int = 64):
+    """
+    Apply the search-time knobs of IVF and HNSW indexes.
+    
+    Returns:
+        The SearchParameters class for filtered searches on this index and
+        the keyword arguments it needs besides the selector
+    """
+    if isinstance(index, faiss.IndexIVFPQ):
+        # The precomputed distance table takes nlist * M * 2^nbits floats in
+        # every worker, often more than the compressed codes themselves
+        index.use_precomputed_table = -1
+        index.precomputed_table.resize(0)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+        return faiss.SearchParametersIVF, {"nprobe": ivf.nprobe}
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+        return faiss.SearchParametersHNSW, {"efSearch": ef_search}
+    return faiss.SearchParameters, {}
+
+class LRUCache:
+    """
+    Small thread-safe LRU mapping used to memoize per-query work.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+class RetrievalIndex:
+    """
+    One generation of the search indexes.
+    
+    The FAISS store, the BM25 index over the same chunks and the positions of
+    each document type are replaced together as a single object, so a search
+    that started before a re-index runs entirely against the old generation.
+    """
+    def __init__(self, key: str, vector_store: FAISS, bm25: BM25Index, nprobe: int = 8, ef_search: int = 64):
+        self.key = key
+        self.vector_store = vector_store
+        self.bm25 = bm25
+        self._params_class, self._params = configure_search(vector_store.index, nprobe, ef_search)
+        
+        positions: Dict[str, List[int]] = {}
+        for position in range(vector_store.index.ntotal):
+            doc = self.document(vector_store.index_to_docstore_id[position])
+            positions.setdefault(doc.metadata.get("type", "resume"), []).append(position)
+        self.type_positions = {doc_type: np.array(p, dtype=np.int64) for doc_type, p in positions.items()}
+        self._selectors: Dict[Tuple[str, ...], tuple] = {}
+    
+    def __len__(self) -> int:
+        return self.vector_store.index.ntotal
+    
+    def document(self, doc_id: str) -> Document:
+        return self.vector_store.docstore.search(doc_id)
+    
+    def filter(self, doc_types: Tuple[str, ...]):
+        """
+        Get the FAISS search parameters and allowed positions for some document types.
+        """
+        cached = self._selectors.get(doc_types)
+        if cached is None:
+            empty = np.array([], dtype=np.int64)
+            positions = np.concatenate([self.type_positions.get(t, empty) for t in doc_types])
+            selector = faiss.IDSelectorBatch(positions)
+            # The search parameters only borrow the selector, so keep it alive alongside
+            cached = (self._params_class(sel=selector, **self._params), frozenset(positions.tolist()), selector)
+            self._selectors[doc_types] = cached
+        return cached
 
 class RAGSystem:
     """
     Retrieval-Augmented Generation system for retrieving context from documents.
-    Currently supports PDF documents, specifically the resume.
+    
+    Indexes the resume PDF together with the structured portfolio data: each
+    project, skill category, bio and experience record becomes its own
+    document with a ``type`` in its metadata, and searches can be restricted
+    to given types.
+    
+    The FAISS index and chunk metadata are persisted under ``index_dir`` keyed by
+    a hash of the source files, chunker settings and embedding model, so workers
+    only parse and embed the resume when one of those inputs changes.
+    
+    Retrieval is hybrid: a BM25 inverted index over the same chunks is fused
+    with the FAISS results by reciprocal rank, and a query whose best BM25
+    hit is unambiguous is answered lexically without embedding it at all.
+    
+    When a source file changes, ``refresh`` re-parses only that source,
+    embeds only chunks whose content hash is new and swaps in the updated
+    indexes; ``start_watcher`` runs it periodically in a background thread.
     """
-    def __init__(self, pdf_path=None):
+    def __init__(self, pdf_path=None, index_dir=None, projects_path=None, personal_info_path=None, build: bool = True):
+        """
+        Args:
+            pdf_path: The resume PDF; searched for in common locations if omitted
+            index_dir: Directory of persisted indexes (default: RAG_INDEX_DIR)
+            projects_path: projects.json path
+            personal_info_path: personal_info.json path
+            build: Build the index if no persisted one matches the sources. With
+                False, IndexNotBuiltError is raised instead, so the embedding
+                model is never run
+        """
         # Default to the resume in the public directory if no path is provided
         if pdf_path is None:
             # Try to find the resume in common locations
@@ -29,27 +257,626 @@ class RAGSystem:
             if pdf_path is None:
                 raise FileNotFoundError("Resume PDF not found in common locations")
         
+        self.pdf_path = pdf_path
+        self.projects_path = projects_path or get_data_path("projects.json")
+        self.personal_info_path = personal_info_path or get_data_path("personal_info.json")
+        self.chunk_size = int(os.getenv("RAG_CHUNK_SIZE", 1000))
+        self.chunk_overlap = int(os.getenv("RAG_CHUNK_OVERLAP", 200))
+        self.embedding_model = os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+        self.index_dir = index_dir or os.getenv("RAG_INDEX_DIR") or str(get_project_root() / ".rag_index")
+        # Documents are embedded and added to the index in batches of this size
+        self.ingest_batch_size = int(os.getenv("RAG_INGEST_BATCH_SIZE", 32))
+        
+        self.index_type = os.getenv("RAG_INDEX_TYPE", "flat").lower()
+        if self.index_type not in INDEX_TYPES:
+            logging.warning(f"Unknown RAG_INDEX_TYPE {self.index_type!r}, using flat")
+            self.index_type = "flat"
+        nlist = os.getenv("RAG_IVF_NLIST")
+        pq_m = os.getenv("RAG_PQ_M")
+        # Build-time sizing; part of the index key
+        self.index_options = {
+            "nlist": int(nlist) if nlist else None,
+            "hnsw_m": int(os.getenv("RAG_HNSW_M", 32)),
+            "pq_m": int(pq_m) if pq_m else None,
+        }
+        # Search-time accuracy/latency trade-offs for IVF and HNSW
+        self.ivf_nprobe = int(os.getenv("RAG_IVF_NPROBE", 8))
+        self.hnsw_ef_search = int(os.getenv("RAG_HNSW_EF_SEARCH", 64))
+        
+        # Embedding and FAISS search are CPU-bound; async callers run them here
+        # so they never block the event loop, and the pool size bounds how many
+        # searches compete for CPU at once.
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("RAG_MAX_WORKERS", 2)),
+            thread_name_prefix="rag-search"
+        )
+        
+        # Repeated queries across sessions skip the embedding model and FAISS
+        cache_size = int(os.getenv("RAG_QUERY_CACHE_SIZE", 1024))
+        self._embedding_cache = LRUCache(cache_size)
+        self._results_cache = LRUCache(cache_size)
+        
+        # hybrid (BM25 + FAISS), dense (FAISS only) or lexical (BM25 only)
+        self.retrieval_mode = os.getenv("RAG_RETRIEVAL_MODE", "hybrid").lower()
+        self.lexical_fast_path = os.getenv("RAG_LEXICAL_FAST_PATH", "true").lower() in ("true", "1", "t")
+        # The best BM25 hit must beat the runner-up by this factor to skip the embedding
+        self.lexical_margin = float(os.getenv("RAG_LEXICAL_MARGIN", 1.5))
+        self.rrf_k = int(os.getenv("RAG_RRF_K", 60))
+        self.retrieval_counts = Counter()
+        
+        # Seconds between checks of the source files; 0 disables the watcher
+        self.watch_interval = float(os.getenv("RAG_WATCH_INTERVAL", 10))
+        self._refresh_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self.reindex_counts = Counter()
+        
         try:
-            # Load and process the PDF
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
-            
-            # Split documents into chunks
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
+            # Chunk vectors are kept outside index_dir, which only holds the current index
+            self.embeddings = create_embedding_service(
+                self.embedding_model,
+                default_store_path=str(get_project_root() / ".embedding_store.db")
+            )
+            # Async callers' query embeddings are batched into shared forward passes
+            self.query_batcher = QueryBatcher(
+                self.embeddings.embed_queries,
+                max_batch=int(os.getenv("EMBEDDING_QUERY_BATCH_SIZE", 16)),
+                max_wait=float(os.getenv("EMBEDDING_QUERY_MAX_WAIT_MS", 5)) / 1000,
+                executor=self._executor
             )
-            splits = text_splitter.split_documents(documents)
             
-            # Create embeddings and vector store
-            embeddings = HuggingFaceEmbeddings()
-            self.vector_store = FAISS.from_documents(splits, embeddings)
+            # Taken before hashing, so an edit made while building is picked up by the watcher
+            self._fingerprints = self._source_fingerprints()
+            index_key = self._compute_index_key()
+            vector_store = self._load_index(index_key)
             
-            logging.info(f"RAG system initialized with {len(splits)} document chunks")
+            if vector_store is None:
+                if not build:
+                    raise IndexNotBuiltError(f"No persisted index {index_key} in {self.index_dir}")
+                vector_store = self._build_index()
+                bm25 = self._build_lexical_index(vector_store)
+                self._save_index(self._retrieval_index(index_key, vector_store, bm25))
+                # Serve from the persisted file so this worker shares its pages too
+                vector_store = self._load_index(index_key) or vector_store
+            else:
+                bm25 = self._load_lexical_index(index_key, vector_store)
+            self._index = self._retrieval_index(index_key, vector_store, bm25)
+        except IndexNotBuiltError:
+            raise
         except Exception as e:
             logging.error(f"Error initializing RAG system: {e}")
             raise
     
+    def _source_paths(self) -> List[str]:
+        """
+        Files whose content determines the index.
+        """
+        return [path for path in (self.pdf_path, self.projects_path, self.personal_info_path) if os.path.exists(path)]
+    
+    def _source_fingerprints(self) -> Dict[str, Tuple[int, int]]:
+        fingerprints = {}
+        for path in self._source_paths():
+            try:
+                stat = os.stat(path)
+                fingerprints[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+        return fingerprints
+    
+    @property
+    def vector_store(self) -> FAISS:
+        return self._index.vector_store
+    
+    @property
+    def bm25(self) -> BM25Index:
+        return self._index.bm25
+    
+    def _compute_index_key(self) -> str:
+        """
+        Hash the source files, chunker settings and embedding model name.
+        
+        Returns:
+            Hex digest identifying the index built from the current inputs
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps({
+            "version": INDEX_FORMAT_VERSION,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "embedding_model": self.embedding_model,
+            "index_type": self.index_type,
+            "index_options": self.index_options if self.index_type != "flat" else {},
+        }, sort_keys=True).encode("utf-8"))
+        
+        for path in self._source_paths():
+            digest.update(os.path.basename(path).encode("utf-8"))
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(block)
+        
+        return digest.hexdigest()
+    
+    def _build_index(self) -> FAISS:
+        """
+        Stream documents from all sources and embed them into a new FAISS store.
+        
+        Records are embedded batch by batch as the pipeline yields them; the
+        index itself is created once all vectors are known, since IVF and
+        quantized index types are trained on the full set.
+        """
+        documents = iter_documents(
+            self.pdf_path, self.projects_path, self.personal_info_path,
+            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+        )
+        entries: List[Tuple[str, Document]] = []
+        vectors = []
+        for batch in batched(documents, self.ingest_batch_size):
+            entries.extend(batch)
+            vectors.append(np.asarray(self.embeddings.embed_documents([doc.page_content for _, doc in batch]), dtype=np.float32))
+        
+        if not entries:
+            raise ValueError("No documents found to index")
+        
+        vector_store = self._vector_store(entries, np.vstack(vectors))
+        logging.info(f"RAG system built {self.index_type} index with {len(entries)} documents")
+        return vector_store
+    
+    def _vector_store(self, entries: Sequence[Tuple[str, Document]], vectors: np.ndarray) -> FAISS:
+        """
+        Wrap a new index of the configured type over (doc_id, document) entries and their vectors.
+        """
+        return FAISS(
+            self.embeddings,
+            build_faiss_index(vectors, self.index_type, **self.index_options),
+            InMemoryDocstore({doc_id: doc for doc_id, doc in entries}),
+            {position: doc_id for position, (doc_id, _) in enumerate(entries)}
+        )
+    
+    def _retrieval_index(self, key: str, vector_store: FAISS, bm25: BM25Index) -> RetrievalIndex:
+        return RetrievalIndex(key, vector_store, bm25, nprobe=self.ivf_nprobe, ef_search=self.hnsw_ef_search)
+    
+    def _load_index(self, index_key: str) -> Optional[FAISS]:
+        """
+        Load a persisted index for ``index_key`` if one exists.
+        
+        The FAISS index is memory-mapped where the installed FAISS supports
+        it for the index type (see index_is_mapped), so workers share its
+        pages read-only through the OS page cache instead of each holding a
+        copy.
+        
+        Returns:
+            The loaded FAISS store, or None if no usable index was found
+        """
+        path = os.path.join(self.index_dir, index_key)
+        try:
+            with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+            if manifest.get("key") != index_key:
+                return None
+            
+            index_file = os.path.join(path, "index.faiss")
+            mmap_flag = mmap_read_flag()
+            try:
+                index = faiss.read_index(index_file, mmap_flag) if mmap_flag is not None else faiss.read_index(index_file)
+            except RuntimeError:
+                # Not every index type can be memory-mapped
+                index = faiss.read_index(index_file)
+            
+            with open(os.path.join(path, "index.pkl"), "rb") as file:
+                docstore, index_to_docstore_id = pickle.load(file)
+            
+            vector_store = FAISS(self.embeddings, index, docstore, index_to_docstore_id)
+            sharing = "memory-mapped" if index_is_mapped(self.index_type) else "read into private memory"
+            logging.info(f"RAG system loaded persisted index with {manifest.get('chunks', index.ntotal)} document chunks ({sharing})")
+            return vector_store
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Could not load persisted index from {path}, rebuilding: {e}")
+            return None
+    
+    @staticmethod
+    def _build_lexical_index(vector_store: FAISS) -> BM25Index:
+        """
+        Build the BM25 index over the chunks in a vector store, in FAISS order.
+        """
+        doc_ids = [vector_store.index_to_docstore_id[i] for i in range(vector_store.index.ntotal)]
+        texts = [vector_store.docstore.search(doc_id).page_content for doc_id in doc_ids]
+        return BM25Index(doc_ids, texts)
+    
+    def _load_lexical_index(self, index_key: str, vector_store: FAISS) -> BM25Index:
+        """
+        Load the persisted BM25 index, rebuilding it from the chunks if missing.
+        """
+        path = os.path.join(self.index_dir, index_key, "bm25.pkl")
+        try:
+            with open(path, "rb") as file:
+                bm25 = pickle.load(file)
+            if len(bm25) == vector_store.index.ntotal:
+                return bm25
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Could not load BM25 index from {path}, rebuilding: {e}")
+        return self._build_lexical_index(vector_store)
+    
+    def _save_index(self, index: RetrievalIndex):
+        """
+        Persist an index generation under its key and drop stale ones.
+        
+        The index is written to a temporary directory and renamed into place so
+        concurrently starting workers never see a partially written index.
+        """
+        index_key = index.key
+        path = os.path.join(self.index_dir, index_key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            index.vector_store.save_local(tmp_path, index_name="index")
+            with open(os.path.join(tmp_path, "bm25.pkl"), "wb") as file:
+                pickle.dump(index.bm25, file, protocol=pickle.HIGHEST_PROTOCOL)
+            
+            with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as file:
+                json.dump({
+                    "key": index_key,
+                    "version": INDEX_FORMAT_VERSION,
+                    "sources": [os.path.basename(p) for p in self._source_paths()],
+                    "types": {t: len(p) for t, p in index.type_positions.items()},
+                    "index_type": self.index_type,
+                    "embedding_model": self.embedding_model,
+                    "chunk_size": self.chunk_size,
+                    "chunk_overlap": self.chunk_overlap,
+                    "chunks": len(index),
+                }, file)
+            
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # Another worker persisted the same key first
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            
+            for entry in os.listdir(self.index_dir):
+                if entry != index_key and not entry.startswith(f"{index_key}.tmp-"):
+                    shutil.rmtree(os.path.join(self.index_dir, entry), ignore_errors=True)
+        except Exception as e:
+            logging.warning(f"Could not persist index to {path}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+    
+    def refresh(self) -> bool:
+        """
+        Re-index the sources that changed on disk since the last check.
+        
+        Only the changed sources are parsed again. Chunks whose content hash
+        is already in the index keep their vectors, only new chunks are
+        embedded, and chunks no longer produced by their source are dropped.
+        The updated indexes are built next to the live ones and swapped in
+        with a single assignment, so in-flight searches are never blocked.
+        
+        Returns:
+            True if a new index generation was swapped in
+        """
+        with self._refresh_lock:
+            fingerprints = self._source_fingerprints()
+            changed = {
+                path for path in set(fingerprints) | set(self._fingerprints)
+                if fingerprints.get(path) != self._fingerprints.get(path)
+            }
+            if not changed:
+                return False
+            
+            index_key = self._compute_index_key()
+            current = self._index
+            if index_key == current.key:
+                # Touched but not modified
+                self._fingerprints = fingerprints
+                return False
+            
+            changed_sources = {os.path.basename(path) for path in changed}
+            store = current.vector_store
+            reusable: Dict[str, int] = {}
+            documents: List[Tuple[str, Document, Optional[int]]] = []
+            for position in range(len(current)):
+                doc_id = store.index_to_docstore_id[position]
+                doc = current.document(doc_id)
+                if doc.metadata.get("source") in changed_sources:
+                    reusable[content_hash(doc)] = position
+                else:
+                    documents.append((doc_id, doc, position))
+            
+            for path in sorted(changed):
+                for doc_id, doc in iter_source_documents(
+                    path, self.pdf_path, self.projects_path,
+                    chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+                ):
+                    documents.append((doc_id, doc, reusable.pop(content_hash(doc), None)))
+            
+            if not documents:
+                raise ValueError("No documents found to index")
+            
+            # Flat and HNSW indexes hold the exact vectors; quantized codes only
+            # approximate them, so those are fetched from the embedding store
+            exact = self.index_type in ("flat", "hnsw")
+            vectors = np.zeros((len(documents), store.index.d), dtype=np.float32)
+            missing = []
+            for row, (_, doc, position) in enumerate(documents):
+                if position is None or not exact:
+                    missing.append(row)
+                else:
+                    vectors[row] = store.index.reconstruct(position)
+            for batch in batched(missing, self.ingest_batch_size):
+                embedded = self.embeddings.embed_documents([documents[row][1].page_content for row in batch])
+                vectors[batch] = np.asarray(embedded, dtype=np.float32)
+            new_chunks = sum(1 for _, _, position in documents if position is None)
+            
+            vector_store = self._vector_store([(doc_id, doc) for doc_id, doc, _ in documents], vectors)
+            updated = self._retrieval_index(index_key, vector_store, self._build_lexical_index(vector_store))
+            
+            self._index = updated
+            self._fingerprints = fingerprints
+            self._results_cache.clear()
+            
+            self.reindex_counts["refreshes"] += 1
+            self.reindex_counts["embedded_chunks"] += new_chunks
+            self.reindex_counts["reused_chunks"] += len(documents) - new_chunks
+            self.reindex_counts["removed_chunks"] += len(reusable)
+            logging.info(
+                f"RAG system re-indexed {', '.join(sorted(changed_sources))}: "
+                f"{new_chunks} new chunks, {len(reusable)} removed, {len(updated)} total"
+            )
+        
+        self._save_index(updated)
+        return True
+    
+    def start_watcher(self, interval: Optional[float] = None):
+        """
+        Check the source files every ``interval`` seconds in a background
+        thread and re-index the ones that changed.
+        """
+        interval = self.watch_interval if interval is None else interval
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="rag-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_watcher(self):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+    
+    def _watch(self, interval: float):
+        while not self._stop_watching.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # The live index stays in place and the next check retries
+                self.reindex_counts["failures"] += 1
+                logging.error(f"Error re-indexing changed sources: {e}")
+    
+    def warm_up(self, run_model: bool = True):
+        """
+        Load the embedding model ahead of the first query.
+        
+        Args:
+            run_model: Also embed a query, so the first request does not pay
+                for the model's lazy initialization. A process that is about
+                to fork workers passes False: running the model starts its
+                intra-op thread pool, which must not be inherited by a fork.
+        """
+        if run_model:
+            self.embeddings.embed_query("warm up")
+        else:
+            self.embeddings.load_model()
+    
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        return re.sub(r"\s+", " ", query).strip()
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a query, reusing the vector for queries seen before.
+        
+        Args:
+            query: The query to embed
+        
+        Returns:
+            The query embedding as a float32 vector
+        """
+        key = self._normalize_query(query)
+        vector = self._embedding_cache.get(key)
+        if vector is None:
+            with timed("embed"):
+                vector = np.asarray(self.embeddings.embed_query(key), dtype=np.float32)
+            self._embedding_cache.put(key, vector)
+        return vector
+    
+    async def aembed_query(self, query: str) -> np.ndarray:
+        """
+        Async variant of embed_query that embeds cache misses in micro-batches.
+        """
+        key = self._normalize_query(query)
+        vector = self._embedding_cache.get(key)
+        if vector is None:
+            # Includes the wait for the rest of the micro-batch
+            with timed("embed"):
+                vector = await self.query_batcher.embed(key)
+            self._embedding_cache.put(key, vector)
+        return vector
+    
+    def _dense_search(self, index: RetrievalIndex, vector: np.ndarray, k: int,
+                      doc_types: Optional[Tuple[str, ...]] = None) -> List[Tuple[str, float]]:
+        """
+        Search FAISS for a query vector, optionally only among some document types.
+        
+        Returns:
+            (chunk id, distance) pairs, nearest first
+        """
+        store = index.vector_store
+        if doc_types:
+            params = index.filter(doc_types)[0]
+            distances, indices = store.index.search(vector.reshape(1, -1), k, params=params)
+        else:
+            distances, indices = store.index.search(vector.reshape(1, -1), k)
+        return [
+            (store.index_to_docstore_id[int(i)], float(d))
+            for d, i in zip(distances[0], indices[0]) if i != -1
+        ]
+    
+    def _lexical_confident(self, lexical: LexicalMatch) -> bool:
+        """
+        Whether the BM25 result is decisive enough to skip dense retrieval.
+        
+        The best chunk must contain every query term and clearly outscore the
+        runner-up, as for a question naming a specific technology or project.
+        """
+        return bool(lexical.hits) and lexical.coverage >= 1.0 and lexical.margin >= self.lexical_margin
+    
+    def _lexical_stage(self, index: RetrievalIndex, query: str, k: int,
+                       doc_types: Optional[Tuple[str, ...]] = None) -> Tuple[Optional[Tuple[Tuple[str, float], ...]], Optional[LexicalMatch]]:
+        """
+        Run BM25 for a normalized query and decide whether it answers it alone.
+        
+        Returns:
+            The final hits, or None if dense retrieval is needed, and the BM25
+            match to fuse with (None in dense mode)
+        """
+        if self.retrieval_mode == "dense":
+            return None, None
+        allowed = index.filter(doc_types)[1] if doc_types else None
+        # Fusion needs more than k candidates from each ranker
+        lexical = index.bm25.search(query, max(4 * k, 10), allowed)
+        if self.retrieval_mode == "lexical" or (self.lexical_fast_path and self._lexical_confident(lexical)):
+            self.retrieval_counts["lexical"] += 1
+            top = lexical.hits[0][1] if lexical.hits else 1.0
+            return tuple((doc_id, score / top) for doc_id, score in lexical.hits[:k]), lexical
+        return None, lexical
+    
+    def _dense_stage(self, index: RetrievalIndex, vector: np.ndarray, k: int, doc_types: Optional[Tuple[str, ...]],
+                     lexical: Optional[LexicalMatch]) -> Tuple[Tuple[str, float], ...]:
+        """
+        Search FAISS with the query vector and fuse with the BM25 ranking if it matched anything.
+        """
+        if lexical is None or not lexical.hits:
+            self.retrieval_counts["dense"] += 1
+            return tuple((doc_id, 1.0 / (1.0 + distance)) for doc_id, distance in self._dense_search(index, vector, k, doc_types))
+        
+        self.retrieval_counts["hybrid"] += 1
+        dense = self._dense_search(index, vector, max(4 * k, 10), doc_types)
+        fused = reciprocal_rank_fusion(
+            [[doc_id for doc_id, _ in dense], [doc_id for doc_id, _ in lexical.hits]],
+            self.rrf_k
+        )
+        return tuple(fused[:k])
+    
+    def _search(self, index: RetrievalIndex, query: str, k: int,
+                doc_types: Optional[Tuple[str, ...]] = None) -> Tuple[Tuple[Tuple[str, float], ...], Optional[np.ndarray]]:
+        """
+        Run retrieval for a normalized query.
+        
+        Returns:
+            (chunk id, relevance) pairs, most relevant first, with relevance in
+            (0, 1], and the query vector they were found with, or None if the
+            query was answered without embedding it
+        """
+        with timed("bm25"):
+            hits, lexical = self._lexical_stage(index, query, k, doc_types)
+        if hits is not None:
+            return hits, None
+        vector = self.embed_query(query)
+        with timed("faiss"):
+            return self._dense_stage(index, vector, k, doc_types, lexical), vector
+    
+    async def _asearch(self, index: RetrievalIndex, query: str, k: int,
+                       doc_types: Optional[Tuple[str, ...]] = None) -> Tuple[Tuple[Tuple[str, float], ...], Optional[np.ndarray]]:
+        """
+        Async variant of _search.
+        
+        The BM25 stage is cheap enough to run on the event loop; the query
+        embedding joins a micro-batch, and the FAISS search runs in the
+        bounded executor.
+        """
+        with timed("bm25"):
+            hits, lexical = self._lexical_stage(index, query, k, doc_types)
+        if hits is not None:
+            return hits, None
+        vector = await self.aembed_query(query)
+        loop = asyncio.get_running_loop()
+        # Includes any wait for a free executor thread
+        with timed("faiss"):
+            hits = await loop.run_in_executor(self._executor, self._dense_stage, index, vector, k, doc_types, lexical)
+        return hits, vector
+    
+    def retrieve(self, query: str, k: int = 3, doc_types: Optional[Sequence[str]] = None) -> List[Tuple[str, Document, float]]:
+        """
+        Retrieve the chunks most relevant to the query.
+        
+        The top-k chunk ids for a query are memoized, so a repeated query
+        costs neither an embedding pass nor a search.
+        
+        Args:
+            query: The query to search for
+            k: The number of documents to retrieve
+            doc_types: Only return documents whose metadata type is one of these
+        
+        Returns:
+            (chunk id, document, relevance) tuples, most relevant first, with
+            relevance in (0, 1]
+        """
+        return self._retrieve(query, k, doc_types)[0]
+    
+    def retrieve_with_vector(self, query: str, k: int = 3,
+                             doc_types: Optional[Sequence[str]] = None) -> Tuple[List[Tuple[str, Document, float]], Optional[np.ndarray]]:
+        """
+        Retrieve like retrieve, also returning the query embedding it searched with.
+        
+        The embedding is memoized with the results, so it costs no extra
+        model pass even after the query vector cache has evicted it. It is
+        None when the lexical fast path answered the query without embedding it.
+        """
+        return self._retrieve(query, k, doc_types)
+    
+    def _retrieve(self, query: str, k: int, doc_types: Optional[Sequence[str]]) -> Tuple[List[Tuple[str, Document, float]], Optional[np.ndarray]]:
+        # Read the index once, so a concurrent re-index cannot mix generations
+        index = self._index
+        doc_types = tuple(sorted(doc_types)) if doc_types else None
+        query = self._normalize_query(query)
+        key = (index.key, query, k, doc_types)
+        cached = self._results_cache.get(key)
+        if cached is None:
+            cached = self._search(index, query, k, doc_types)
+            self._results_cache.put(key, cached)
+        
+        hits, vector = cached
+        return [(doc_id, index.document(doc_id), score) for doc_id, score in hits], vector
+    
+    async def aretrieve(self, query: str, k: int = 3, doc_types: Optional[Sequence[str]] = None) -> List[Tuple[str, Document, float]]:
+        """
+        Async variant of retrieve; concurrent queries share embedding passes.
+        """
+        return (await self._aretrieve(query, k, doc_types))[0]
+    
+    async def aretrieve_with_vector(self, query: str, k: int = 3,
+                                    doc_types: Optional[Sequence[str]] = None) -> Tuple[List[Tuple[str, Document, float]], Optional[np.ndarray]]:
+        """
+        Async variant of retrieve_with_vector.
+        """
+        return await self._aretrieve(query, k, doc_types)
+    
+    async def _aretrieve(self, query: str, k: int, doc_types: Optional[Sequence[str]]) -> Tuple[List[Tuple[str, Document, float]], Optional[np.ndarray]]:
+        index = self._index
+        doc_types = tuple(sorted(doc_types)) if doc_types else None
+        query = self._normalize_query(query)
+        key = (index.key, query, k, doc_types)
+        cached = self._results_cache.get(key)
+        if cached is None:
+            cached = await self._asearch(index, query, k, doc_types)
+            self._results_cache.put(key, cached)
+        
+        hits, vector = cached
+        return [(doc_id, index.document(doc_id), score) for doc_id, score in hits], vector
+    
     def get_context(self, query: str, k: int = 3) -> str:
         """
         Retrieve relevant context from the vector store based on the query.
@@ -57,14 +884,98 @@ class RAGSystem:
         Args:
             query: The query to search for
             k: The number of documents to retrieve
-            
+        
         Returns:
             A string containing the concatenated content of the retrieved documents
         """
         try:
-            docs = self.vector_store.similarity_search(query, k=k)
-            context = "\n\n".join([doc.page_content for doc in docs])
+            docs = self.retrieve(query, k=k)
+            context = "\n\n".join([doc.page_content for _, doc, _ in docs])
             return context
         except Exception as e:
             logging.error(f"Error retrieving context: {e}")
-            return ""
\ No newline at end of file
+            return ""
+    
+    async def aget_context(self, query: str, k: int = 3) -> str:
+        """
+        Async variant of get_context built on aretrieve.
+        
+        Args:
+            query: The query to search for
+            k: The number of documents to retrieve
+        
+        Returns:
+            A string containing the concatenated content of the retrieved documents
+        """
+        try:
+            docs = await self.aretrieve(query, k=k)
+            return "\n\n".join([doc.page_content for _, doc, _ in docs])
+        except Exception as e:
+            logging.error(f"Error retrieving context: {e}")
+            return ""
+    
+    def cache_stats(self):
+        """
+        Report hit counts for the query embedding and result caches, and
+        incremental re-index counters.
+        """
+        return {
+            "embedding_hits": self._embedding_cache.hits,
+            "embedding_misses": self._embedding_cache.misses,
+            "results_hits": self._results_cache.hits,
+            "results_misses": self._results_cache.misses,
+            "cached_queries": len(self._results_cache),
+            "lexical_searches": self.retrieval_counts["lexical"],
+            "hybrid_searches": self.retrieval_counts["hybrid"],
+            "dense_searches": self.retrieval_counts["dense"],
+            "indexed_chunks": len(self._index),
+            "index_memory_mapped": index_is_mapped(self.index_type),
+            "index_refreshes": self.reindex_counts["refreshes"],
+            "reindex_embedded_chunks": self.reindex_counts["embedded_chunks"],
+            "reindex_reused_chunks": self.reindex_counts["reused_chunks"],
+            "reindex_removed_chunks": self.reindex_counts["removed_chunks"],
+            "reindex_failures": self.reindex_counts["failures"],
+        }
+    
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Report retrieval cache, embedding and query batching metrics.
+        """
+        return {
+            "retrieval_cache": self.cache_stats(),
+            "embeddings": self.embeddings.stats(),
+            "query_batching": self.query_batcher.stats(),
+        }
+    
+    async def astats(self) -> Dict[str, Dict]:
+        """
+        Async variant of stats, matching the retrieval sidecar client.
+        """
+        return self.stats()
+
+def build_index_in_subprocess():
+    """
+    Build and persist the index in a fresh interpreter.
+    
+    A master that is about to fork its workers must not run the embedding
+    model: the intra-op thread pools and buffers it creates would be
+    inherited by every worker, where they can deadlock. The child builds
+    the index with the same environment, and the master then loads it with
+    ``RAGSystem(build=False)``.
+    
+    Raises:
+        subprocess.CalledProcessError: If the build failed
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(path for path in (str(get_project_root()), env.get("PYTHONPATH")) if path)
+    subprocess.run([sys.executable, "-m", "app.rag_system"], env=env, check=True)
+
+if __name__ == "__main__":
+    # Build the persisted index ahead of time, e.g. in a deploy step
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    RAGSystem()
\ No newline at end of file
@@ -0,0 +1,263 @@
+from langchain_core.documents import Document
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import numpy as np
+
+# Responses hold a few chunks or one query vector, which can exceed
+# asyncio's 64 KiB default line limit
+STREAM_LIMIT = 16 * 2**20
+
+def encode_results(results: Sequence[Tuple[str, Document, float]]) -> List[list]:
+    return [[doc_id, doc.page_content, doc.metadata, score] for doc_id, doc, score in results]
+
+def decode_results(rows: Sequence[list]) -> List[Tuple[str, Document, float]]:
+    return [(doc_id, Document(page_content=text, metadata=metadata), score) for doc_id, text, metadata, score in rows]
+
+class RetrievalServer:
+    """
+    Serves one RAGSystem to every web worker on a host over a Unix socket.
+    
+    Where workers cannot inherit the embedding model and index from a
+    preloading master (``uvicorn --workers`` spawns fresh interpreters),
+    they connect here instead of loading their own copies. Requests and
+    responses are single lines of JSON. Retrieval goes through
+    ``aretrieve``, so queries from all workers share one set of caches and
+    one embedding micro-batcher.
+    """
+    def __init__(self, rag, socket_path: str):
+        self.rag = rag
+        self.socket_path = socket_path
+        self.requests = 0
+    
+    async def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "retrieve":
+            args = (request["query"], request.get("k", 3), request.get("doc_types"))
+            if not request.get("vector"):
+                return {"results": encode_results(await self.rag.aretrieve(*args))}
+            results, vector = await self.rag.aretrieve_with_vector(*args)
+            return {"results": encode_results(results), "vector": vector.tolist() if vector is not None else None}
+        if op == "info":
+            return {
+                "pdf_path": self.rag.pdf_path,
+                "projects_path": self.rag.projects_path,
+                "personal_info_path": self.rag.personal_info_path,
+            }
+        if op == "stats":
+            return {**self.rag.stats(), "sidecar_requests": self.requests}
+        raise ValueError(f"Unknown operation {op!r}")
+    
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                try:
+                    response = await self.handle(json.loads(line))
+                except Exception as e:
+                    logging.error(f"Error handling retrieval request: {e}")
+                    response = {"error": str(e)}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def serve_forever(self):
+        # A socket left behind by a previous run would make the bind fail
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._serve_connection, path=self.socket_path, limit=STREAM_LIMIT)
+        logging.info(f"Retrieval sidecar listening on {self.socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+def run(socket_path: str):
+    """
+    Build the RAG system, warm it and serve it until interrupted.
+    """
+    from .rag_system import RAGSystem
+    
+    rag = RAGSystem()
+    rag.warm_up()
+    # The sidecar owns the index, so it is the only process re-indexing edits
+    rag.start_watcher()
+    try:
+        asyncio.run(RetrievalServer(rag, socket_path).serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rag.stop_watcher()
+
+class RetrievalClient:
+    """
+    Stands in for RAGSystem in a web worker, forwarding to the sidecar.
+    
+    Implements the parts of the RAGSystem interface the API uses. Async
+    requests reuse pooled connections; sync requests open one connection
+    each.
+    """
+    def __init__(self, socket_path: str, timeout: float = 30.0, connect_timeout: float = 120.0):
+        """
+        Args:
+            socket_path: The sidecar's Unix socket
+            timeout: Seconds to wait for each response
+            connect_timeout: Seconds to wait for the sidecar to start listening,
+                which it only does once its index is loaded
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.requests = 0
+        self.connections = 0
+        
+        info = self._wait_for_sidecar(connect_timeout)
+        self.pdf_path = info["pdf_path"]
+        self.projects_path = info["projects_path"]
+        self.personal_info_path = info["personal_info_path"]
+    
+    def _wait_for_sidecar(self, connect_timeout: float) -> Dict[str, Any]:
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                return self._request({"op": "info"})
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise ConnectionError(f"Retrieval sidecar is not listening on {self.socket_path}")
+                time.sleep(0.5)
+    
+    @staticmethod
+    def _unwrap(line: bytes) -> Dict[str, Any]:
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"Retrieval sidecar error: {response['error']}")
+        return response
+    
+    def _request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as stream:
+                line = stream.readline()
+        self.requests += 1
+        if not line:
+            raise ConnectionError("Retrieval sidecar closed the connection")
+        return self._unwrap(line)
+    
+    async def _arequest(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        # Pooled connections may have been closed by a restarted sidecar; the
+        # request then moves on to the next one and finally a new connection
+        while True:
+            pooled = bool(self._idle)
+            if pooled:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=STREAM_LIMIT)
+                self.connections += 1
+            try:
+                writer.write(data)
+                await writer.drain()
+                line = await asyncio.wait_for(reader.readline(), timeout or self.timeout)
+            except ConnectionError:
+                writer.close()
+                if pooled:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if line:
+                break
+            writer.close()
+            if not pooled:
+                raise ConnectionError("Retrieval sidecar closed the connection")
+        self.requests += 1
+        self._idle.append((reader, writer))
+        return self._unwrap(line)
+    
+    @staticmethod
+    def _retrieve_request(query: str, k: int, doc_types: Optional[Sequence[str]], vector: bool = False) -> Dict[str, Any]:
+        return {"op": "retrieve", "query": query, "k": k, "doc_types": list(doc_types) if doc_types else None, "vector": vector}
+    
+    @staticmethod
+    def _decode_vector(response: Dict[str, Any]) -> Optional[np.ndarray]:
+        vector = response.get("vector")
+        return np.asarray(vector, dtype=np.float32) if vector is not None else None
+    
+    def retrieve(self, query: str, k: int = 3, doc_types: Optional[Sequence[str]] = None) -> List[Tuple[str, Document, float]]:
+        response = self._request(self._retrieve_request(query, k, doc_types))
+        return decode_results(response["results"])
+    
+    async def aretrieve(self, query: str, k: int = 3, doc_types: Optional[Sequence[str]] = None) -> List[Tuple[str, Document, float]]:
+        response = await self._arequest(self._retrieve_request(query, k, doc_types))
+        return decode_results(response["results"])
+    
+    def retrieve_with_vector(self, query: str, k: int = 3,
+                             doc_types: Optional[Sequence[str]] = None) -> Tuple[List[Tuple[str, Document, float]], Optional[np.ndarray]]:
+        response = self._request(self._retrieve_request(query, k, doc_types, vector=True))
+        return decode_results(response["results"]), self._decode_vector(response)
+    
+    async def aretrieve_with_vector(self, query: str, k: int = 3,
+                                    doc_types: Optional[Sequence[str]] = None) -> Tuple[List[Tuple[str, Document, float]], Optional[np.ndarray]]:
+        # The vector rides along with the results, so reusing it costs no extra round trip
+        response = await self._arequest(self._retrieve_request(query, k, doc_types, vector=True))
+        return decode_results(response["results"]), self._decode_vector(response)
+    
+    def warm_up(self, run_model: bool = True):
+        # The sidecar warms its own model before it starts listening
+        pass
+    
+    def start_watcher(self, interval: Optional[float] = None):
+        # The sidecar watches and re-indexes the sources for every worker
+        pass
+    
+    def stop_watcher(self):
+        pass
+    
+    async def astats(self, timeout: float = 2.0) -> Dict[str, Any]:
+        """
+        Report the sidecar's retrieval metrics and this worker's request counts.
+        
+        Args:
+            timeout: Seconds to wait for the sidecar; a metrics scrape should
+                not hang on it for as long as a retrieval request may
+        """
+        stats = await self._arequest({"op": "stats"}, timeout)
+        stats["retrieval_sidecar"] = {
+            "socket": self.socket_path,
+            "requests": self.requests,
+            "connections": self.connections,
+            "idle_connections": len(self._idle),
+            "sidecar_requests": stats.pop("sidecar_requests"),
+        }
+        return stats
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    parser = argparse.ArgumentParser(description="Serve retrieval to the web workers over a Unix socket")
+    parser.add_argument("--socket", default=os.getenv("RAG_SIDECAR_SOCKET"), help="Socket path (default: RAG_SIDECAR_SOCKET)")
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("set RAG_SIDECAR_SOCKET or pass --socket")
+    run(args.socket)
\ No newline at end of file
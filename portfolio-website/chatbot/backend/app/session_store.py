@@ -0,0 +1,443 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+class SessionStore(ABC):
+    """
+    Storage for per-session conversation history.
+    
+    Implementations bound memory with an LRU cap on the number of sessions,
+    evict sessions that have been idle longer than the TTL, and keep at most
+    ``max_messages`` messages per session. Older turns can be folded into a
+    per-session summary, so a long conversation holds one summary plus a
+    few recent messages.
+    """
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600, max_messages: int = 50):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+    
+    @abstractmethod
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        Get the conversation history for a session.
+        
+        Args:
+            session_id: The session to look up
+        
+        Returns:
+            The session's messages, oldest first, or an empty list if unknown
+        """
+    
+    @abstractmethod
+    def append_message(self, session_id: str, message: Dict[str, str]) -> List[Dict[str, str]]:
+        """
+        Append a message to a session, creating the session if needed.
+        
+        Args:
+            session_id: The session to update
+            message: A message dictionary with 'role' and 'content' keys
+        
+        Returns:
+            The session's history after the append
+        """
+    
+    @abstractmethod
+    def get_summary(self, session_id: str) -> str:
+        """
+        Get the rolling summary of a session's folded turns, or "" if none.
+        """
+    
+    @abstractmethod
+    def fold_history(self, session_id: str, summary: str, folded: List[Dict[str, str]]) -> int:
+        """
+        Replace the oldest messages of a session with an updated summary.
+        
+        Messages may have been appended (or trimmed by the message cap) since
+        ``folded`` was read, so only stored messages that match ``folded`` in
+        order from the oldest are removed.
+        
+        Args:
+            session_id: The session to update
+            summary: The new summary, covering the folded messages
+            folded: The messages the summary now covers, oldest first
+        
+        Returns:
+            The number of messages removed
+        """
+    
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """
+        Remove a session and its history.
+        """
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report session counts, evictions and approximate memory use.
+        """
+
+def _message_size(message: Dict[str, str]) -> int:
+    """
+    Approximate memory held by a message dictionary and its strings.
+    """
+    return sys.getsizeof(message) + sum(sys.getsizeof(value) for value in message.values())
+
+def _same_message(a: Dict[str, str], b: Dict[str, str]) -> bool:
+    return a.get("role") == b.get("role") and a.get("content") == b.get("content")
+
+class _Session:
+    __slots__ = ("messages", "summary", "last_access", "size")
+    
+    def __init__(self, max_messages: int):
+        self.messages: Deque[Dict[str, str]] = deque(maxlen=max_messages)
+        self.summary = ""
+        self.last_access = time.monotonic()
+        self.size = 0
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local session store backed by an LRU-ordered dictionary.
+    """
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600, max_messages: int = 50):
+        super().__init__(max_sessions, ttl_seconds, max_messages)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._evicted_lru = 0
+        self._evicted_ttl = 0
+        self._trimmed_messages = 0
+        self._folded_messages = 0
+    
+    def _expire(self, now: float):
+        # Sessions are kept in access order, so expired ones are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            self._drop(session_id)
+            self._evicted_ttl += 1
+    
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._size -= session.size
+    
+    def _touch(self, session_id: str, now: float) -> Optional[_Session]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+        return session
+    
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._touch(session_id, now)
+            return list(session.messages) if session is not None else []
+    
+    def append_message(self, session_id: str, message: Dict[str, str]) -> List[Dict[str, str]]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._touch(session_id, now)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self.max_messages)
+                while len(self._sessions) > self.max_sessions:
+                    self._drop(next(iter(self._sessions)))
+                    self._evicted_lru += 1
+            
+            if len(session.messages) == session.messages.maxlen:
+                dropped = _message_size(session.messages[0])
+                session.size -= dropped
+                self._size -= dropped
+                self._trimmed_messages += 1
+            
+            added = _message_size(message)
+            session.messages.append(message)
+            session.size += added
+            self._size += added
+            return list(session.messages)
+    
+    def get_summary(self, session_id: str) -> str:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.summary if session is not None else ""
+    
+    def fold_history(self, session_id: str, summary: str, folded: List[Dict[str, str]]) -> int:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return 0
+            
+            removed = 0
+            for message in folded:
+                if session.messages and _same_message(session.messages[0], message):
+                    dropped = _message_size(session.messages.popleft())
+                    session.size -= dropped
+                    self._size -= dropped
+                    removed += 1
+            
+            delta = sys.getsizeof(summary) - sys.getsizeof(session.summary)
+            session.summary = summary
+            session.size += delta
+            self._size += delta
+            self._folded_messages += removed
+            return removed
+    
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "messages": sum(len(s.messages) for s in self._sessions.values()),
+                "approx_bytes": self._size,
+                "evicted_lru": self._evicted_lru,
+                "evicted_ttl": self._evicted_ttl,
+                "trimmed_messages": self._trimmed_messages,
+                "folded_messages": self._folded_messages,
+                "summarized_sessions": sum(1 for s in self._sessions.values() if s.summary),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "max_messages": self.max_messages,
+            }
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store backed by a local SQLite file.
+    
+    All uvicorn workers on a host can point at the same database file, so a
+    session keeps its history regardless of which worker serves a request.
+    """
+    def __init__(self, db_path: str, max_sessions: int = 10000, ttl_seconds: float = 3600,
+                 max_messages: int = 50, sweep_interval: float = 30):
+        super().__init__(max_sessions, ttl_seconds, max_messages)
+        self.db_path = db_path
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._evicted_lru = 0
+        self._evicted_ttl = 0
+        self._folded_messages = 0
+        
+        self._pid = os.getpid()
+        self._connection = self._connect()
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                last_access REAL NOT NULL,
+                summary TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+            CREATE TABLE IF NOT EXISTS messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, seq);
+        """)
+        # Databases created before summaries existed lack the column
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+        if "summary" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT ''")
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Workers forked after the store was created (gunicorn --preload)
+        # reconnect; the parent's connection is kept but never used or closed
+        if self._pid != os.getpid():
+            self._inherited = self._connection
+            self._connection = self._connect()
+            self._pid = os.getpid()
+        return self._connection
+    
+    def _sweep(self, now: float):
+        """
+        Evict idle sessions and enforce the session cap.
+        
+        Runs at most once per ``sweep_interval`` since it scans the index.
+        """
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        
+        cursor = self._conn.execute(
+            "DELETE FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,)
+        )
+        self._evicted_ttl += cursor.rowcount
+        
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        if count > self.max_sessions:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE session_id IN "
+                "(SELECT session_id FROM sessions ORDER BY last_access LIMIT ?)",
+                (count - self.max_sessions,)
+            )
+            self._evicted_lru += cursor.rowcount
+        
+        self._conn.execute(
+            "DELETE FROM messages WHERE session_id NOT IN (SELECT session_id FROM sessions)"
+        )
+    
+    def _read(self, session_id: str) -> List[Dict[str, str]]:
+        rows = self._conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq",
+            (session_id,)
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+    
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None or now - row[0] > self.ttl_seconds:
+                return []
+            self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id)
+            )
+            return self._read(session_id)
+    
+    def append_message(self, session_id: str, message: Dict[str, str]) -> List[Dict[str, str]]:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                if row is not None and now - row[0] > self.ttl_seconds:
+                    # Expired but not swept yet: start the session over
+                    self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                    self._conn.execute("UPDATE sessions SET summary = '' WHERE session_id = ?", (session_id,))
+                    self._evicted_ttl += 1
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, last_access) VALUES (?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET last_access = excluded.last_access",
+                    (session_id, now)
+                )
+                self._conn.execute(
+                    "INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)",
+                    (session_id, message.get("role", ""), message.get("content", ""))
+                )
+                self._conn.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND seq NOT IN "
+                    "(SELECT seq FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?)",
+                    (session_id, session_id, self.max_messages)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._read(session_id)
+    
+    def get_summary(self, session_id: str) -> str:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            return row[0] if row is not None else ""
+    
+    def fold_history(self, session_id: str, summary: str, folded: List[Dict[str, str]]) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT seq, role, content FROM messages WHERE session_id = ? ORDER BY seq LIMIT ?",
+                    (session_id, len(folded))
+                ).fetchall()
+                
+                removed = []
+                position = 0
+                for message in folded:
+                    if position < len(rows) and _same_message({"role": rows[position][1], "content": rows[position][2]}, message):
+                        removed.append((rows[position][0],))
+                        position += 1
+                
+                self._conn.executemany("DELETE FROM messages WHERE seq = ?", removed)
+                cursor = self._conn.execute(
+                    "UPDATE sessions SET summary = ? WHERE session_id = ?", (summary, session_id)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if cursor.rowcount == 0:
+                return 0
+            self._folded_messages += len(removed)
+            return len(removed)
+    
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (sessions,) = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            messages, content_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0) FROM messages"
+            ).fetchone()
+            summarized, summary_bytes = self._conn.execute(
+                "SELECT COUNT(NULLIF(summary, '')), COALESCE(SUM(LENGTH(CAST(summary AS BLOB))), 0) FROM sessions"
+            ).fetchone()
+            (page_count,) = self._conn.execute("PRAGMA page_count").fetchone()
+            (page_size,) = self._conn.execute("PRAGMA page_size").fetchone()
+            return {
+                "backend": "sqlite",
+                "sessions": sessions,
+                "messages": messages,
+                "approx_bytes": content_bytes + summary_bytes,
+                "db_bytes": page_count * page_size,
+                "evicted_lru": self._evicted_lru,
+                "evicted_ttl": self._evicted_ttl,
+                "folded_messages": self._folded_messages,
+                "summarized_sessions": summarized,
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "max_messages": self.max_messages,
+            }
+
+def create_session_store() -> SessionStore:
+    """
+    Create the session store selected by the SESSION_STORE environment variable.
+    
+    Returns:
+        An in-memory store (default) or a SQLite store shared across workers
+    """
+    backend = os.getenv("SESSION_STORE", "memory").lower()
+    options = {
+        "max_sessions": int(os.getenv("SESSION_MAX_SESSIONS", 10000)),
+        "ttl_seconds": float(os.getenv("SESSION_TTL_SECONDS", 3600)),
+        "max_messages": int(os.getenv("SESSION_MAX_MESSAGES", 50)),
+    }
+    
+    if backend == "sqlite":
+        db_path = os.getenv("SESSION_DB_PATH", "sessions.db")
+        logging.info(f"Using SQLite session store at {db_path}")
+        return SQLiteSessionStore(db_path, **options)
+    if backend != "memory":
+        raise ValueError(f"Unsupported session store: {backend}")
+    return InMemorySessionStore(**options)
\ No newline at end of file
@@ -0,0 +1,135 @@
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence
+import asyncio
+import logging
+import random
+import time
+from .intents import DETERMINISTIC_RESPONSES, get_intent_matcher
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+def deterministic_response(message: str, responses: Mapping[str, Any]) -> Optional[str]:
+    """
+    Answer a message from the pre-rendered response table.
+    
+    Used while the chatbot is loading, so every message of a deterministic
+    intent is answered, however specific; greetings pick one of several
+    alternatives.
+    
+    Args:
+        message: The user's message
+        responses: Responses rendered by the data registry
+    
+    Returns:
+        The response text, or None when the message needs the LLM
+    """
+    intent = get_intent_matcher().match(message).intent
+    if intent == "greeting":
+        return random.choice(responses["greetings"])
+    key = DETERMINISTIC_RESPONSES.get(intent)
+    return responses[key] if key else None
+
+class StartupTracker:
+    """
+    Warm state of the components loaded after the server starts accepting
+    requests.
+    
+    Each component moves from pending to loading to ready, or to failed
+    with the error that stopped it. The tracker also records how long after
+    it was created the first request was accepted, which is the start-up
+    latency a visitor actually sees.
+    """
+    def __init__(self, components: Sequence[str]):
+        self.started_at = time.monotonic()
+        self._components: Dict[str, Dict[str, Any]] = {
+            name: {"state": PENDING, "seconds": None, "error": None} for name in components
+        }
+        self.first_request_seconds: Optional[float] = None
+        self.warm_responses = 0
+        self.rejected_requests = 0
+    
+    async def stage(self, name: str, load: Callable[[], Any]) -> Any:
+        """
+        Run one start-up stage in a worker thread and record its outcome.
+        
+        Args:
+            name: The component being loaded
+            load: Blocking function that loads it
+        
+        Returns:
+            The result of ``load``, or None if it failed
+        """
+        component = self._components[name]
+        component["state"] = LOADING
+        began = time.monotonic()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, load)
+        except Exception as e:
+            component.update(state=FAILED, seconds=time.monotonic() - began, error=str(e))
+            logging.error(f"Error initializing {name}: {e}")
+            return None
+        component.update(state=READY, seconds=time.monotonic() - began)
+        logging.info(f"{name} ready in {component['seconds']:.2f}s")
+        return result
+    
+    def fail(self, name: str, error: str):
+        """
+        Mark a component as failed without loading it, e.g. when a component it depends on failed.
+        """
+        self._components[name].update(state=FAILED, error=error)
+    
+    def is_ready(self, name: Optional[str] = None) -> bool:
+        """
+        Check whether one component, or every component, is ready.
+        """
+        if name is not None:
+            return self._components[name]["state"] == READY
+        return all(component["state"] == READY for component in self._components.values())
+    
+    def is_failed(self, name: str) -> bool:
+        return self._components[name]["state"] == FAILED
+    
+    def accepted(self, warm: bool = False):
+        """
+        Record a request that was answered; ``warm`` marks one answered
+        from the pre-rendered responses while components were loading.
+        """
+        if self.first_request_seconds is None:
+            self.first_request_seconds = time.monotonic() - self.started_at
+        if warm:
+            self.warm_responses += 1
+    
+    def rejected(self):
+        self.rejected_requests += 1
+    
+    def status(self) -> str:
+        states = [component["state"] for component in self._components.values()]
+        if all(state == READY for state in states):
+            return READY
+        if FAILED in states:
+            return FAILED
+        return LOADING
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report the overall status and the state of each component.
+        """
+        return {
+            "status": self.status(),
+            "uptime_seconds": time.monotonic() - self.started_at,
+            "components": {name: dict(component) for name, component in self._components.items()},
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report start-up latency: seconds per component and until the first accepted request.
+        """
+        return {
+            "status": self.status(),
+            "component_seconds": {name: component["seconds"] for name, component in self._components.items()},
+            "time_to_first_request_seconds": self.first_request_seconds,
+            "warm_responses": self.warm_responses,
+            "rejected_requests": self.rejected_requests,
+        }
\ No newline at end of file
@@ -0,0 +1,97 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+from .llm_manager import ERROR_RESPONSE
+from .session_store import SessionStore
+
+SUMMARY_PROMPT = """
+Update the running summary of a conversation between a visitor and a portfolio assistant.
+Keep the facts the assistant shared, the visitor's name, interests and open questions.
+Write at most {max_words} words of plain prose.
+
+Current summary: {summary}
+
+New messages:
+{messages}
+
+Updated summary:
+"""
+
+class ConversationSummarizer:
+    """
+    Folds older conversation turns into a rolling per-session summary.
+    
+    Once a session holds more than ``threshold`` messages, everything except
+    the last ``keep_recent`` messages is summarized together with the
+    existing summary in a background task, and those messages are removed
+    from the session store. Each conversation therefore stays at one summary
+    plus a bounded number of recent turns, however long it runs.
+    """
+    def __init__(self, llm, store: SessionStore, threshold: int = 12, keep_recent: int = 6, max_words: int = 150):
+        self.llm = llm
+        self.store = store
+        self.threshold = threshold
+        self.keep_recent = keep_recent
+        self.max_words = max_words
+        # One summarization per session at a time; also keeps the tasks referenced
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.folds = 0
+        self.folded_messages = 0
+        self.failures = 0
+    
+    def schedule(self, session_id: str, history: List[Dict[str, str]]) -> Optional[asyncio.Task]:
+        """
+        Start summarizing a session in the background if its history is long enough.
+        
+        Args:
+            session_id: The session to summarize
+            history: The session's current messages, oldest first
+        
+        Returns:
+            The background task, or None if no summarization was started
+        """
+        if len(history) <= self.threshold or session_id in self._pending:
+            return None
+        folded = history[:-self.keep_recent] if self.keep_recent else list(history)
+        task = asyncio.create_task(self._summarize(session_id, folded))
+        self._pending[session_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(session_id, None))
+        return task
+    
+    async def _summarize(self, session_id: str, folded: List[Dict[str, str]]):
+        messages = "".join(
+            f"{'User' if m.get('role') == 'user' else 'Assistant'}: {m.get('content', '')}\n"
+            for m in folded
+        )
+        prompt = SUMMARY_PROMPT.format(
+            max_words=self.max_words,
+            summary=self.store.get_summary(session_id) or "None yet.",
+            messages=messages
+        )
+        try:
+            # Summary prompts are unique to a session; caching them would
+            # only evict real answers and skew the cache hit rate
+            summary = (await self.llm.agenerate_response(prompt, use_cache=False)).strip()
+        except Exception as e:
+            logging.error(f"Error summarizing session {session_id}: {e}")
+            summary = ""
+        
+        if not summary or summary == ERROR_RESPONSE:
+            # Keep the raw turns; the next reply will try again
+            self.failures += 1
+            return
+        self.folded_messages += self.store.fold_history(session_id, summary, folded)
+        self.folds += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report summarization counters.
+        """
+        return {
+            "threshold": self.threshold,
+            "keep_recent": self.keep_recent,
+            "in_progress": len(self._pending),
+            "folds": self.folds,
+            "folded_messages": self.folded_messages,
+            "failures": self.failures,
+        }
\ No newline at end of file
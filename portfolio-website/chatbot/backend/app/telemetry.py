@@ -0,0 +1,226 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+
+# Seconds, from a dictionary lookup to a slow LLM completion
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+# Starlette appends the charset to text/ media types
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# A collector returns (name, type, help, [(labels, value), ...]) families
+MetricFamily = Tuple[str, str, str, Sequence[Tuple[Mapping[str, str], float]]]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """
+    Prometheus histogram with fixed buckets and optional labels.
+    """
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+    
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Observation count and mean per label combination.
+        """
+        with self._lock:
+            return {
+                ",".join(key) or "all": {"count": count, "mean": total / count if count else 0.0}
+                for key, (_, total, count) in sorted(self._series.items())
+            }
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Renders histograms and collected component counters in the Prometheus
+    text exposition format.
+    
+    Histograms are updated on the hot path. Counters the components already
+    keep (cache hits, search counts) are read by collectors at scrape time
+    instead of being duplicated.
+    """
+    def __init__(self):
+        self._histograms: List[Histogram] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+    
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  label_names: Sequence[str] = ()) -> Histogram:
+        histogram = Histogram(name, documentation, buckets, label_names)
+        self._histograms.append(histogram)
+        return histogram
+    
+    def add_collector(self, collect: Callable[[], Iterable[MetricFamily]]):
+        self._collectors.append(collect)
+    
+    def render(self) -> str:
+        lines = []
+        for histogram in self._histograms:
+            lines.extend(histogram.render())
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                logging.error(f"Error collecting metrics: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "chatbot_stage_seconds", "Time spent in each stage of a chat request (graph nodes, embedding, search)",
+    label_names=("stage",)
+)
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "llm_time_to_first_token_seconds", "Time from sending a prompt to the first streamed token",
+    label_names=("provider",)
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "llm_request_seconds", "Total time of an LLM completion", label_names=("provider",)
+)
+PROMPT_TOKENS = REGISTRY.histogram("chatbot_prompt_tokens", "Tokens per prompt sent to the LLM", TOKEN_BUCKETS)
+COMPLETION_TOKENS = REGISTRY.histogram("chatbot_completion_tokens", "Tokens per LLM-handled response", TOKEN_BUCKETS)
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request, including streamed bodies",
+    label_names=("method", "path", "status")
+)
+
+class RequestTimings:
+    """
+    Durations of the stages of one request, for its Server-Timing header.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+    
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+    
+    def header(self) -> str:
+        entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+# Set by ServerTimingMiddleware for the request being handled; graph nodes
+# and tasks started from it inherit the context and share the same object
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def record(stage: str, seconds: float, histogram: Optional[Histogram] = None, **labels: str):
+    """
+    Record a stage duration for the current request.
+    
+    Args:
+        stage: Name of the stage in the Server-Timing header
+        seconds: The duration
+        histogram: Histogram to observe it in; defaults to the per-stage
+            histogram labelled with ``stage``
+        labels: Labels for ``histogram``
+    """
+    if histogram is None:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    else:
+        histogram.observe(seconds, **labels)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Time the enclosed block as a request stage; also usable around an ``await``.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that times every HTTP request and reports the stages
+    recorded while handling it in a Server-Timing header.
+    
+    Headers are sent before a streamed body, so streamed responses only
+    list the stages that finished before the first byte.
+    """
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        status_code = 500
+        
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # Unmatched paths are grouped so scanners cannot grow the label set
+            path = scope["path"] if status_code != 404 else "unmatched"
+            HTTP_SECONDS.observe(time.perf_counter() - timings.started, method=scope["method"], path=path, status=str(status_code))
\ No newline at end of file
@@ -1,6 +1,11 @@
 import json
+import logging
 import os
-from typing import Dict, Any, Optional
+import threading
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Callable, List, Mapping, NamedTuple, Optional, Tuple
 from pathlib import Path
 
 def load_json_data(file_path: str) -> Dict[str, Any]:
@@ -20,6 +25,34 @@ def load_json_data(file_path: str) -> Dict[str, Any]:
         print(f"Error loading data from {file_path}: {e}")
         return {}
 
+def load_projects(file_path: str) -> List[Dict[str, Any]]:
+    """
+    Load the project entries from projects.json
+    
+    Args:
+        file_path: Path to the projects file, either a bare list of projects
+            or an object with a "projects" list
+        
+    Returns:
+        List of project dictionaries, empty if the file is missing or invalid
+    """
+    projects = load_json_data(file_path)
+    if isinstance(projects, dict):
+        projects = projects.get("projects", [])
+    return [project for project in projects or [] if isinstance(project, dict)]
+
+def project_title(project: Mapping[str, Any]) -> str:
+    """
+    Get a project's display title; entries use either "title" or "name"
+    
+    Args:
+        project: Dictionary containing project data
+        
+    Returns:
+        The title, or an empty string if the entry has neither
+    """
+    return project.get("title") or project.get("name") or ""
+
 def get_project_root() -> Path:
     """
     Get the project root directory
@@ -56,47 +89,230 @@ def get_env_variable(name: str, default: Optional[str] = None) -> str:
     """
     return os.environ.get(name, default)
 
-def format_project_data(project: Dict[str, Any]) -> str:
+def format_project_data(project: Mapping[str, Any], include_highlights: bool = True) -> str:
     """
     Format project data for chat response
     
     Args:
         project: Dictionary containing project data
+        include_highlights: Whether to list the project's highlights
         
     Returns:
         Formatted string representation of the project
     """
-    formatted = f"**{project.get('title', 'Untitled Project')}**\n"
-    formatted += f"{project.get('description', 'No description available')}\n"
+    lines = [
+        f"**{project_title(project) or 'Untitled Project'}**",
+        project.get('description', 'No description available'),
+    ]
     
-    if 'technologies' in project and project['technologies']:
-        formatted += f"Technologies: {', '.join(project['technologies'])}\n"
+    if project.get('technologies'):
+        lines.append(f"Technologies: {', '.join(project['technologies'])}")
         
-    if 'github_link' in project and project['github_link']:
-        formatted += f"GitHub: {project['github_link']}\n"
+    if project.get('github_link'):
+        lines.append(f"GitHub: {project['github_link']}")
         
-    if 'highlights' in project and project['highlights']:
-        formatted += "Highlights:\n"
-        for highlight in project['highlights']:
-            formatted += f"- {highlight}\n"
+    if include_highlights and project.get('highlights'):
+        lines.append("Highlights:")
+        lines.extend(f"- {highlight}" for highlight in project['highlights'])
             
-    return formatted + "\n"
+    return "\n".join(lines) + "\n\n"
 
-def format_skills_data(skills: Dict[str, Any]) -> str:
+def format_skills_data(skills: Any) -> str:
     """
     Format skills data for chat response
     
     Args:
-        skills: Dictionary containing skills data by category
+        skills: Skills by category, either as a mapping of category to skill
+            list or as a list of {"category": ..., "items": [...]} entries
         
     Returns:
         Formatted string representation of skills
     """
     if not skills:
         return "No skills information available."
+    
+    if isinstance(skills, Mapping):
+        categories = skills.items()
+    else:
+        categories = ((entry.get("category", ""), entry.get("items", ())) for entry in skills)
         
-    formatted = "Skills:\n"
-    for category, skill_list in skills.items():
-        formatted += f"- {category}: {', '.join(skill_list)}\n"
+    lines = ["Skills:"]
+    lines.extend(f"- {category}: {', '.join(skill_list)}" for category, skill_list in categories)
+        
+    return "\n".join(lines) + "\n"
+
+def render_responses(projects: Tuple[Mapping[str, Any], ...], personal_info: Mapping[str, Any]) -> Mapping[str, Any]:
+    """
+    Pre-render the answers for intents that depend only on the data files
+    
+    Args:
+        projects: Project entries
+        personal_info: Personal information
         
-    return formatted
\ No newline at end of file
+    Returns:
+        Read-only mapping of response name to rendered text; "greetings" holds
+        a tuple of alternative greetings
+    """
+    name = personal_info.get("name", "the portfolio owner")
+    
+    greeting = (
+        f"Hello! I'm the portfolio assistant for {name}. "
+        "I can tell you about their background, skills, projects, or how to get in touch. "
+        "What would you like to know?"
+    )
+    greetings = (
+        f"Hello! I'm {name}'s portfolio assistant. How can I help you today?",
+        f"Hi there! Welcome to {name}'s portfolio. What would you like to know?",
+        f"Greetings! I'm here to tell you about {name}'s work and experience. What are you interested in?",
+    )
+    
+    title = personal_info.get("title", "AI Engineer")
+    summary = personal_info.get("summary", "An experienced professional")
+    about_me = f"{name} is a {title}. {summary}\n\n"
+    skills = personal_info.get("skills")
+    if skills:
+        about_me += format_skills_data(skills)
+    
+    if not projects:
+        projects_response = "I don't have any project information available at the moment."
+    else:
+        projects_response = "Here are some notable projects:\n\n" + "".join(
+            format_project_data(project, include_highlights=False) for project in projects
+        )
+    
+    contact_info = personal_info.get("contact", {})
+    if not contact_info:
+        contact = "I don't have contact information available at the moment."
+    else:
+        lines = ["Here's how you can get in touch:", ""]
+        for key, label in (("email", "Email"), ("linkedin", "LinkedIn"), ("github", "GitHub"), ("twitter", "Twitter")):
+            if contact_info.get(key):
+                lines.append(f"{label}: {contact_info[key]}")
+        contact = "\n".join(lines) + "\n"
+    
+    return MappingProxyType({
+        "greeting": greeting,
+        "greetings": greetings,
+        "about_me": about_me,
+        "projects": projects_response,
+        "contact": contact,
+    })
+
+def freeze(value: Any) -> Any:
+    """
+    Recursively convert JSON data into immutable equivalents
+    
+    Args:
+        value: Parsed JSON value
+        
+    Returns:
+        The value with dicts as read-only mappings and lists as tuples
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+class PortfolioData(NamedTuple):
+    """
+    Immutable snapshot of the portfolio data files
+    """
+    projects: Tuple[Mapping[str, Any], ...]
+    personal_info: Mapping[str, Any]
+    # Pre-rendered answers for the deterministic intents, see render_responses
+    responses: Mapping[str, Any]
+    version: int
+
+class DataRegistry:
+    """
+    Shared, read-only view of projects.json and personal_info.json
+    
+    The files are parsed once and handed out as frozen objects together with
+    the pre-rendered deterministic responses. Their mtimes
+    are checked at most every ``check_interval`` seconds; when either file
+    changes, a complete new snapshot is built and swapped in, so readers
+    always see a consistent pair of files and never touch the disk.
+    """
+    def __init__(self, projects_path: Optional[str] = None, personal_info_path: Optional[str] = None,
+                 check_interval: float = 1.0):
+        self.projects_path = projects_path or get_data_path("projects.json")
+        self.personal_info_path = personal_info_path or get_data_path("personal_info.json")
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[PortfolioData], None]] = []
+        self._last_check = time.monotonic()
+        self._mtimes = self._stat()
+        self._snapshot = self._load(version=1)
+    
+    def _stat(self) -> Tuple[Optional[int], Optional[int]]:
+        mtimes = []
+        for path in (self.projects_path, self.personal_info_path):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+    
+    def _load(self, version: int) -> PortfolioData:
+        projects = freeze(load_projects(self.projects_path))
+        personal_info = freeze(load_json_data(self.personal_info_path) or {})
+        return PortfolioData(
+            projects=projects,
+            personal_info=personal_info,
+            responses=render_responses(projects, personal_info),
+            version=version
+        )
+    
+    def get(self) -> PortfolioData:
+        """
+        Get the current data snapshot, reloading it if the files changed
+        
+        Returns:
+            The latest PortfolioData snapshot
+        """
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._refresh(now)
+        return self._snapshot
+    
+    def _refresh(self, now: float):
+        # Only one caller stats and reloads; the rest keep the current snapshot
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = now
+            mtimes = self._stat()
+            if mtimes == self._mtimes:
+                return
+            self._mtimes = mtimes
+            snapshot = self._load(version=self._snapshot.version + 1)
+            self._snapshot = snapshot
+            logging.info(f"Reloaded portfolio data (version {snapshot.version})")
+        finally:
+            self._lock.release()
+        
+        for listener in list(self._listeners):
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logging.error(f"Error in data reload listener: {e}")
+    
+    def subscribe(self, listener: Callable[[PortfolioData], None]):
+        """
+        Register a callback to run with each new snapshot after a reload
+        
+        Args:
+            listener: Callable taking the new PortfolioData
+        """
+        self._listeners.append(listener)
+
+@lru_cache(maxsize=None)
+def get_data_registry() -> DataRegistry:
+    """
+    Get the process-wide data registry
+    
+    Returns:
+        The shared DataRegistry instance
+    """
+    return DataRegistry()
\ No newline at end of file
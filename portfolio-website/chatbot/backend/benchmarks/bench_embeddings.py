@@ -0,0 +1,76 @@
+"""
+Throughput benchmark for chunk embedding.
+
+Embeds the resume and portfolio data chunks (repeated with a suffix so every
+copy is a distinct chunk) with the configured sentence-transformers model
+and reports chunks/sec for each batch size and thread count, then for a
+cold and a warm on-disk embedding store. Needs the embedding model to be
+installed or downloadable. Run from the backend directory:
+    
+    python -m benchmarks.bench_embeddings [--copies 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.embeddings import EmbeddingService, EmbeddingStore
+from app.ingestion import iter_documents
+from app.rag_system import DEFAULT_EMBEDDING_MODEL
+from app.utils import get_data_path
+
+def load_chunks(copies):
+    pdf_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "..", "..", "public", "resume.pdf")
+    documents = iter_documents(
+        pdf_path if os.path.exists(pdf_path) else None,
+        get_data_path("projects.json"),
+        get_data_path("personal_info.json")
+    )
+    texts = [doc.page_content for _, doc in documents]
+    return [f"{text} ({copy})" for copy in range(copies) for text in texts]
+
+def throughput(service, chunks):
+    start = time.perf_counter()
+    service.embed_documents(chunks)
+    return len(chunks) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL))
+    parser.add_argument("--copies", type=int, default=8)
+    args = parser.parse_args()
+    
+    chunks = load_chunks(args.copies)
+    print(f"{len(chunks)} chunks, model {args.model}")
+    
+    # Load the model once and share it between configurations
+    base = EmbeddingService(args.model, num_threads=os.cpu_count() or 1)
+    base.embed_query("warm up")
+    model = base._model
+    
+    thread_counts = sorted({1, 2, os.cpu_count() or 1})
+    print(f"{'threads':>7} {'batch':>5} {'chunks/sec':>11}")
+    for threads in thread_counts:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+        for batch_size in (1, 8, 32, 64):
+            service = EmbeddingService(args.model, batch_size=batch_size, num_threads=threads)
+            service._model = model
+            print(f"{threads:>7} {batch_size:>5} {throughput(service, chunks):>11.1f}")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        store = EmbeddingStore(os.path.join(directory, "embeddings.db"))
+        service = EmbeddingService(args.model, num_threads=thread_counts[-1], store=store)
+        service._model = model
+        print(f"{'store':>13} {'chunks/sec':>11}")
+        print(f"{'cold':>13} {throughput(service, chunks):>11.1f}")
+        print(f"{'warm':>13} {throughput(service, chunks):>11.1f}")
+
+if __name__ == "__main__":
+    main()
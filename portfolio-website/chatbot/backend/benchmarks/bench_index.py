@@ -0,0 +1,96 @@
+"""
+Recall, memory and latency of the FAISS index types RAGSystem can build.
+
+Uses synthetic clustered vectors with the dimension of the default
+embedding model, so it runs offline. For each RAG_INDEX_TYPE it reports
+recall@k against exact search, the serialized index size, whether the
+installed FAISS memory-maps the persisted index, the memory a worker needs
+on top of the shared page cache after loading and searching it, and
+per-query latency. An index that is not mapped is held in full by every
+worker. Run from the backend directory:
+    
+    python -m benchmarks.bench_index [--vectors 10000] [--dim 768]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rag_system import INDEX_TYPES, build_faiss_index, configure_search, index_is_mapped, mmap_read_flag
+
+def anonymous_kb():
+    """
+    Anonymous memory of this process in KiB, or None off Linux.
+    
+    Pages of a memory-mapped index file are not anonymous: they live in the
+    page cache and are shared by every worker that maps the same file.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as file:
+            return sum(int(line.split()[1]) for line in file if line.startswith("Anonymous:"))
+    except OSError:
+        return None
+
+def synthetic_vectors(count, dim, clusters, rng):
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.3 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall(found, truth, k):
+    return np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    vectors = synthetic_vectors(args.vectors, args.dim, max(1, args.vectors // 100), rng)
+    queries = vectors[rng.integers(0, args.vectors, args.queries)] + 0.05 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    _, truth = build_faiss_index(vectors, "flat").search(queries, 10)
+    
+    mmap_flag = mmap_read_flag() or 0
+    print(f"{args.vectors} vectors x {args.dim} dims, {args.queries} queries, faiss {faiss.__version__}")
+    if not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        print("This FAISS has no IO_FLAG_MMAP_IFC: only IVF inverted lists are memory-mapped")
+    print(f"{'type':>5} {'build s':>8} {'size MB':>8} {'mapped':>7} {'worker MB':>10} {'ms/query':>9} {'R@1':>6} {'R@3':>6} {'R@10':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        for index_type in INDEX_TYPES:
+            start = time.perf_counter()
+            index = build_faiss_index(vectors, index_type)
+            build_seconds = time.perf_counter() - start
+            path = os.path.join(directory, f"{index_type}.faiss")
+            faiss.write_index(index, path)
+            del index
+            
+            before = anonymous_kb()
+            index = faiss.read_index(path, mmap_flag)
+            configure_search(index, args.nprobe, args.ef_search)
+            found = []
+            start = time.perf_counter()
+            for query in queries:
+                found.append(index.search(query.reshape(1, -1), 10)[1][0])
+            per_query = (time.perf_counter() - start) / len(queries)
+            after = anonymous_kb()
+            worker = f"{(after - before) / 1024:>10.1f}" if before is not None else f"{'n/a':>10}"
+            
+            print(
+                f"{index_type:>5} {build_seconds:>8.2f} {os.path.getsize(path) / 2**20:>8.1f} "
+                f"{'yes' if index_is_mapped(index_type) else 'no':>7} {worker} "
+                f"{per_query * 1000:>9.3f} {recall(found, truth, 1):>6.3f} {recall(found, truth, 3):>6.3f} "
+                f"{recall(found, truth, 10):>6.3f}"
+            )
+            del index
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark for intent classification.
+
+Compares the previous per-request substring scans against the precompiled
+IntentMatcher as the keyword lists grow. Run from the backend directory:
+    
+    python -m benchmarks.bench_intents
+"""
+import random
+import string
+import sys
+import os
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.intents import DEFAULT_INTENT_RULES, IntentMatcher, IntentRule
+
+QUERIES = [
+    "Hello there!",
+    "What projects have you built with FastAPI?",
+    "Tell me about your experience with machine learning and data pipelines",
+    "How can I contact you about a freelance opportunity?",
+    "What's the weather like on Mars?",
+    "Which architecture did you use for this portfolio website?",
+]
+
+def legacy_classify(query, rules):
+    """
+    The old approach: lowercase, then scan each keyword list with ``in``.
+    """
+    query_lower = query.lower()
+    for rule in rules:
+        if any(keyword in query_lower for keyword in rule.keywords):
+            if rule.max_words is None or len(query_lower.split()) <= rule.max_words:
+                return rule.intent
+    return "general"
+
+def grow_rules(extra_per_intent):
+    """
+    Pad every intent with random filler keywords that never match the queries.
+    """
+    rng = random.Random(0)
+    rules = []
+    for rule in DEFAULT_INTENT_RULES:
+        filler = ["".join(rng.choices(string.ascii_lowercase, k=10)) for _ in range(extra_per_intent)]
+        rules.append(IntentRule(rule.intent, list(rule.keywords) + filler, rule.max_words))
+    return rules
+
+def main():
+    print(f"{'keywords':>9} {'legacy us/query':>16} {'matcher us/query':>17}")
+    for extra in (0, 10, 100, 1000, 10000):
+        rules = grow_rules(extra)
+        matcher = IntentMatcher(rules)
+        keywords = sum(len(rule.keywords) for rule in rules)
+        
+        number = 200
+        legacy = timeit.timeit(lambda: [legacy_classify(q, rules) for q in QUERIES], number=number)
+        compiled = timeit.timeit(lambda: [matcher.match(q) for q in QUERIES], number=number)
+        per_query = number * len(QUERIES)
+        print(f"{keywords:>9} {legacy / per_query * 1e6:>16.2f} {compiled / per_query * 1e6:>17.2f}")
+
+if __name__ == "__main__":
+    main()
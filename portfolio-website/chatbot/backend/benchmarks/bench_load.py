@@ -0,0 +1,438 @@
+"""
+Offline load test of the chat API.
+
+Runs the FastAPI app in-process, with the fake LLM provider and, unless
+--embedding-model names a real model, the offline hash embeddings, so it
+needs no network access, API key or model download. A fixed mix of
+questions covering every intent is replayed against /chat and /chat/stream
+at each concurrency level. For each level the test reports throughput,
+p50/p95/p99 latency (and time to first byte for streams), per-intent
+latency and process memory. The test also replays the questions the
+chatbot answers on a fast path and checks that they never reached the
+embedding model, retrieval or the LLM. The results are written as JSON; pass
+--compare with an earlier result file to flag throughput and tail-latency
+regressions (the exit status is 1 if there are any). Run from the
+backend directory:
+    
+    python -m benchmarks.bench_load [--concurrency 1,8,32] [--requests 200]
+        [--llm-latency 0.2] [--token-delay 0.01] [--output load.json]
+        [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+# (question, weight): what visitors of a portfolio site ask, most often the
+# deterministic intents and a long tail of open questions for the LLM
+QUERY_MIX = [
+    ("Hello!", 3),
+    ("Hi there", 2),
+    ("Who are you?", 2),
+    ("Tell me about yourself", 2),
+    ("What projects have you built?", 3),
+    ("Can you showcase your portfolio?", 1),
+    ("How can I contact you?", 2),
+    ("What's your email address?", 1),
+    ("What is your education?", 1),
+    ("Tell me about your experience with machine learning", 2),
+    ("Do you know Kubernetes?", 1),
+    ("Which databases have you used in production?", 2),
+    ("What programming languages do you prefer and why?", 2),
+    ("How would you design a scalable REST API?", 1),
+    ("What frameworks do you use for frontend development?", 1),
+]
+
+PERCENTILES = (50, 95, 99)
+
+# Routes that go through retrieval and an LLM handler; every other route is a fast path
+INTENT_DOC_ROUTES = ("projects", "resume", "general")
+
+def percentile(values, q):
+    """
+    Linearly interpolated percentile of already sorted values.
+    """
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def distribution(seconds):
+    values = sorted(s * 1000 for s in seconds)
+    summary = {f"p{q}": percentile(values, q) for q in PERCENTILES}
+    summary["mean"] = sum(values) / len(values) if values else 0.0
+    summary["max"] = values[-1] if values else 0.0
+    return summary
+
+def memory_mb():
+    """
+    Current and peak resident set size of this process in MiB.
+    """
+    try:
+        values = {}
+        with open("/proc/self/status") as file:
+            for line in file:
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(rest.split()[0]) / 1024
+        return {"rss": values["VmRSS"], "peak_rss": values["VmHWM"]}
+    except (OSError, KeyError):
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak /= 1024 * 1024 if sys.platform == "darwin" else 1024
+        return {"rss": None, "peak_rss": peak}
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def call(app, method, path, payload=None):
+    """
+    Send one request straight to the ASGI app, without a server or socket.
+    
+    Returns:
+        Status code, seconds to the first body byte, total seconds and the body
+    """
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("ascii"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    finished = asyncio.Event()
+    request_sent = False
+    
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Streaming responses listen for the client going away
+        await finished.wait()
+        return {"type": "http.disconnect"}
+    
+    status = None
+    first_byte = None
+    chunks = []
+    start = time.perf_counter()
+    
+    async def send(message):
+        nonlocal status, first_byte
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                chunks.append(message["body"])
+            if not message.get("more_body", False):
+                finished.set()
+    
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    total = time.perf_counter() - start
+    return status, first_byte if first_byte is not None else total, total, b"".join(chunks)
+
+def build_workload(count, stream_share, unique_questions, rng):
+    """
+    Draw ``count`` requests from the query mix.
+    
+    Visitors ask two to four questions each in one session, so later
+    questions carry history like real follow-ups do.
+    """
+    questions = [question for question, _ in QUERY_MIX]
+    weights = [weight for _, weight in QUERY_MIX]
+    workload = []
+    visitor = 0
+    while len(workload) < count:
+        visitor += 1
+        session_id = f"bench-{visitor}"
+        for _ in range(rng.randint(2, 4)):
+            question = rng.choices(questions, weights)[0]
+            if unique_questions:
+                question = f"{question} (visitor {visitor})"
+            path = "/chat/stream" if rng.random() < stream_share else "/chat"
+            workload.append((path, {"message": question, "session_id": session_id}))
+    return workload[:count]
+
+async def run_level(app, workload, concurrency, classify):
+    """
+    Replay the workload with ``concurrency`` requests in flight at a time.
+    
+    Requests of one session are sent in order by the same worker, so its
+    follow-ups see the earlier answers.
+    """
+    sessions = {}
+    for path, payload in workload:
+        sessions.setdefault(payload["session_id"], []).append((path, payload))
+    queue = list(sessions.values())
+    records = []
+    
+    async def visitor_loop():
+        while queue:
+            for path, payload in queue.pop(0):
+                status, first_byte, total, _ = await call(app, "POST", path, payload)
+                records.append((path, classify(payload["message"]), status, first_byte, total))
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(visitor_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    
+    ok = [r for r in records if r[2] == 200]
+    intents = {}
+    for _, intent, _, _, total in ok:
+        intents.setdefault(intent, []).append(total)
+    streams = [r[3] for r in ok if r[0] == "/chat/stream"]
+    return {
+        "concurrency": concurrency,
+        "requests": len(records),
+        "errors": len(records) - len(ok),
+        "seconds": elapsed,
+        "throughput_rps": len(records) / elapsed if elapsed else 0.0,
+        "latency_ms": distribution([r[4] for r in ok]),
+        "stream_first_byte_ms": distribution(streams) if streams else None,
+        "intents": {
+            intent: {"requests": len(seconds), **distribution(seconds)}
+            for intent, seconds in sorted(intents.items())
+        },
+        "memory_mb": memory_mb(),
+    }
+
+def work_counters(metrics):
+    """
+    Counters of the expensive work done so far, from the /metrics JSON.
+    """
+    retrieval = metrics.get("retrieval_cache", {})
+    return {
+        "embedded_queries": metrics.get("embeddings", {}).get("embedded_queries", 0),
+        "retrievals": retrieval.get("results_hits", 0) + retrieval.get("results_misses", 0),
+        "llm_requests": sum(provider.get("requests", 0) for provider in metrics.get("llm_providers", {}).values()),
+    }
+
+async def check_fast_paths(app, chatbot, rounds=5):
+    """
+    Replay the fast-path questions of the mix and count the work they caused.
+    
+    Returns:
+        The questions, the requests sent and the change in each work counter,
+        all of which should be zero
+    """
+    questions = [question for question, _ in QUERY_MIX if chatbot.route(question) not in INTENT_DOC_ROUTES]
+    before = work_counters(json.loads((await call(app, "GET", "/metrics"))[3]))
+    # A new session per request, so no summaries are triggered
+    for _ in range(rounds):
+        for question in questions:
+            for path in ("/chat", "/chat/stream"):
+                await call(app, "POST", path, {"message": question})
+    after = work_counters(json.loads((await call(app, "GET", "/metrics"))[3]))
+    return {
+        "questions": questions,
+        "requests": rounds * len(questions) * 2,
+        "work": {name: after[name] - before[name] for name in after},
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Print the change against a baseline run and return the regressions.
+    
+    Throughput dropping, or p95/p99 latency rising, by more than
+    ``tolerance`` (a fraction) at the same concurrency counts as a regression.
+    """
+    if baseline.get("config", {}).get("llm") != results["config"]["llm"]:
+        print("warning: the baseline used different fake LLM settings")
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    regressions = []
+    print(f"\ncompared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp', '?')})")
+    print(f"{'conc':>4} {'metric':>10} {'before':>10} {'after':>10} {'change':>8}")
+    for level in results["levels"]:
+        old = previous.get(level["concurrency"])
+        if old is None:
+            continue
+        for metric, after, before, higher_is_better in (
+            ("rps", level["throughput_rps"], old["throughput_rps"], True),
+            ("p95 ms", level["latency_ms"]["p95"], old["latency_ms"]["p95"], False),
+            ("p99 ms", level["latency_ms"]["p99"], old["latency_ms"]["p99"], False),
+        ):
+            change = (after - before) / before if before else 0.0
+            worse = -change if higher_is_better else change
+            flag = " REGRESSION" if worse > tolerance else ""
+            print(f"{level['concurrency']:>4} {metric:>10} {before:>10.1f} {after:>10.1f} {change:>+8.0%}{flag}")
+            if flag:
+                regressions.append(f"{metric} at concurrency {level['concurrency']}: {before:.1f} -> {after:.1f}")
+    return regressions
+
+def configure(args, index_dir):
+    """
+    Point the app at offline components; must run before app.main is imported.
+    """
+    os.environ.update({
+        "LLM_PROVIDER": "fake",
+        "LLM_FALLBACK_PROVIDERS": "",
+        "FAKE_LLM_LATENCY": str(args.llm_latency),
+        "FAKE_LLM_TOKEN_DELAY": str(args.token_delay),
+        "FAKE_LLM_ERROR_RATE": "0",
+        "EMBEDDING_MODEL": args.embedding_model,
+        # A throwaway index and no embedding store, so the real ones are untouched
+        "RAG_INDEX_DIR": index_dir,
+        "EMBEDDING_STORE_PATH": "",
+        "RAG_WATCH_INTERVAL": "0",
+        "SESSION_STORE": "memory",
+    })
+    os.environ.pop("RAG_SIDECAR_SOCKET", None)
+    if args.no_cache:
+        os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+async def benchmark(args):
+    from app.intents import get_intent_matcher
+    import app.main as server
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    matcher = get_intent_matcher()
+    classify = lambda message: matcher.match(message).intent
+    app = server.app
+    baseline_memory = memory_mb()
+    
+    async with app.router.lifespan_context(app):
+        start = time.perf_counter()
+        while (await call(app, "GET", "/ready"))[0] != 200:
+            if time.perf_counter() - start > args.startup_timeout:
+                raise RuntimeError("The app did not become ready; see /ready")
+            await asyncio.sleep(0.05)
+        startup_seconds = time.perf_counter() - start
+        ready_memory = memory_mb()
+        print(f"ready in {startup_seconds:.2f}s, RSS {ready_memory['rss'] or 0:.0f} MiB")
+        
+        # Ask every question once so the caches start from their steady state
+        for question, _ in QUERY_MIX:
+            await call(app, "POST", "/chat", {"message": question, "session_id": "bench-warm-up"})
+        
+        print(f"{'conc':>4} {'reqs':>5} {'err':>4} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ttfb p95':>9} {'RSS MiB':>8}")
+        levels = []
+        for index, concurrency in enumerate(args.concurrency):
+            workload = build_workload(args.requests, args.stream_share, args.unique_questions, random.Random(args.seed + index))
+            level = await run_level(app, workload, concurrency, classify)
+            levels.append(level)
+            latency = level["latency_ms"]
+            ttfb = level["stream_first_byte_ms"]["p95"] if level["stream_first_byte_ms"] else 0.0
+            print(
+                f"{concurrency:>4} {level['requests']:>5} {level['errors']:>4} {level['throughput_rps']:>8.1f} "
+                f"{latency['p50']:>8.1f} {latency['p95']:>8.1f} {latency['p99']:>8.1f} {ttfb:>9.1f} "
+                f"{level['memory_mb']['rss'] or 0:>8.0f}"
+            )
+        
+        print(f"\n{'intent':>10} {'reqs':>5} {'p50 ms':>8} {'p95 ms':>8}   (highest concurrency)")
+        for intent, summary in levels[-1]["intents"].items():
+            print(f"{intent:>10} {summary['requests']:>5} {summary['p50']:>8.1f} {summary['p95']:>8.1f}")
+        
+        fast_path = await check_fast_paths(app, server.chatbot)
+        touched = {name: count for name, count in fast_path["work"].items() if count}
+        print(
+            f"\nfast paths: {fast_path['requests']} requests for {len(fast_path['questions'])} questions, "
+            + (f"unexpected work {touched}" if touched else "no embedding, retrieval or LLM calls")
+        )
+        
+        server_metrics = json.loads((await call(app, "GET", "/metrics"))[3])
+    
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "stream_share": args.stream_share,
+            "unique_questions": args.unique_questions,
+            "response_cache": not args.no_cache,
+            "embedding_model": args.embedding_model,
+            "seed": args.seed,
+            "llm": {"latency": args.llm_latency, "token_delay": args.token_delay},
+        },
+        "startup_seconds": startup_seconds,
+        "levels": levels,
+        "fast_path": fast_path,
+        "memory_mb": {
+            "baseline_rss": baseline_memory["rss"],
+            "ready_rss": ready_memory["rss"],
+            "final_rss": memory_mb()["rss"],
+            "peak_rss": memory_mb()["peak_rss"],
+        },
+        "server": {
+            "stage_seconds": server_metrics.get("stage_seconds"),
+            "embeddings": server_metrics.get("embeddings"),
+            "query_batching": server_metrics.get("query_batching"),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=lambda value: [int(c) for c in value.split(",")], default=[1, 8, 32],
+                        help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM seconds to first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Fake LLM seconds between tokens")
+    parser.add_argument("--stream-share", type=float, default=0.3, help="Share of requests sent to /chat/stream")
+    parser.add_argument("--unique-questions", action="store_true",
+                        help="Make every open question distinct, so the response cache cannot answer it")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache")
+    parser.add_argument("--embedding-model", default="fake", help="Embedding model; the default needs no download")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/load-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed regression as a fraction")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as index_dir:
+        configure(args, index_dir)
+        results = asyncio.run(benchmark(args))
+    
+    output = args.output or os.path.join(
+        BACKEND_DIR, "benchmarks", "results", f"load-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"\nresults written to {output}")
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print("\n" + "\n".join(f"regression: {r}" for r in regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Per-worker memory with and without sharing the embedding model and index.
+
+Starts --workers processes that each load retrieval and answer a query, in
+three layouts:
+    
+    independent  every worker loads its own model and index (uvicorn --workers)
+    prefork      the parent loads them and forks the workers (gunicorn.conf.py)
+    sidecar      the workers query a retrieval sidecar over a Unix socket
+
+and reports each worker's RSS, PSS and unique (private) memory, the PSS of
+the shared parent or sidecar, and the total PSS of the layout. Uses the
+configured embedding model and the real data files; Linux only. Run from
+the backend directory:
+    
+    python -m benchmarks.bench_workers [--workers 4]
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERY = "Which projects use Python and machine learning?"
+
+def memory_mb(pid):
+    """
+    RSS, PSS and unique set size of a process in MiB.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values["Rss"] / 1024,
+        "pss": values["Pss"] / 1024,
+        "uss": (values["Private_Clean"] + values["Private_Dirty"]) / 1024,
+    }
+
+def load_rag_system():
+    from app.rag_system import RAGSystem
+    rag = RAGSystem()
+    rag.warm_up()
+    return rag
+
+def worker(load, ready, done):
+    rag = load()
+    rag.retrieve(QUERY)
+    ready.put(os.getpid())
+    done.wait()
+
+def run_workers(context, load, count):
+    """
+    Start ``count`` workers, wait until each has answered a query and
+    measure them while they are all alive.
+    """
+    ready = context.Queue()
+    done = context.Event()
+    processes = [context.Process(target=worker, args=(load, ready, done)) for _ in range(count)]
+    for process in processes:
+        process.start()
+    pids = [ready.get(timeout=600) for _ in processes]
+    usage = [memory_mb(pid) for pid in pids]
+    done.set()
+    for process in processes:
+        process.join()
+    return usage
+
+def report(layout, usage, shared=None):
+    mean = {key: sum(u[key] for u in usage) / len(usage) for key in ("rss", "pss", "uss")}
+    total = sum(u["pss"] for u in usage) + (shared["pss"] if shared else 0)
+    shared_pss = f"{shared['pss']:>10.1f}" if shared else f"{'-':>10}"
+    print(f"{layout:>11} {mean['rss']:>8.1f} {mean['pss']:>8.1f} {mean['uss']:>8.1f} {shared_pss} {total:>9.1f}")
+    return mean
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    
+    context = multiprocessing.get_context("fork")
+    
+    # Build or load the persisted index once, so the workers only map it
+    builder = context.Process(target=load_rag_system)
+    builder.start()
+    builder.join()
+    
+    print(f"{args.workers} workers, MiB per worker")
+    print(f"{'layout':>11} {'RSS':>8} {'PSS':>8} {'unique':>8} {'shared PSS':>10} {'total PSS':>9}")
+    
+    baseline = report("independent", run_workers(context, load_rag_system, args.workers))
+    
+    from app.retrieval_sidecar import RetrievalClient, run
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "rag.sock")
+        sidecar = context.Process(target=run, args=(socket_path,))
+        sidecar.start()
+        # The client waits until the sidecar's index is loaded and it listens
+        RetrievalClient(socket_path, connect_timeout=600)
+        usage = run_workers(context, lambda: RetrievalClient(socket_path), args.workers)
+        sidecar_mean = report("sidecar", usage, memory_mb(sidecar.pid))
+        sidecar.terminate()
+        sidecar.join()
+    
+    # Loaded the way gunicorn.conf.py preloads the master
+    from app.rag_system import RAGSystem
+    rag = RAGSystem()
+    rag.warm_up(run_model=False)
+    gc.freeze()
+    prefork_mean = report("prefork", run_workers(context, lambda: rag, args.workers), memory_mb(os.getpid()))
+    
+    for layout, mean in (("prefork", prefork_mean), ("sidecar", sidecar_mean)):
+        print(
+            f"{layout}: unique memory per worker {baseline['uss'] - mean['uss']:.1f} MiB lower "
+            f"({1 - mean['uss'] / baseline['uss']:.0%}), RSS {baseline['rss'] - mean['rss']:.1f} MiB lower"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Gunicorn settings for running several uvicorn workers that share one copy
+of the embedding model, index and chat graph:
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+With PREFORK=true the app is imported in the master, which loads every
+component before forking, so workers start warm and share the loaded pages
+copy-on-write. It is off by default, so each worker loads its own copy,
+e.g. together with a retrieval sidecar (RAG_SIDECAR_SOCKET).
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 8000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PREFORK", "false").lower() in ("true", "1", "t")
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked
+    if preload_app:
+        from app.main import preload
+        preload()
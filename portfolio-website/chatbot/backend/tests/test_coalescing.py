@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from app.coalescing import SingleFlight
+
+def test_do_runs_concurrent_calls_once():
+    flights = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+    
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "shared"
+    
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", work)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flights.do("key", work))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flights.stats()["collapsed"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+    
+    assert results == ["shared"] * 4
+    assert len(calls) == 1
+    assert flights.stats() == {"in_flight": 0, "executed": 1, "collapsed": 3}
+
+def test_do_shares_the_exception():
+    flights = SingleFlight()
+    
+    def fail():
+        raise ValueError("boom")
+    
+    try:
+        flights.do("key", fail)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("the error was not raised")
+    # Nothing is kept once the call finished
+    assert flights.do("key", lambda: "fresh") == "fresh"
+
+def test_ado_runs_concurrent_calls_once():
+    flights = SingleFlight()
+    calls = []
+    
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "shared"
+    
+    async def run():
+        return await asyncio.gather(*(flights.ado("key", work) for _ in range(5)))
+    
+    assert asyncio.run(run()) == ["shared"] * 5
+    assert len(calls) == 1
+    assert flights.stats() == {"in_flight": 0, "executed": 1, "collapsed": 4}
+
+def test_ado_keeps_running_while_a_waiter_remains():
+    flights = SingleFlight()
+    cancelled = []
+    
+    async def work():
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "shared"
+    
+    async def run():
+        first = asyncio.ensure_future(flights.ado("key", work))
+        second = asyncio.ensure_future(flights.ado("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        return await second
+    
+    assert asyncio.run(run()) == "shared"
+    assert not cancelled
+
+def test_ado_cancels_the_work_when_the_last_waiter_leaves():
+    flights = SingleFlight()
+    cancelled = []
+    
+    async def work():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+    
+    async def run():
+        waiters = [asyncio.ensure_future(flights.ado("key", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        waiters[0].cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled
+        waiters[1].cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flights.stats()["in_flight"]
+    
+    assert asyncio.run(run()) == 0
+    assert cancelled == [1]
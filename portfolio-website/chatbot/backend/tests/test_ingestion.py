@@ -0,0 +1,47 @@
+import json
+from app import ingestion
+from app.utils import DataRegistry, load_projects
+
+PROJECTS = [
+    {"name": "Portfolio Website", "description": "Next.js site", "technologies": ["Next.js"], "github": "https://example.com/site"},
+    {"title": "Resume Parser", "description": "PDF parsing", "technologies": ["Python"]},
+]
+
+def write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+def test_load_projects_accepts_both_shapes(tmp_path):
+    bare = write(tmp_path / "bare.json", PROJECTS)
+    wrapped = write(tmp_path / "wrapped.json", {"projects": PROJECTS})
+    assert load_projects(bare) == load_projects(wrapped) == PROJECTS
+    assert load_projects(str(tmp_path / "missing.json")) == []
+
+def test_project_documents_are_the_same_for_both_shapes(tmp_path):
+    bare = list(ingestion.iter_project_documents(write(tmp_path / "projects.json", PROJECTS)))
+    wrapped = list(ingestion.iter_project_documents(write(tmp_path / "projects.json", {"projects": PROJECTS})))
+    assert [doc_id for doc_id, _ in bare] == ["project:Portfolio Website", "project:Resume Parser"]
+    assert [(doc_id, doc.page_content, doc.metadata) for doc_id, doc in bare] == \
+        [(doc_id, doc.page_content, doc.metadata) for doc_id, doc in wrapped]
+    assert bare[0][1].metadata["title"] == "Portfolio Website"
+    assert bare[0][1].page_content.startswith("**Portfolio Website**")
+
+def test_project_ids_survive_reordering(tmp_path):
+    forward = dict(ingestion.iter_project_documents(write(tmp_path / "projects.json", PROJECTS)))
+    backward = dict(ingestion.iter_project_documents(write(tmp_path / "projects.json", PROJECTS[::-1])))
+    assert {doc_id: doc.page_content for doc_id, doc in forward.items()} == \
+        {doc_id: doc.page_content for doc_id, doc in backward.items()}
+
+def test_explicit_ids_win_and_duplicates_stay_unique(tmp_path):
+    projects = [{"id": 7, "title": "A"}, {"title": "Twin"}, {"title": "Twin"}]
+    ids = [doc_id for doc_id, _ in ingestion.iter_project_documents(write(tmp_path / "projects.json", projects))]
+    assert ids == ["project:7", "project:Twin", "project:Twin:2"]
+
+def test_data_registry_reads_a_bare_list(tmp_path):
+    registry = DataRegistry(
+        projects_path=write(tmp_path / "projects.json", PROJECTS),
+        personal_info_path=write(tmp_path / "personal_info.json", {"name": "Sam"}),
+    )
+    data = registry.get()
+    assert [project["description"] for project in data.projects] == ["Next.js site", "PDF parsing"]
+    assert "**Portfolio Website**" in data.responses["projects"]
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from app.llm_manager import LLMManager
+from app.llm_providers import CircuitBreaker, FakeProvider
+
+RESET = 0.05
+
+def half_open_provider(name: str, **kwargs) -> FakeProvider:
+    """
+    A fake provider whose breaker has opened and is due for its trial request.
+    """
+    provider = FakeProvider(name=name, breaker_failures=1, breaker_reset=RESET, **kwargs)
+    provider.breaker.record_failure()
+    time.sleep(RESET)
+    return provider
+
+def manager(*providers: FakeProvider, hedge_delay: float = None) -> LLMManager:
+    llm = LLMManager(providers=list(providers))
+    llm.hedge_enabled = hedge_delay is not None
+    if hedge_delay is not None:
+        llm.hedge_delay = hedge_delay
+    return llm
+
+async def consume(llm: LLMManager, prompt: str = "hello") -> str:
+    return "".join([chunk async for chunk in llm._astream_llm(prompt)])
+
+def test_breaker_allows_one_trial_when_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=RESET)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(RESET)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+def test_release_reopens_a_half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=RESET)
+    breaker.record_failure()
+    time.sleep(RESET)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 1
+    time.sleep(RESET)
+    assert breaker.allow()
+
+def test_failed_trial_reopens_the_breaker():
+    provider = half_open_provider("flaky", error_rate=1.0)
+    llm = manager(provider)
+    try:
+        asyncio.run(consume(llm))
+    except ConnectionError:
+        pass
+    else:
+        raise AssertionError("the injected failure was not raised")
+    assert provider.breaker.state == CircuitBreaker.OPEN
+    assert provider.breaker.times_opened == 2
+
+def test_failover_to_the_next_provider():
+    broken = FakeProvider(name="broken", error_rate=1.0, breaker_failures=1)
+    backup = FakeProvider(name="backup", response="from backup")
+    llm = manager(broken, backup)
+    assert asyncio.run(consume(llm)) == "from backup"
+    assert llm.failovers == 1
+    assert broken.breaker.state == CircuitBreaker.OPEN
+    assert backup.breaker.state == CircuitBreaker.CLOSED
+
+def test_trial_cancelled_before_first_token_is_released():
+    provider = half_open_provider("slow", latency=1.0)
+    llm = manager(provider)
+    
+    async def cancel_while_waiting():
+        task = asyncio.ensure_future(consume(llm))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    
+    asyncio.run(cancel_while_waiting())
+    assert provider.breaker.state == CircuitBreaker.OPEN
+    assert provider.in_flight == 0
+    time.sleep(RESET)
+    assert provider.breaker.allow()
+
+def test_client_disconnect_after_first_token_closes_the_breaker():
+    provider = half_open_provider("streaming", token_delay=0.05, response="one two three four")
+    llm = manager(provider)
+    
+    async def disconnect_after_first_chunk():
+        stream = llm._astream_llm("hello")
+        first = await stream.__anext__()
+        # What StreamingResponse does when the client goes away
+        await stream.aclose()
+        return first
+    
+    assert asyncio.run(disconnect_after_first_chunk()) == "one"
+    assert provider.breaker.state == CircuitBreaker.CLOSED
+    assert provider.in_flight == 0
+    assert provider.breaker.allow()
+
+def test_hedge_loser_cancelled_while_waiting_is_released():
+    slow = half_open_provider("slow", latency=1.0, response="slow answer")
+    fast = half_open_provider("fast", response="fast answer")
+    llm = manager(slow, fast, hedge_delay=0.05)
+    assert asyncio.run(consume(llm)) == "fast answer"
+    assert llm.hedge_wins == 1
+    assert fast.breaker.state == CircuitBreaker.CLOSED
+    assert slow.breaker.state == CircuitBreaker.OPEN
+    assert slow.in_flight == 0
+    time.sleep(RESET)
+    assert slow.breaker.allow()
+
+def test_hedge_loser_is_never_left_half_open():
+    # Both first tokens arrive at about the same time; depending on
+    # scheduling the loser already has its first token or is cancelled
+    # while waiting for it
+    primary = half_open_provider("primary", latency=0.1, response="primary answer")
+    hedge = half_open_provider("hedge", latency=0.05, response="hedge answer")
+    llm = manager(primary, hedge, hedge_delay=0.05)
+    asyncio.run(consume(llm))
+    assert llm.hedged_requests == 1
+    for provider in (primary, hedge):
+        assert provider.breaker.state != CircuitBreaker.HALF_OPEN
+        assert provider.in_flight == 0
+        if len(provider.first_token_latency):
+            assert provider.breaker.state == CircuitBreaker.CLOSED
+    time.sleep(RESET)
+    assert primary.breaker.allow() and hedge.breaker.allow()
@@ -0,0 +1,97 @@
+import os
+import time
+import numpy as np
+from app.llm_manager import ResponseCache
+
+PARAMS = {"provider": "fake", "model": "echo", "temperature": 0.7}
+
+def unit(*values) -> np.ndarray:
+    vector = np.zeros(8, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector
+
+def cached(cache: ResponseCache, prompt: str, response: str, vector=None):
+    lookup = cache.lookup(prompt, PARAMS, vector)
+    assert lookup.response is None
+    cache.store(lookup, response)
+
+def test_exact_hit_ignores_whitespace_and_case():
+    cache = ResponseCache()
+    cached(cache, "What projects  have you built?", "Several")
+    assert cache.lookup("what projects have you built?", PARAMS).response == "Several"
+    assert cache.stats()["exact_hits"] == 1
+
+def test_exact_layer_is_scoped_by_model_parameters():
+    cache = ResponseCache()
+    cached(cache, "prompt", "warm answer")
+    assert cache.lookup("prompt", {**PARAMS, "temperature": 0.0}).response is None
+
+def test_semantic_hit_above_threshold():
+    cache = ResponseCache(similarity_threshold=0.9)
+    cached(cache, "prompt one", "answer", unit(1.0, 0.0))
+    # A different prompt whose query embedding is almost the same
+    lookup = cache.lookup("prompt two", PARAMS, unit(1.0, 0.1) * 5)
+    assert lookup.response == "answer"
+    assert cache.stats()["semantic_hits"] == 1
+
+def test_semantic_miss_below_threshold():
+    cache = ResponseCache(similarity_threshold=0.9)
+    cached(cache, "prompt one", "answer", unit(1.0, 0.0))
+    # Cosine similarity of about 0.7
+    assert cache.lookup("prompt two", PARAMS, unit(1.0, 1.0)).response is None
+    assert cache.lookup("prompt three", PARAMS).response is None
+    assert cache.stats()["semantic_hits"] == 0
+
+def test_semantic_hit_requires_the_same_parameters():
+    cache = ResponseCache(similarity_threshold=0.9)
+    cached(cache, "prompt one", "answer", unit(1.0))
+    assert cache.lookup("prompt two", {**PARAMS, "model": "other"}, unit(1.0)).response is None
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl_seconds=0.05)
+    cached(cache, "prompt", "answer", unit(1.0))
+    assert cache.lookup("prompt", PARAMS).response == "answer"
+    time.sleep(0.06)
+    assert cache.lookup("prompt", PARAMS).response is None
+    # The semantic entry went with it
+    assert cache.lookup("other prompt", PARAMS, unit(1.0)).response is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["semantic_entries"] == 0
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cached(cache, "first", "1", unit(1.0))
+    cached(cache, "second", "2", unit(0.0, 1.0))
+    # Touch the first entry so the second is the least recently used
+    assert cache.lookup("first", PARAMS).response == "1"
+    cached(cache, "third", "3")
+    assert cache.lookup("second", PARAMS).response is None
+    assert cache.lookup("first", PARAMS).response == "1"
+    assert cache.lookup("third", PARAMS).response == "3"
+    assert cache.lookup("another", PARAMS, unit(0.0, 1.0)).response is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["semantic_entries"], stats["evictions"]) == (2, 1, 1)
+
+def test_invalidation_when_a_watched_file_changes(tmp_path):
+    source = tmp_path / "projects.json"
+    source.write_text("[]", encoding="utf-8")
+    cache = ResponseCache(check_interval=0)
+    cache.watch(str(source))
+    cached(cache, "prompt", "answer", unit(1.0))
+    assert cache.lookup("prompt", PARAMS).response == "answer"
+    
+    source.write_text('[{"title": "New"}]', encoding="utf-8")
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.lookup("prompt", PARAMS).response is None
+    assert cache.lookup("other prompt", PARAMS, unit(1.0)).response is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_unchanged_sources_keep_the_cache(tmp_path):
+    source = tmp_path / "projects.json"
+    source.write_text("[]", encoding="utf-8")
+    cache = ResponseCache(check_interval=0)
+    cache.watch(str(source))
+    cached(cache, "prompt", "answer")
+    assert cache.lookup("prompt", PARAMS).response == "answer"
+    assert cache.stats()["invalidations"] == 0
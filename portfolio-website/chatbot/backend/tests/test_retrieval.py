@@ -0,0 +1,114 @@
+import asyncio
+import json
+import math
+import faiss
+import pytest
+from app.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from app.rag_system import RAGSystem, index_is_mapped
+
+DOCS = {
+    "kafka": "Streaming pipeline built on Kafka and Flink for clickstream analytics",
+    "react": "Portfolio website written in React with a Python backend",
+    "python": "Python tooling for data analytics and reporting in Python",
+}
+
+PROJECTS = [
+    {"title": "Stream Processor", "description": "Realtime pipeline on Kafka and Flink", "technologies": ["Kafka", "Flink"]},
+    {"title": "Portfolio Site", "description": "Personal website with a chatbot", "technologies": ["React", "FastAPI"]},
+    {"title": "Report Builder", "description": "Analytics dashboards for sales data", "technologies": ["Python", "Pandas"]},
+]
+
+def bm25() -> BM25Index:
+    return BM25Index(list(DOCS), list(DOCS.values()))
+
+def test_tokenize_keeps_tech_names_and_drops_stopwords():
+    assert tokenize("What have you built with C++ and Node.js, or CI-CD?") == ["built", "c++", "node.js", "ci-cd"]
+
+def test_bm25_ranks_the_rare_term_first():
+    match = bm25().search("kafka pipeline")
+    assert match.hits[0][0] == "kafka"
+    assert match.coverage == 1.0
+    assert match.margin == math.inf
+
+def test_bm25_coverage_and_margin():
+    match = bm25().search("analytics reporting website")
+    assert match.hits[0][0] == "python"
+    assert len(match.hits) == 3
+    # The top document contains "analytics" and "reporting" but not "website"
+    assert match.coverage == pytest.approx(2 / 3)
+    assert match.margin == pytest.approx(match.hits[0][1] / match.hits[1][1])
+    assert bm25().search("unknown words").hits == []
+
+def test_bm25_allowed_positions():
+    match = bm25().search("python", allowed={1})
+    assert [doc_id for doc_id, _ in match.hits] == ["react"]
+
+def test_rrf_prefers_ids_ranked_well_by_both():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "c"]
+    assert all(0 < score < 1 for _, score in fused)
+
+def test_rrf_scales_a_unanimous_winner_to_one():
+    fused = dict(reciprocal_rank_fusion([["a", "b"], ["a"], ["a", "c"]]))
+    assert fused["a"] == pytest.approx(1.0)
+    assert fused["b"] == pytest.approx(fused["c"])
+
+@pytest.fixture
+def make_rag(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_MODEL", "fake")
+    monkeypatch.setenv("EMBEDDING_STORE_PATH", "")
+    projects = tmp_path / "projects.json"
+    projects.write_text(json.dumps(PROJECTS), encoding="utf-8")
+    personal_info = tmp_path / "personal_info.json"
+    personal_info.write_text(json.dumps({"name": "Test Person"}), encoding="utf-8")
+    
+    def make(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return RAGSystem(pdf_path="", index_dir=str(tmp_path / "index"),
+                         projects_path=str(projects), personal_info_path=str(personal_info))
+    return make
+
+def test_decisive_lexical_match_skips_the_embedding(make_rag):
+    rag = make_rag()
+    results, vector = rag.retrieve_with_vector("kafka flink", doc_types=["project"])
+    assert vector is None
+    assert results[0][1].metadata["title"] == "Stream Processor"
+    assert results[0][2] == 1.0
+    assert rag.retrieval_counts["lexical"] == 1
+    assert rag.embeddings.queries == 0
+
+def test_margin_below_threshold_falls_back_to_hybrid(make_rag):
+    rag = make_rag(RAG_LEXICAL_MARGIN="1000")
+    results, vector = rag.retrieve_with_vector("kafka python", doc_types=["project"])
+    assert vector is not None
+    assert rag.retrieval_counts["hybrid"] == 1
+    assert {doc.metadata["title"] for _, doc, _ in results[:2]} == {"Stream Processor", "Report Builder"}
+
+def test_fast_path_can_be_disabled(make_rag):
+    rag = make_rag(RAG_LEXICAL_FAST_PATH="false")
+    _, vector = rag.retrieve_with_vector("kafka flink", doc_types=["project"])
+    assert vector is not None
+    assert rag.retrieval_counts["lexical"] == 0
+
+def test_memoized_results_keep_their_query_vector(make_rag):
+    rag = make_rag(RAG_RETRIEVAL_MODE="dense")
+    _, vector = rag.retrieve_with_vector("what did you build")
+    queries = rag.embeddings.queries
+    
+    # The query vector cache can evict the vector while the results stay cached
+    rag._embedding_cache.clear()
+    _, again = rag.retrieve_with_vector("what did you build")
+    assert again is vector
+    assert rag.embeddings.queries == queries
+    
+    _, async_vector = asyncio.run(rag.aretrieve_with_vector("what did you build"))
+    assert async_vector is vector
+    assert rag.embeddings.queries == queries
+
+def test_only_ivf_types_are_mapped_without_mmap_ifc(monkeypatch):
+    monkeypatch.delattr(faiss, "IO_FLAG_MMAP_IFC", raising=False)
+    assert [t for t in ("flat", "ivf", "hnsw", "pq", "sq8") if index_is_mapped(t)] == ["ivf", "pq"]
+
+def test_mapping_is_reported_in_stats(make_rag):
+    assert make_rag().cache_stats()["index_memory_mapped"] == index_is_mapped("flat")
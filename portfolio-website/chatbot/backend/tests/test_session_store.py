@@ -0,0 +1,158 @@
+import os
+import time
+import pytest
+from app.session_store import InMemorySessionStore, SQLiteSessionStore
+
+def message(role: str, content: str):
+    return {"role": role, "content": content}
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**options):
+        if request.param == "memory":
+            return InMemorySessionStore(**options)
+        # Sweep on every write so evictions are deterministic
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"), sweep_interval=0, **options)
+    return make
+
+def test_history_is_kept_per_session(make_store):
+    store = make_store()
+    store.append_message("a", message("user", "hi"))
+    store.append_message("a", message("assistant", "hello"))
+    store.append_message("b", message("user", "other"))
+    assert store.get_history("a") == [message("user", "hi"), message("assistant", "hello")]
+    assert store.get_history("unknown") == []
+
+def test_message_cap_keeps_the_newest(make_store):
+    store = make_store(max_messages=2)
+    for n in range(3):
+        store.append_message("a", message("user", str(n)))
+    assert [m["content"] for m in store.get_history("a")] == ["1", "2"]
+
+def test_ttl_expiry(make_store):
+    store = make_store(ttl_seconds=0.05)
+    store.append_message("a", message("user", "hi"))
+    time.sleep(0.1)
+    assert store.get_history("a") == []
+    
+    # Appending to an expired session starts it over
+    store.append_message("a", message("user", "again"))
+    assert store.get_history("a") == [message("user", "again")]
+    assert store.stats()["evicted_ttl"] >= 1
+
+def test_access_refreshes_ttl(make_store):
+    store = make_store(ttl_seconds=0.2)
+    store.append_message("a", message("user", "hi"))
+    for _ in range(3):
+        time.sleep(0.1)
+        assert store.get_history("a") == [message("user", "hi")]
+
+def test_memory_lru_evicts_least_recently_used():
+    store = InMemorySessionStore(max_sessions=2)
+    store.append_message("a", message("user", "a"))
+    store.append_message("b", message("user", "b"))
+    store.get_history("a")
+    store.append_message("c", message("user", "c"))
+    
+    assert store.get_history("b") == []
+    assert store.get_history("a") == [message("user", "a")]
+    stats = store.stats()
+    assert stats["sessions"] == 2
+    assert stats["evicted_lru"] == 1
+
+def test_memory_size_accounting_follows_evictions():
+    store = InMemorySessionStore(max_sessions=1, max_messages=2)
+    store.append_message("a", message("user", "x" * 1000))
+    one_session = store.stats()["approx_bytes"]
+    assert one_session > 1000
+    
+    store.append_message("b", message("user", "y" * 10))
+    assert store.stats()["approx_bytes"] < one_session
+    for n in range(5):
+        store.append_message("b", message("user", "y" * 10))
+    assert store.stats()["trimmed_messages"] == 4
+    
+    store.delete("b")
+    assert store.stats()["approx_bytes"] == 0
+
+def test_sqlite_lru_evicts_least_recently_used(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), max_sessions=2, sweep_interval=0)
+    for session_id in ("a", "b"):
+        store.append_message(session_id, message("user", session_id))
+        time.sleep(0.01)
+    store.get_history("a")
+    time.sleep(0.01)
+    # The cap is enforced by the sweep before each write, so it takes one
+    # more write after "c" for the store to drop back to the cap
+    store.append_message("c", message("user", "c"))
+    store.append_message("c", message("user", "c2"))
+    
+    assert store.get_history("b") == []
+    assert store.get_history("a") == [message("user", "a")]
+    stats = store.stats()
+    assert stats["sessions"] == 2
+    assert stats["messages"] == 3
+    assert stats["evicted_lru"] == 1
+
+def test_fold_history_replaces_the_oldest_messages(make_store):
+    store = make_store()
+    turns = [message("user", "q1"), message("assistant", "a1"), message("user", "q2"), message("assistant", "a2")]
+    for turn in turns:
+        store.append_message("a", turn)
+    
+    assert store.fold_history("a", "asked q1", turns[:2]) == 2
+    assert store.get_history("a") == turns[2:]
+    assert store.get_summary("a") == "asked q1"
+    stats = store.stats()
+    assert stats["folded_messages"] == 2
+    assert stats["summarized_sessions"] == 1
+
+def test_fold_history_skips_messages_trimmed_since_they_were_read(make_store):
+    store = make_store(max_messages=3)
+    turns = [message("user", "q1"), message("assistant", "a1"), message("user", "q2")]
+    for turn in turns:
+        store.append_message("a", turn)
+    folded = store.get_history("a")[:2]
+    
+    # The message cap drops q1 while the summary is being written
+    store.append_message("a", message("assistant", "a2"))
+    assert store.fold_history("a", "summary", folded) == 1
+    assert store.get_history("a") == [message("user", "q2"), message("assistant", "a2")]
+
+def test_fold_history_of_unknown_session(make_store):
+    store = make_store()
+    assert store.fold_history("missing", "summary", [message("user", "q1")]) == 0
+    assert store.get_summary("missing") == ""
+
+def test_sqlite_reconnects_after_pid_change(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    store.append_message("a", message("user", "hi"))
+    inherited = store._connection
+    
+    # What a worker forked from the creating process sees
+    store._pid = -1
+    assert store.get_history("a") == [message("user", "hi")]
+    assert store._connection is not inherited
+    assert store._inherited is inherited
+    assert store._pid == os.getpid()
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_sqlite_store_is_usable_in_a_forked_child(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    store.append_message("a", message("user", "from parent"))
+    parent_connection = store._connection
+    
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            store.append_message("a", message("user", "from child"))
+            if store._connection is not parent_connection:
+                code = 0
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    assert store._connection is parent_connection
+    assert [m["content"] for m in store.get_history("a")] == ["from parent", "from child"]
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import pytest
+from app import main
+from app.chatbot import PortfolioChatbot
+from app.llm_manager import ERROR_RESPONSE, LLMManager
+from app.llm_providers import FakeProvider
+from app.rag_system import RAGSystem
+from app.session_store import InMemorySessionStore
+
+ANSWER = "alpha beta gamma delta"
+QUESTION = "How would you design a distributed rate limiter?"
+
+async def collect(stream):
+    chunks = []
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+    except ConnectionError as e:
+        return chunks, e
+    return chunks, None
+
+def manager(**kwargs) -> LLMManager:
+    return LLMManager(providers=[FakeProvider(response=ANSWER, **kwargs)])
+
+def test_complete_stream_is_cached():
+    llm = manager()
+    chunks, error = asyncio.run(collect(llm.astream_response("prompt")))
+    assert "".join(chunks) == ANSWER and error is None
+    assert llm.response_cache.stats()["entries"] == int(llm.cache_enabled)
+
+def test_failure_before_the_first_token_yields_the_apology():
+    llm = manager(fail_after=0)
+    chunks, error = asyncio.run(collect(llm.astream_response("prompt")))
+    assert chunks == [ERROR_RESPONSE] and error is None
+
+def test_failure_after_tokens_is_raised_and_not_cached():
+    llm = manager(fail_after=2)
+    chunks, error = asyncio.run(collect(llm.astream_response("prompt")))
+    assert chunks == ["alpha", " beta"]
+    assert isinstance(error, ConnectionError)
+    assert llm.response_cache.stats()["entries"] == 0
+
+@pytest.fixture
+def make_chatbot(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_MODEL", "fake")
+    monkeypatch.setenv("EMBEDDING_STORE_PATH", "")
+    rag = RAGSystem(pdf_path="", index_dir=str(tmp_path / "index"))
+    
+    def make(**kwargs) -> PortfolioChatbot:
+        return PortfolioChatbot(manager(**kwargs), rag)
+    return make
+
+def test_chat_stream_raises_when_interrupted(make_chatbot):
+    chunks, error = asyncio.run(collect(make_chatbot(fail_after=2).astream_chat(QUESTION)))
+    assert chunks == ["alpha", " beta"]
+    assert isinstance(error, ConnectionError)
+
+def test_chat_stream_apologizes_when_nothing_was_sent(make_chatbot):
+    chunks, error = asyncio.run(collect(make_chatbot(fail_after=0).astream_chat(QUESTION)))
+    assert chunks == [ERROR_RESPONSE] and error is None
+
+def events(body: str):
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        yield fields["event"], json.loads(fields["data"])
+
+def stream_endpoint(monkeypatch, bot: PortfolioChatbot):
+    store = InMemorySessionStore()
+    monkeypatch.setattr(main, "chatbot", bot)
+    monkeypatch.setattr(main, "session_store", store)
+    monkeypatch.setattr(main, "summarizer", None)
+    
+    async def run() -> str:
+        response = await main.chat_stream_endpoint(main.ChatRequest(message=QUESTION, session_id="s"))
+        return "".join([chunk async for chunk in response.body_iterator])
+    return list(events(asyncio.run(run()))), store
+
+def test_endpoint_sends_error_instead_of_done_for_a_truncated_answer(make_chatbot, monkeypatch):
+    sent, store = stream_endpoint(monkeypatch, make_chatbot(fail_after=2))
+    assert [name for name, _ in sent] == ["session", "token", "token", "error"]
+    assert store.get_history("s")[-1]["content"] == sent[-1][1]["detail"]
+
+def test_endpoint_sends_done_for_a_complete_answer(make_chatbot, monkeypatch):
+    sent, store = stream_endpoint(monkeypatch, make_chatbot())
+    assert sent[-1] == ("done", {"response": ANSWER, "session_id": "s"})
+    assert store.get_history("s")[-1]["content"] == ANSWER
@@ -0,0 +1,42 @@
+import asyncio
+from app.llm_manager import LLMManager
+from app.llm_providers import FakeProvider
+from app.session_store import InMemorySessionStore
+from app.summarizer import ConversationSummarizer
+
+def conversation(store: InMemorySessionStore, turns: int):
+    for n in range(turns):
+        store.append_message("s", {"role": "user", "content": f"question {n}"})
+        store.append_message("s", {"role": "assistant", "content": f"answer {n}"})
+    return store.get_history("s")
+
+async def summarize(summarizer: ConversationSummarizer, history):
+    await summarizer.schedule("s", history)
+
+def test_summary_folds_older_turns():
+    store = InMemorySessionStore()
+    summarizer = ConversationSummarizer(LLMManager(providers=[FakeProvider(response="short summary")]),
+                                        store, threshold=4, keep_recent=2)
+    history = conversation(store, 3)
+    
+    asyncio.run(summarize(summarizer, history))
+    assert store.get_summary("s") == "short summary"
+    assert store.get_history("s") == history[-2:]
+    assert summarizer.stats()["folded_messages"] == 4
+
+def test_summary_bypasses_the_response_cache():
+    llm = LLMManager(providers=[FakeProvider(response="short summary")])
+    llm.cache_enabled = True
+    store = InMemorySessionStore()
+    summarizer = ConversationSummarizer(llm, store, threshold=4, keep_recent=2)
+    
+    asyncio.run(summarize(summarizer, conversation(store, 3)))
+    assert summarizer.folds == 1
+    stats = llm.response_cache.stats()
+    assert stats["entries"] == 0
+    assert stats["misses"] == 0
+
+def test_short_history_is_not_summarized():
+    store = InMemorySessionStore()
+    summarizer = ConversationSummarizer(LLMManager(providers=[FakeProvider()]), store, threshold=4)
+    assert summarizer.schedule("s", conversation(store, 2)) is None
@@ -5,7 +5,7 @@ import ChatBubble from './ChatBubble';
 import ChatInput from './ChatInput';
 import ChatToggle from './ChatToggle';
 import TypingIndicator from './TypingIndicator';
-import { sendMessage as sendApiMessage, checkApiAvailability } from '../utils/api';
+import { streamMessage, checkApiAvailability } from '../utils/api';
 import { getResponseForMessage } from '../fallback-responses';
 import styles from '../ChatWidget.module.css';
 
@@ -86,6 +86,9 @@ const Chat: React.FC<ChatProps> = ({ initialMessage = "Hello! I'm the portfolio
     // Track if component is still mounted
     let isMounted = true;
     
+    // Text of the assistant turn being streamed, if any tokens have arrived
+    let streamed = '';
+    
     setTimeout(async () => {
       // Don't proceed if component unmounted during the delay
       if (!isMounted) return;
@@ -101,8 +104,21 @@ const Chat: React.FC<ChatProps> = ({ initialMessage = "Hello! I'm the portfolio
             { role: 'assistant', content: fallbackResponse },
           ]);
         } else {
-          // Try to use the API with a timeout
-          const data = await sendApiMessage(content, sessionId);
+          // Stream the answer so it appears as soon as the model starts generating
+          const data = await streamMessage(content, sessionId, (token) => {
+            if (!isMounted) return;
+            const isFirstToken = !streamed;
+            streamed += token;
+            const text = streamed;
+            
+            if (isFirstToken) {
+              // The assistant turn replaces the typing indicator
+              setIsTyping(false);
+              setMessages((prev) => [...prev, { role: 'assistant', content: text }]);
+            } else {
+              setMessages((prev) => [...prev.slice(0, -1), { role: 'assistant', content: text }]);
+            }
+          });
           
           // Don't update state if component unmounted during API call
           if (!isMounted) return;
@@ -112,11 +128,12 @@ const Chat: React.FC<ChatProps> = ({ initialMessage = "Hello! I'm the portfolio
             setSessionId(data.session_id);
           }
 
-          // Add assistant response to chat
-          setMessages((prev) => [
-            ...prev,
-            { role: 'assistant', content: data.message || 'Sorry, I received an empty response. Please try again.' },
-          ]);
+          // The done event carries the full response
+          const finalMessage: Message = {
+            role: 'assistant',
+            content: data.response || 'Sorry, I received an empty response. Please try again.',
+          };
+          setMessages((prev) => (streamed ? [...prev.slice(0, -1), finalMessage] : [...prev, finalMessage]));
         }
       } catch (error) {
         // Don't update state if component unmounted during API call
@@ -127,9 +144,11 @@ const Chat: React.FC<ChatProps> = ({ initialMessage = "Hello! I'm the portfolio
         // Switch to fallback mode if API fails
         setUsesFallback(true);
         
-        // Add error message to chat
+        // Replace a partly streamed answer with the error message, so the
+        // user's message is never left without a reply
+        const partial = streamed;
         setMessages((prev) => [
-          ...prev,
+          ...(partial ? prev.slice(0, -1) : prev),
           { 
             role: 'assistant', 
             content: 'Sorry, I encountered an error connecting to my knowledge base. I\'ll switch to offline mode for now.' 
@@ -60,6 +60,92 @@ export const sendMessage = async (message: string, sessionId: string | null = nu
   }
 };
 
+/**
+ * Send a message to the streaming chat endpoint and receive the response token by token
+ * 
+ * Unlike sendMessage there is no overall timeout or retry: the first token
+ * arrives as soon as the model starts generating, so long answers no longer
+ * trip the timeout and get requested twice.
+ * 
+ * @param {string} message - The message to send
+ * @param {string|null} sessionId - Optional session ID for continuing a conversation
+ * @param {(token: string) => void} onToken - Called for every streamed chunk of the response
+ * @param {AbortSignal} signal - Optional signal to cancel the stream
+ * @returns {Promise<{response: string, session_id: string}>} - The full response once the stream finishes;
+ *   rejects on an error event or if the stream ends early
+ */
+export const streamMessage = async (
+  message: string,
+  sessionId: string | null,
+  onToken: (token: string) => void,
+  signal?: AbortSignal
+): Promise<{ response: string; session_id: string }> => {
+  const response = await fetch(`${API_URL}/chat/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+    },
+    body: JSON.stringify({
+      message,
+      session_id: sessionId,
+    }),
+    signal
+  });
+
+  if (!response.ok || !response.body) {
+    const errorText = await response.text().catch(() => 'Unknown error');
+    throw new Error(`API error: ${response.status} - ${errorText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = { response: '', session_id: sessionId || '' };
+  let finished = false;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      let data = '';
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'session') {
+        result.session_id = payload.session_id;
+      } else if (event === 'token') {
+        onToken(payload.token);
+      } else if (event === 'done') {
+        result = { response: payload.response, session_id: payload.session_id };
+        finished = true;
+      } else if (event === 'error') {
+        throw new Error(`API error: ${payload.detail}`);
+      }
+    }
+  }
+
+  // A dropped connection ends the body without a done event
+  if (!finished) {
+    throw new Error('The response stream ended before the answer was complete');
+  }
+
+  return result;
+};
+
 /**
  * Check if the API is available
  * 